@@ -2,9 +2,13 @@ import socket
 import keyboard
 import threading
 import json
-import struct
 from datetime import datetime
 import time
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.data.packet_decoder import decode_packets, valid_distance_mask, PACKET_TYPE_NAMES
 
 class LiDARController:
     def __init__(self):
@@ -124,33 +128,24 @@ class LiDARController:
     def analyze_lidar_frame(self, data, frame_count, timestamp):
         """根據最新規格解析LiDAR數據幀"""
         try:
+            decoded = decode_packets(data, 1)
             # 幀標識符（0-1）：0xAA55，little-endian
-            frame_flag = int.from_bytes(data[0:2], byteorder='little')
-            if frame_flag != 0xAA55:
+            if not decoded.valid[0]:
+                frame_flag = int.from_bytes(data[0:2], byteorder='little')
                 print(f"\n[8881-數據] 非標準幀 時間:{timestamp} 幀頭:0x{frame_flag:04X}")
                 return
 
             # 封包類型type: 13->'d', 14->'e', 10->'a'
-            packet_type_val = (data[3] >> 4) & 0x0F
-            packet_type = {13: 'd', 14: 'e', 10: 'a'}.get(packet_type_val, f'unk({packet_type_val})')
-            y_scan = ((data[3] & 0x0F) << 8) | data[2]
-
-            # 距離數據（4-1203）：300點，每點4字節little-endian，僅過濾0為None
-            distances = []
-            for i in range(4, 1204, 4):
-                dist = int.from_bytes(data[i:i+4], byteorder='little')
-                if dist != 0:
-                    distances.append(dist)
-                else:
-                    distances.append(None)  # 無效點
-
-            # Frame ID（1204-1205）：little-endian
-            frame_id = int.from_bytes(data[1204:1206], byteorder='little')
+            packet_type_val = int(decoded.packet_type[0])
+            packet_type = PACKET_TYPE_NAMES.get(packet_type_val, f'unk({packet_type_val})')
+            y_scan = int(decoded.y_scan[0])
+            frame_id = int(decoded.frame_id[0])
 
-            # 統計有效點
-            valid_distances = [d for d in distances if d is not None]
-            min_dist = min(valid_distances) if valid_distances else 0
-            max_dist = max(valid_distances) if valid_distances else 0
+            # 距離數據：300點，統計有效點
+            distances = decoded.distances[0]
+            valid_distances = distances[valid_distance_mask(distances)]
+            min_dist = int(valid_distances.min()) if valid_distances.size else 0
+            max_dist = int(valid_distances.max()) if valid_distances.size else 0
 
             print(f"raw type val: {packet_type_val}")
             print(f"\n[LiDAR數據] 時間:{timestamp} 幀#{frame_id} 類型:{packet_type} Y順序:{y_scan}")
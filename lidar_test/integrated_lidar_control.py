@@ -3,15 +3,20 @@ import keyboard
 import threading
 import json
 import time
-import pandas as pd
 from datetime import datetime
 import csv
-import struct
 import numpy as np
-import math
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.data.packet_decoder import decode_packets, PACKET_SIZE
+from src.data.angle_lut import get_angle_lut
+from src.data.packet_store import PacketStore
+from src.controller.command_sequencer import CommandSequencer, START_SEQUENCE, STOP_SEQUENCE
 
 class LiDARDataAnalyzer:
-    def __init__(self, distance_scale=1.0, angle_offset=0.0):
+    def __init__(self, distance_scale=1.0, angle_offset=0.0, max_memory_mb=256, spill_dir=None):
         # 數據幀格式定義
         self.FRAME_IDENTIFIER = 0xAA55
         self.ECHO_TYPES = {
@@ -27,9 +32,8 @@ class LiDARDataAnalyzer:
         self.points_per_line = 300
         self.angle_resolution = self.horizontal_fov / self.points_per_line
         
-        # 數據存儲
-        self.parsed_frames = []
-        self.point_cloud_data = []
+        # 數據存儲：每個封包一列的欄式陣列，超過 max_memory_mb 時溢出到 spill_dir 的暫存檔
+        self.packets = PacketStore(max_memory_mb * 1024 * 1024, spill_dir=spill_dir)
         self.is_analyzing = False
         self.frame_count = 0
         self.valid_frame_count = 0
@@ -42,8 +46,9 @@ class LiDARDataAnalyzer:
             return None
             
         try:
+            decoded = decode_packets(data[:PACKET_SIZE], 1) if len(data) >= PACKET_SIZE else None
             # 檢查幀標識符
-            frame_id = struct.unpack('>H', data[0:2])[0]
+            frame_id = int.from_bytes(data[0:2], 'little')
             
             # 調試信息：顯示幀標識符
             if hasattr(self, '_debug_count'):
@@ -60,62 +65,35 @@ class LiDARDataAnalyzer:
                 return None
             
             # 檢查完整幀長度
-            if len(data) < 1206:
-                print(f"[調試] 完整幀長度不足: {len(data)}/1206 字節")
+            if decoded is None:
+                print(f"[調試] 完整幀長度不足: {len(data)}/{PACKET_SIZE} 字節")
                 return None
                 
-            # 解析Echo信息
-            echo_byte = data[2]
-            echo_id = (echo_byte >> 4) & 0x0F
-            echo_depth = echo_byte & 0x0F
-            echo_line = data[3]
+            # 解析封包類型與掃描線
+            echo_id = int(decoded.packet_type[0])
+            echo_line = int(decoded.y_scan[0])
             
             if self._debug_count <= 5:
-                print(f"[調試] Echo ID={echo_id}, Depth={echo_depth}, Line={echo_line}")
+                print(f"[調試] Echo ID={echo_id}, Line={echo_line}")
             
-            # 解析Echo數據
-            echo_data_raw = data[4:1204]
-            echo_points = []
-            xyz_points = []
-            
-            for i in range(0, len(echo_data_raw), 2):
-                if i + 1 < len(echo_data_raw):
-                    point_value = struct.unpack('>H', echo_data_raw[i:i+2])[0]
-                    echo_points.append(point_value)
-                    
-                    point_index = i // 2
-                    x, y, z, distance_mm, h_angle, v_angle = self.convert_to_xyz(
-                        point_value, point_index, echo_line
-                    )
-                    
-                    xyz_points.append({
-                        'point_index': point_index,
-                        'raw_distance': point_value,
-                        'distance_mm': distance_mm,
-                        'x': x, 'y': y, 'z': z,
-                        'horizontal_angle': h_angle,
-                        'vertical_angle': v_angle,
-                        'valid': x is not None
-                    })
+            # Echo數據 (300點 uint32 little-endian)，XYZ 在導出時才由角度查表計算
+            echo_points = decoded.distances[0]
             
             # 解析幀計數
-            frame_count = struct.unpack('>H', data[1204:1206])[0]
+            frame_count = int(decoded.frame_id[0])
             
-            echo_type_key = (echo_id << 1) | (1 if echo_depth > 0 else 0)
-            echo_type = self.ECHO_TYPES.get(echo_type_key, f"Unknown ({echo_id:04b})")
+            echo_type = self.ECHO_TYPES.get(echo_id, f"Unknown ({echo_id:04b})")
             
             if self._debug_count <= 5:
                 print(f"[調試] 解析成功! 幀計數={frame_count}, 點數={len(echo_points)}")
             
             parsed_frame = {
-                'timestamp': datetime.now(),
+                'timestamp': time.time(),
                 'frame_identifier': frame_id,
                 'echo_id': echo_id,
-                'echo_depth': echo_depth,
                 'echo_line': echo_line,
                 'echo_type': echo_type,
                 'echo_points': echo_points,
-                'xyz_points': xyz_points,
                 'frame_count': frame_count,
                 'points_count': len(echo_points)
             }
@@ -128,30 +106,18 @@ class LiDARDataAnalyzer:
                 print(f"[調試] 錯誤數據長度: {len(data)}")
             return None
 
-    def convert_to_xyz(self, distance_raw, point_index, echo_line):
-        """將極坐標數據轉換為XYZ笛卡爾坐標"""
-        distance_mm = distance_raw * self.distance_scale
-        
-        if distance_mm <= 0:
-            return None, None, None, 0, 0, 0
-        
-        horizontal_angle_deg = (point_index * self.angle_resolution) - (self.horizontal_fov / 2.0) + self.angle_offset
-        horizontal_angle_rad = math.radians(horizontal_angle_deg)
-        vertical_angle_deg = 0.0
-        vertical_angle_rad = math.radians(vertical_angle_deg)
-        
-        x = distance_mm * math.cos(vertical_angle_rad) * math.cos(horizontal_angle_rad)
-        y = distance_mm * math.cos(vertical_angle_rad) * math.sin(horizontal_angle_rad)
-        z = distance_mm * math.sin(vertical_angle_rad)
-        
-        return x, y, z, distance_mm, horizontal_angle_deg, vertical_angle_deg
-    
+    def get_angle_lut(self):
+        """取得單條掃描線的角度查表（依視場角、點數與角度偏移快取）"""
+        h_start = -(self.horizontal_fov / 2.0) + self.angle_offset
+        h_end = h_start + (self.points_per_line - 1) * self.angle_resolution
+        return get_angle_lut((h_start, h_end), (0.0, 0.0), 1, self.points_per_line)
+
     def start_analysis(self):
         """開始數據分析"""
         self.is_analyzing = True
         self.frame_count = 0
         self.valid_frame_count = 0
-        self.parsed_frames = []
+        self.packets.clear()
         print("開始LiDAR數據分析...")
     
     def stop_analysis(self):
@@ -169,16 +135,18 @@ class LiDARDataAnalyzer:
         
         if parsed_frame:
             self.valid_frame_count += 1
-            self.parsed_frames.append(parsed_frame)
+            self.packets.append(parsed_frame['timestamp'], parsed_frame['frame_count'],
+                                parsed_frame['echo_line'], parsed_frame['echo_id'],
+                                parsed_frame['echo_points'])
             
             # 每100幀顯示一次狀態
             if self.valid_frame_count % 100 == 0:
-                valid_points = len([p for p in parsed_frame['xyz_points'] if p['valid']])
+                valid_points = np.count_nonzero(parsed_frame['echo_points'] * self.distance_scale > 0)
                 print(f"已接收 {self.valid_frame_count} 有效幀, 當前幀有效點數: {valid_points}/300")
     
-    def export_data(self, filename=None):
-        """導出數據"""
-        if not self.parsed_frames:
+    def export_data(self, filename=None, binary=False):
+        """導出數據：CSV 由欄式陣列分塊寫出；binary=True 時另存原始封包欄位為 .npy"""
+        if not len(self.packets):
             print("沒有數據可導出")
             return
             
@@ -186,27 +154,18 @@ class LiDARDataAnalyzer:
             filename = f"lidar_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
         # 導出CSV
-        csv_data = []
-        for frame in self.parsed_frames:
-            for xyz_point in frame.get('xyz_points', []):
-                if xyz_point['valid']:
-                    csv_data.append({
-                        'timestamp': frame['timestamp'],
-                        'frame_count': frame['frame_count'],
-                        'echo_type': frame['echo_type'],
-                        'point_index': xyz_point['point_index'],
-                        'distance_mm': xyz_point['distance_mm'],
-                        'x_mm': xyz_point['x'],
-                        'y_mm': xyz_point['y'],
-                        'z_mm': xyz_point['z'],
-                        'horizontal_angle_deg': xyz_point['horizontal_angle']
-                    })
+        lut = self.get_angle_lut()
+        csv_filename = f"{filename}.csv"
+        count = self.packets.export_csv(csv_filename, lut.directions[0], lut.h_angles,
+                                        self.distance_scale, self.ECHO_TYPES)
+        if count:
+            print(f"數據已導出至: {csv_filename} ({count} 個有效點)")
+        else:
+            os.remove(csv_filename)
         
-        if csv_data:
-            df = pd.DataFrame(csv_data)
-            csv_filename = f"{filename}.csv"
-            df.to_csv(csv_filename, index=False, encoding='utf-8-sig')
-            print(f"數據已導出至: {csv_filename} ({len(csv_data)} 個有效點)")
+        if binary:
+            npy_filename = self.packets.export_binary(f"{filename}.npy")
+            print(f"原始封包已導出至: {npy_filename} ({len(self.packets)} 個封包)")
 
 # 全局變量
 s = None
@@ -214,10 +173,16 @@ analyzer = LiDARDataAnalyzer()
 rxRunState = 0
 txRunState = 0
 remoteAddr = None
+sequencer = CommandSequencer(lambda data: s.sendto(data, remoteAddr))
+
+def print_step(result):
+    """輸出序列中每一步的結果"""
+    state = '完成' if result.ok else '逾時'
+    print(f"  {result.command}: {state} ({result.elapsed * 1000:.0f} ms)")
 
 def RxMessage():
     """接收控制命令回應和點雲數據"""
-    global s, rxRunState, analyzer
+    global s, rxRunState, analyzer, sequencer
     timeCount = 0
     while rxRunState == 1:
         s.settimeout(1)
@@ -225,17 +190,17 @@ def RxMessage():
         try:
             indata, addr = s.recvfrom(2048)  # 增加緩衝區大小以接收點雲數據
             
-            # 嘗試解碼為文字命令回應
-            try:
-                response = indata.decode()
-                print(response, end='', flush=True)
-                if response == 'stopfire':
-                    print('cmd>')
-            except UnicodeDecodeError:
-                # 無法解碼的是二進制點雲數據
+            # 0xAA55 開頭的是二進制點雲數據或狀態封包（部分數據封包也能解碼成文字），其餘為文字命令回應
+            sequencer.on_datagram(indata)
+            if indata[:2] in (b'\x55\xAA', b'\xAA\x55'):
                 if analyzer.is_analyzing:
                     print(f"\n[調試] 收到點雲數據: {len(indata)} 字節, 來源: {addr}")
                     analyzer.process_frame(indata)
+            else:
+                response = indata.decode(errors='replace')
+                print(response, end='', flush=True)
+                if response == 'stopfire':
+                    print('cmd>')
                     
         except socket.timeout:
             continue
@@ -245,7 +210,7 @@ def RxMessage():
 
 def TxMessage():
     """發送控制命令"""
-    global s, remoteAddr, txRunState, analyzer
+    global s, remoteAddr, txRunState, analyzer, sequencer
     
     while txRunState == 1:
         outdata = input('cmd>')
@@ -263,22 +228,17 @@ def TxMessage():
                 elif parts[1] == '0':
                     analyzer.stop_analysis()
         elif outdata == 'startlidar':
-            # 完整的LiDAR啟動序列
+            # 完整的LiDAR啟動序列：每一步等到設備回覆（scanxy 1 等到第一個數據封包）
             print("執行完整LiDAR啟動序列...")
-            commands = ['stephomeup', 'startbldc 0 1000', 'scanxy 1']
-            for cmd in commands:
-                print(f"發送: {cmd}")
-                s.sendto(cmd.encode(), remoteAddr)
-                time.sleep(2)  # 等待每個命令完成
             analyzer.start_analysis()
+            results = sequencer.run(START_SEQUENCE, on_step=print_step)
+            if len(results) < len(START_SEQUENCE) or not results[-1].ok:
+                print(f"啟動序列在 {results[-1].command} 逾時，已中止")
+                analyzer.stop_analysis()
         elif outdata == 'stoplidar':
-            # 完整的LiDAR停止序列
+            # 完整的LiDAR停止序列：逾時的步驟不中止，確保每個停止指令都送出
             print("執行完整LiDAR停止序列...")
-            commands = ['scanxy 0', 'stopbldc', 'stopfire']
-            for cmd in commands:
-                print(f"發送: {cmd}")
-                s.sendto(cmd.encode(), remoteAddr)
-                time.sleep(1)
+            sequencer.run(STOP_SEQUENCE, stop_on_timeout=False, on_step=print_step)
             analyzer.stop_analysis()
         elif outdata == 'stopfire':
             # 停火命令
@@ -287,10 +247,16 @@ def TxMessage():
         elif outdata == 'exportdata':
             # 導出數據命令
             analyzer.export_data()
+        elif outdata == 'exportbinary':
+            # 導出CSV與原始封包 (.npy)
+            analyzer.export_data(binary=True)
         elif outdata == 'showstatus':
             # 顯示狀態命令
             print(f"分析狀態: {'運行中' if analyzer.is_analyzing else '停止'}")
             print(f"總幀數: {analyzer.frame_count}, 有效幀數: {analyzer.valid_frame_count}")
+            stats = analyzer.packets.get_stats()
+            print(f"封包儲存: 記憶體 {stats['memory_rows']} 列 ({stats['memory_bytes'] / 1e6:.0f} MB), "
+                  f"已溢出到磁碟 {stats['spilled_rows']} 列")
         elif outdata == 'help':
             # 顯示幫助
             print("\n=== 整合版 LiDAR 控制命令 ===")
@@ -308,6 +274,7 @@ def TxMessage():
             print("數據分析:")
             print("  showstatus     - 顯示當前分析狀態")
             print("  exportdata     - 導出當前數據到CSV")
+            print("  exportbinary   - 導出CSV與原始封包 (.npy)")
             print("  exit           - 退出程式")
             print("================================")
         else:
@@ -402,6 +369,7 @@ def main():
             export_choice = input(f"共接收到 {analyzer.valid_frame_count} 有效幀數據，是否導出? (y/n): ")
             if export_choice.lower() == 'y':
                 analyzer.export_data()
+        analyzer.packets.clear()  # 刪除溢出到磁碟的暫存檔
     
     else:
         txRunState = 0
@@ -16,12 +16,14 @@ def main():
     processor = LidarDataProcessor()
     controller = LidarController(processor)
     monitor = LidarMonitor()
+    monitor.attach(controller.status_queue)  # 狀態封包送入監控模組
     
     # 創建主應用程序視窗
     app = MainWindow(root, controller, processor, monitor)
     
     # 運行應用程序
     root.mainloop()
+    monitor.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
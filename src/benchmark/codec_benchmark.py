@@ -0,0 +1,173 @@
+"""距離影像錄製編碼效能測試
+
+對同一組幀以不同壓縮方式、等級與關鍵幀間隔編碼為 .lrz，統計壓縮率、編碼/解碼 MB/s（以 uint16
+原始距離影像計）與單核解碼幀率，結果寫入 JSON 以便比較：
+
+    python -m src.benchmark.codec_benchmark --frames 200 --noise 2
+    python -m src.benchmark.codec_benchmark --codec zlib:1 zlib:9 lzma:6 --keyframe 10 30 100
+    python -m src.benchmark.codec_benchmark --capture data/recordings/capture.lcap
+    python -m src.benchmark.codec_benchmark --capture data/recordings/frames_20250115_143025.larc
+
+未指定 --capture 時使用模擬器的場景（靜態牆面與地面加上移動方塊，可加入 ±noise cm 的量測雜訊）。
+realtime 為解碼幀率與錄製幀率（依時間戳估計，或 --fps）的比值，大於 1 表示單核即可即時播放。
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from src.data.frame_archive import FrameArchive, is_archive
+from src.data.frame_assembler import COLUMNS, DEFAULT_LINES, FrameAssembler, RangeFrame
+from src.data.packet_replay import PacketReplayer
+from src.data.range_codec import RangeCodecReader, RangeCodecWriter
+from src.simulator.lidar_simulator import build_scene
+
+# (壓縮方式, 等級) 預設測試組合；zlib 9 / lzma 6 以上編碼約 1 MB/s，需要時以 --codec 指定
+DEFAULT_SETTINGS = (('none', 0), ('zlib', 1), ('zlib', 3), ('zlib', 6), ('lzma', 0), ('lzma', 2))
+
+
+def simulated_frames(count: int, lines: int = DEFAULT_LINES, noise: int = 0, fps: float = 10.0,
+                     seed: int = 0) -> List[RangeFrame]:
+    """產生與 LidarSimulator 相同的場景序列（移動方塊讓相鄰幀有差異）"""
+    rng = np.random.default_rng(seed)
+    scene = build_scene(lines)
+    line_mask = np.ones((lines, 2), dtype=bool)
+    frames = []
+    for k in range(count):
+        image = scene.copy()
+        left = (k * 10) % (COLUMNS - 60)
+        image[lines // 3:2 * lines // 3, left:left + 60] = 500
+        if noise:
+            valid = image > 0
+            image[valid] += rng.integers(-noise, noise + 1, size=int(valid.sum())).astype(np.uint32)
+        frames.append(RangeFrame(k & 0xFFFF, image, line_mask, 1000.0 + k / fps, 1.0))
+    return frames
+
+
+def capture_frames(path: str, count: int, lines: int = DEFAULT_LINES) -> List[RangeFrame]:
+    """從 .larc 存檔，或經幀組裝器重播 .lcap/pcap 錄製檔，取出最多 count 幀"""
+    if is_archive(path):
+        archive = FrameArchive(path)
+        return [archive[k]._replace(distances=np.array(archive[k].distances, dtype=np.uint32))
+                for k in range(min(count, len(archive)))]
+    frames: List[RangeFrame] = []
+
+    def on_frame(frame: RangeFrame) -> None:
+        if len(frames) < count:
+            frames.append(frame._replace(distances=frame.distances.copy(),
+                                         line_mask=frame.line_mask.copy()))
+
+    PacketReplayer(path, speed=0).replay_to_assembler(FrameAssembler(lines, on_frame=on_frame))
+    return frames
+
+
+def frame_rate(frames: Sequence[RangeFrame]) -> float:
+    """依時間戳估計錄製幀率"""
+    if len(frames) < 2:
+        return 0.0
+    interval = float(np.median(np.diff([f.timestamp for f in frames])))
+    return 1.0 / interval if interval > 0 else 0.0
+
+
+def bench_setting(frames: Sequence[RangeFrame], method: str, level: int,
+                  keyframe_interval: int, directory: str) -> Dict[str, Any]:
+    """以一組設定編碼並完整解碼，驗證結果一致"""
+    lines = frames[0].distances.shape[0]
+    path = os.path.join(directory, f'bench_{method}_{level}_{keyframe_interval}.lrz')
+    writer = RangeCodecWriter(path, lines, method=method, level=level,
+                              keyframe_interval=keyframe_interval)
+    start = time.perf_counter()
+    for frame in frames:
+        writer.append(frame)
+    writer.close()
+    encode = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reader = RangeCodecReader(path)
+    decoded = 0
+    for frame, original in zip(reader, frames):
+        decoded += 1
+        if not np.array_equal(frame.distances, np.minimum(original.distances, 0xFFFF)):
+            raise AssertionError(f"解碼結果不一致: {method} level={level} frame={decoded - 1}")
+    decode = time.perf_counter() - start
+    os.remove(path)
+    os.remove(path + '.idx')
+    return {
+        'method': method,
+        'level': level,
+        'keyframe_interval': keyframe_interval,
+        'ratio': writer.raw_bytes / writer.bytes,
+        'bytes_per_frame': writer.bytes / len(frames),
+        'encode_mb_per_s': writer.raw_bytes / encode / 1e6,
+        'decode_mb_per_s': writer.raw_bytes / decode / 1e6,
+        'decode_fps': decoded / decode,
+    }
+
+
+def run_benchmark(frames: Sequence[RangeFrame], settings: Sequence[Tuple[str, int]],
+                  keyframe_intervals: Sequence[int], fps: float = 0.0) -> Dict[str, Any]:
+    fps = fps or frame_rate(frames)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for keyframe_interval in keyframe_intervals:
+            for method, level in settings:
+                result = bench_setting(frames, method, level, keyframe_interval, directory)
+                result['realtime'] = result['decode_fps'] / fps if fps else None
+                results.append(result)
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'host': platform.node(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'frames': len(frames),
+        'lines': int(frames[0].distances.shape[0]),
+        'fps': fps,
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='距離影像錄製編碼效能測試')
+    parser.add_argument('--capture', default=None, help='.larc 存檔或 .lcap/pcap 錄製檔，未指定時使用模擬場景')
+    parser.add_argument('--frames', type=int, default=60, help='測試幀數')
+    parser.add_argument('--lines', type=int, default=DEFAULT_LINES, help='每幀掃描線數')
+    parser.add_argument('--noise', type=int, default=2, help='模擬場景的量測雜訊 (±cm)')
+    parser.add_argument('--fps', type=float, default=0.0, help='錄製幀率，0 表示依時間戳估計（模擬場景為 10）')
+    parser.add_argument('--keyframe', type=int, nargs='+', default=[30], help='關鍵幀間隔')
+    parser.add_argument('--codec', nargs='+', default=None, help='壓縮方式:等級，例如 zlib:1 lzma:0')
+    parser.add_argument('--output', default='codec_benchmark.json', help='結果 JSON 檔')
+    args = parser.parse_args()
+
+    if args.capture:
+        frames = capture_frames(args.capture, args.frames, args.lines)
+        source = args.capture
+    else:
+        frames = simulated_frames(args.frames, args.lines, args.noise)
+        source = f'simulated (noise ±{args.noise} cm)'
+    if not frames:
+        print("沒有可測試的幀")
+        return
+    settings = DEFAULT_SETTINGS
+    if args.codec:
+        settings = [(method, int(level)) for method, level in (c.split(':') for c in args.codec)]
+    result = run_benchmark(frames, settings, args.keyframe, args.fps)
+    result['source'] = source
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=4)
+    print(f"{source}: {result['frames']} 幀, {result['fps']:.1f} fps")
+    for r in result['results']:
+        realtime = f"{r['realtime']:.1f}x" if r['realtime'] else '-'
+        print(f"  {r['method']:<5} level={r['level']} key={r['keyframe_interval']:<3} "
+              f"ratio={r['ratio']:6.2f}  encode={r['encode_mb_per_s']:7.1f} MB/s  "
+              f"decode={r['decode_mb_per_s']:7.1f} MB/s ({r['decode_fps']:.0f} fps, {realtime})")
+    print(f"結果已寫入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""端到端接收效能測試
+
+在本程序內產生 1206 字節 d/e 封包串流，經過實際的 LidarController 路徑
+（UDP loopback → BatchReceiver → PacketRing → 解碼 → 幀組裝 → XYZ → 消費者），
+統計吞吐量、各階段延遲 p50/p95/p99 與每幀 CPU 時間，結果寫入 JSON 以便比較不同版本：
+
+    python -m src.benchmark.ingest_benchmark --frames 200 --fps 0 --output bench.json
+    python -m src.benchmark.ingest_benchmark --mode inject --color-map --render
+
+延遲階段：
+    receive   幀最後一個封包送出 → 進入接收環（核心與 socket 延遲）
+    queue     進入接收環 → 組裝線程開始處理該批次
+    decode    每批次解碼時間
+    assemble  每批次寫入幀組裝器時間
+    xyz       距離影像轉點雲時間
+    color_map 距離顏色映射時間（需 DistanceColorMapper）
+    render    matplotlib 繪圖時間（需 matplotlib，只繪製消費者來得及處理的幀）
+    end_to_end 幀最後一個封包送出 → 消費者收到點雲
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.controller.lidar_controller import LidarController
+from src.controller.pipeline import BLOCK, LATEST_ONLY
+from src.data.frame_assembler import DEFAULT_LINES, FrameAssembler, RangeFrame
+from src.data.point_cloud import range_image_to_point_cloud
+from src.data.packet_decoder import (decode_packets, PACKET_DTYPE, PACKET_SIZE, PACKET_TYPE_D,
+                                     PACKET_TYPE_E, FRAME_HEADER)
+
+
+class _FrameSink:
+    """只保存最新點雲的處理器（控制器只使用 current_frame）"""
+    current_frame = None
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """返回樣本的 p50/p95/p99、平均與數量 (毫秒)"""
+    if not samples:
+        return {'count': 0}
+    values = np.asarray(samples, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'count': int(values.size), 'p50': float(p50), 'p95': float(p95),
+            'p99': float(p99), 'mean': float(values.mean()), 'max': float(values.max())}
+
+
+def build_frame_records(lines: int, seed: int = 0) -> np.ndarray:
+    """產生一幀的封包記錄（S 型順序），frame_id 在送出前填入"""
+    rng = np.random.default_rng(seed)
+    records = np.zeros(2 * lines, dtype=PACKET_DTYPE)
+    records['header'] = FRAME_HEADER
+    records['line'] = np.repeat(np.arange(lines), 2)
+    records['type_echo'] = np.tile(np.array([PACKET_TYPE_D, PACKET_TYPE_E], dtype=np.uint8) << 4, lines)
+    records['distances'] = rng.integers(100, 5000, size=(2 * lines, 300), dtype=np.uint32)
+    return records
+
+
+class InstrumentedController(LidarController):
+    """在各階段加入計時的 LidarController"""
+
+    def __init__(self, lines: int):
+        super().__init__(_FrameSink())
+        # 組裝器的影像緩衝區依掃描線數配置，需以測試的線數重建
+        self.scan_lines = lines
+        self.frame_assembler = FrameAssembler(
+            lines, self.frame_window, self.frame_timeout, on_frame=self._emit_frame)
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.last_packet_sent: Dict[int, int] = {}  # frame_id -> 最後一個封包送出時間 (ns)
+        self.cloud_frame_ids: Dict[int, int] = {}  # id(點雲) -> frame_id，供消費者計算延遲
+        self.frames_received = 0
+        self.last_frame_at = 0.0  # 最後一幀到達消費者的時間 (perf_counter)
+        self._emit_ns = 0  # 本批次中 on_frame 回呼（XYZ 與分發）花費的時間
+
+    def _handle_data_packets(self, data: memoryview, lengths: np.ndarray) -> None:
+        start = time.monotonic_ns()
+        ring = self.packet_ring
+        if ring is not None and self.data_rx_running:
+            received = ring.span_timestamps(len(lengths))
+            self.samples['queue'].extend(((start - received) / 1e6).tolist())
+        decoded = decode_packets(data, len(lengths))
+        decoded_at = time.monotonic_ns()
+        mask = decoded.valid & (lengths == PACKET_SIZE)
+        mask &= (decoded.packet_type == PACKET_TYPE_D) | (decoded.packet_type == PACKET_TYPE_E)
+        if ring is not None and self.data_rx_running:
+            last = np.flatnonzero(mask & (decoded.packet_type == PACKET_TYPE_E)
+                                  & (decoded.y_scan == self.scan_lines - 1))
+            for i in last.tolist():
+                sent = self.last_packet_sent.get(int(decoded.frame_id[i]))
+                if sent is not None:
+                    self.samples['receive'].append((int(received[i]) - sent) / 1e6)
+        self._emit_ns = 0
+        with self.assembler_lock:
+            self.frame_assembler.add_packets(decoded, mask)
+        done = time.monotonic_ns()
+        self.samples['decode'].append((decoded_at - start) / 1e6)
+        self.samples['assemble'].append((done - decoded_at - self._emit_ns) / 1e6)
+
+    def _emit_frame(self, frame: RangeFrame) -> None:
+        start = time.monotonic_ns()
+        point_cloud = range_image_to_point_cloud(
+            frame.distances, frame.line_mask, self.horizontal_range, self.vertical_range)
+        self.samples['xyz'].append((time.monotonic_ns() - start) / 1e6)
+        self.current_frame_id = frame.frame_id
+        self.processor.current_frame = point_cloud
+        self.cloud_frame_ids[id(point_cloud)] = frame.frame_id
+        for consumer in self.frame_consumers:
+            consumer.submit(point_cloud)
+        self._emit_ns += time.monotonic_ns() - start
+
+
+def _render_stage(color_map: bool, render: bool):
+    """建立顏色映射與繪圖階段，缺少相依套件時略過並返回原因"""
+    mapper = None
+    notes = {}
+    if color_map or render:
+        try:
+            from src.data.color_mapper import DistanceColorMapper
+            mapper = DistanceColorMapper()
+        except ImportError as e:
+            notes['color_map'] = f"skipped: {e}"
+    figure = ax = None
+    if render:
+        try:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            figure = Figure(figsize=(8, 6))
+            FigureCanvasAgg(figure)
+            ax = figure.add_subplot(111, projection='3d')
+        except ImportError as e:
+            notes['render'] = f"skipped: {e}"
+    return mapper if color_map else None, mapper, figure, ax, notes
+
+
+def _wait_for_frames(controller: InstrumentedController, frames: int, settle: float) -> float:
+    """送完封包後最多等待 settle 秒讓剩餘的幀到達，返回計時結束點
+
+    計時停在最後一幀到達時（不早於送完封包），丟幀時不把等待逾時計入吞吐量。
+    """
+    sent = time.perf_counter()
+    deadline = sent + settle
+    while controller.frames_received < frames and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    return max(sent, controller.last_frame_at)
+
+
+def run_benchmark(frames: int = 100, lines: int = DEFAULT_LINES, fps: float = 0.0, mode: str = 'udp',
+                  batch_size: int = 64, ring_depth: int = 4096, color_map: bool = False,
+                  render: bool = False, settle: float = 1.0) -> Dict[str, Any]:
+    """執行效能測試並返回結果字典"""
+    controller = InstrumentedController(lines)
+    controller.rx_batch_size = batch_size
+    controller.ring_depth = ring_depth
+    samples = controller.samples
+    color_mapper, plot_mapper, figure, ax, notes = _render_stage(color_map, render)
+
+    def consumer(point_cloud: np.ndarray) -> None:
+        received = time.monotonic_ns()
+        frame_id = controller.cloud_frame_ids.pop(id(point_cloud), None)
+        sent = controller.last_packet_sent.get(frame_id)
+        if sent is not None:
+            samples['end_to_end'].append((received - sent) / 1e6)
+        controller.frames_received += 1
+        controller.last_frame_at = time.perf_counter()
+        if color_mapper is not None:
+            start = time.perf_counter()
+            color_mapper.map_distances_to_colors(point_cloud[:, 3])
+            samples['color_map'].append((time.perf_counter() - start) * 1e3)
+
+    def renderer(point_cloud: np.ndarray) -> None:
+        start = time.perf_counter()
+        ax.clear()
+        if plot_mapper is not None:
+            plot_mapper.plot_distance_colors(ax, point_cloud[:, 3], point_cloud[:, 0],
+                                             point_cloud[:, 1], point_cloud[:, 2], 1)
+        else:
+            ax.scatter(point_cloud[:, 0], point_cloud[:, 1], point_cloud[:, 2], s=1)
+        figure.canvas.draw()
+        samples['render'].append((time.perf_counter() - start) * 1e3)
+
+    # 統計消費者不丟幀，以取得每一幀的端到端延遲
+    controller.add_frame_consumer(consumer, BLOCK, 64, name='benchmark')
+    if ax is not None:
+        controller.add_frame_consumer(renderer, LATEST_ONLY, name='render')
+
+    records = build_frame_records(lines)
+    packets_per_frame = len(records)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+
+    if mode == 'udp':
+        controller.data_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        controller.data_socket.bind(('127.0.0.1', 0))
+        target = controller.data_socket.getsockname()
+        controller.data_rx_running = True
+        controller.data_rx_thread = threading.Thread(target=controller._data_rx_loop)
+        controller.data_rx_thread.daemon = True
+        controller.data_rx_thread.start()
+        time.sleep(0.1)
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        next_time = time.perf_counter()
+        for frame_id in range(frames):
+            records['frame_id'] = frame_id & 0xFFFF
+            data = memoryview(records.tobytes())
+            for i in range(packets_per_frame):
+                sender.sendto(data[i * PACKET_SIZE:(i + 1) * PACKET_SIZE], target)
+            controller.last_packet_sent[frame_id & 0xFFFF] = time.monotonic_ns()
+            if fps > 0:
+                next_time += 1.0 / fps
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        sender.close()
+        wall = _wait_for_frames(controller, frames, settle) - wall_start
+        controller.data_rx_running = False
+        controller.data_rx_thread.join(timeout=2.0)
+        controller.data_socket.close()
+    else:
+        # 直接注入：不經過 socket，測量解碼與組裝上限
+        for frame_id in range(frames):
+            records['frame_id'] = frame_id & 0xFFFF
+            data = memoryview(records.tobytes())
+            controller.last_packet_sent[frame_id & 0xFFFF] = time.monotonic_ns()
+            for start in range(0, packets_per_frame, batch_size):
+                count = min(batch_size, packets_per_frame - start)
+                controller.inject_packets(data[start * PACKET_SIZE:(start + count) * PACKET_SIZE],
+                                          np.full(count, PACKET_SIZE, dtype=np.uint16))
+        wall = _wait_for_frames(controller, frames, settle) - wall_start
+    cpu = time.process_time() - cpu_start
+    for consumer_thread in list(controller.frame_consumers):
+        controller.remove_frame_consumer(consumer_thread)
+
+    assembler_stats = controller.frame_assembler.get_stats()
+    frames_out = controller.frame_assembler.frames_completed
+    packets_sent = frames * packets_per_frame
+    ingest = controller.get_ingest_stats() if mode == 'udp' else None
+    # udp 模式以實際收到的封包計算吞吐量；注入模式不經 socket，送出即收到
+    packets_received = ingest['packets'] if ingest is not None else packets_sent
+    result = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'host': platform.node(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+        'config': {'frames': frames, 'lines': lines, 'fps': fps, 'mode': mode,
+                   'batch_size': batch_size, 'ring_depth': ring_depth,
+                   'color_map': color_map, 'render': render},
+        'throughput': {
+            'wall_seconds': wall,
+            'packets_sent': packets_sent,
+            'packets_received': packets_received,
+            'packets_per_second': packets_received / wall if wall else 0.0,
+            'frames_assembled': frames_out,
+            'frames_received': controller.frames_received,
+            'frames_per_second': controller.frames_received / wall if wall else 0.0,
+        },
+        'cpu_ms_per_frame': 1000.0 * cpu / frames_out if frames_out else None,
+        'latency_ms': {stage: percentiles(values) for stage, values in samples.items()},
+        'assembler': assembler_stats,
+        'notes': notes,
+    }
+    if ingest is not None:
+        result['receiver'] = {key: ingest.get(key) for key in (
+            'packets', 'syscalls_per_packet', 'packets_per_batch', 'ring_overruns',
+            'kernel_drops', 'rcvbuf_granted')}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LiDAR 接收效能測試')
+    parser.add_argument('--frames', type=int, default=100, help='送出的幀數')
+    parser.add_argument('--lines', type=int, default=DEFAULT_LINES, help='每幀掃描線數')
+    parser.add_argument('--fps', type=float, default=0.0, help='送出幀率，0 表示不限速')
+    parser.add_argument('--mode', choices=('udp', 'inject'), default='udp',
+                        help='udp: 經過 loopback socket；inject: 直接注入組裝器')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--ring-depth', type=int, default=4096)
+    parser.add_argument('--color-map', action='store_true', help='包含顏色映射階段')
+    parser.add_argument('--render', action='store_true', help='包含 matplotlib 繪圖階段')
+    parser.add_argument('--output', default='ingest_benchmark.json', help='結果 JSON 檔')
+    args = parser.parse_args()
+
+    result = run_benchmark(args.frames, args.lines, args.fps, args.mode, args.batch_size,
+                           args.ring_depth, args.color_map, args.render)
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=4)
+    throughput = result['throughput']
+    print(f"封包/秒: {throughput['packets_per_second']:.0f}  幀/秒: {throughput['frames_per_second']:.1f}  "
+          f"收到/送出封包: {throughput['packets_received']}/{throughput['packets_sent']}")
+    for stage, stats in result['latency_ms'].items():
+        if stats['count']:
+            print(f"  {stage:<10} p50={stats['p50']:.3f}ms p95={stats['p95']:.3f}ms p99={stats['p99']:.3f}ms")
+    print(f"結果已寫入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
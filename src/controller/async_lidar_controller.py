@@ -0,0 +1,363 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.controller.command_tracker import (CommandError, CommandResponse, CommandTimeout,
+                                            RESULT_BUSY, RESULT_OK, RETRY_DELAY,
+                                            build_command_packet, parse_command_response)
+from src.controller.packet_ring import PacketRing
+from src.data.packet_decoder import decode_packets, PACKET_SIZE, PACKET_TYPE_D, PACKET_TYPE_E
+from src.data.frame_assembler import (FrameAssembler, RangeFrame, DEFAULT_LINES,
+                                      DEFAULT_WINDOW, DEFAULT_TIMEOUT)
+from src.data.point_cloud import range_image_to_point_cloud
+
+
+class _ControlProtocol(asyncio.DatagramProtocol):
+    """控制端口(8880)協議：轉交給控制器處理回應"""
+
+    def __init__(self, controller: 'AsyncLidarController'):
+        self.controller = controller
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        self.controller._handle_response(data)
+
+    def error_received(self, exc: Exception) -> None:
+        print(f"[8880接收錯誤] {exc}")
+
+
+class _DataProtocol(asyncio.DatagramProtocol):
+    """數據端口(8881)協議：將數據報複製進環形緩衝區，由事件循環批次組裝"""
+
+    def __init__(self, controller: 'AsyncLidarController'):
+        self.controller = controller
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        self.controller._enqueue_data(data)
+
+    def error_received(self, exc: Exception) -> None:
+        print(f"[8881接收錯誤] {exc}")
+
+
+class AsyncLidarController:
+    """基於 asyncio 的 LiDAR 控制器
+
+    以 loop.create_datagram_endpoint 同時監聽控制端口與數據端口，不需要每個 socket 一個線程；
+    同一個事件循環可同時服務多台設備與多個消費者。指令方法皆可 await，
+    完成的幀以 `async for frame in ctl.frames()` 取得。
+
+        async with AsyncLidarController.from_config() as ctl:
+            await ctl.start_data_transmission()
+            async for frame in ctl.frames():
+                point_cloud = ctl.to_point_cloud(frame)
+    """
+
+    def __init__(self, local_addr: Tuple[str, int] = ("192.168.2.194", 8880),
+                 remote_addr: Tuple[str, int] = ("192.168.2.10", 8880),
+                 data_port: int = 8881, scan_lines: int = DEFAULT_LINES,
+                 frame_window: int = DEFAULT_WINDOW, frame_timeout: float = DEFAULT_TIMEOUT,
+                 ring_depth: int = 2048, command_timeout: float = 1.0, command_retries: int = 2,
+                 command_echo: bool = False):
+        self.local_addr = local_addr
+        self.remote_addr = remote_addr
+        self.data_port = data_port
+        self.command_timeout = command_timeout  # 每次發送等待指令回應的時間 (秒)
+        self.command_retries = command_retries  # 逾時或系統忙時的重送次數
+        self.command_echo = command_echo  # 設備回應是否回傳指令碼（否則指令逐一發送，依順序配對）
+        self.horizontal_range = [-30.0, 30.0]  # 水平角度範圍 (度)
+        self.vertical_range = [-15.0, 15.0]    # 垂直角度範圍 (度)
+        self.connected: bool = False
+        self.current_frame_id = None
+        self.last_status: Optional[Dict[str, int]] = None
+
+        self.ring = PacketRing(ring_depth)
+        self.frame_assembler = FrameAssembler(scan_lines, frame_window, frame_timeout,
+                                              on_frame=self._emit_frame)
+        self._control_transport: Optional[asyncio.DatagramTransport] = None
+        self._data_transport: Optional[asyncio.DatagramTransport] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._drain_scheduled = False
+        self._poll_task: Optional[asyncio.Task] = None
+        self._pending: Dict[Optional[int], List[asyncio.Future]] = {}  # 指令碼 (無回傳時為 None) -> 等待中的指令
+        self._command_lock = asyncio.Lock()  # command_echo=False 時一次只有一個指令等待回應
+        self._frame_queues: List[asyncio.Queue] = []
+        self.response_handlers = {}
+
+    @classmethod
+    def from_config(cls, path: str = 'etherInform.json', **kwargs) -> 'AsyncLidarController':
+        """由 etherInform.json 建立控制器（欄位與 LidarController 相同）"""
+        try:
+            with open(path, 'r') as f:
+                config = json.load(f)
+        except FileNotFoundError:
+            return cls(**kwargs)
+        options = {
+            'local_addr': (config['localIP'], config['port']),
+            'remote_addr': (config['remoteIP'], config['port']),
+            'data_port': config.get('dataPort', 8881),
+            'scan_lines': config.get('scanLines', DEFAULT_LINES),
+            'frame_window': config.get('frameWindow', DEFAULT_WINDOW),
+            'frame_timeout': config.get('frameTimeout', DEFAULT_TIMEOUT),
+            'ring_depth': config.get('ringDepth', 2048),
+            'command_timeout': config.get('commandTimeout', 1.0),
+            'command_retries': config.get('commandRetries', 2),
+            'command_echo': config.get('commandEcho', False),
+        }
+        options.update(kwargs)
+        return cls(**options)
+
+    async def connect(self) -> bool:
+        """綁定控制與數據端口"""
+        self._loop = asyncio.get_running_loop()
+        try:
+            self._control_transport, _ = await self._loop.create_datagram_endpoint(
+                lambda: _ControlProtocol(self), local_addr=self.local_addr)
+            print(f"[綁定成功] 控制端口: {self.local_addr}")
+            self._data_transport, _ = await self._loop.create_datagram_endpoint(
+                lambda: _DataProtocol(self), local_addr=(self.local_addr[0], self.data_port))
+            print(f"[綁定成功] 數據端口: ({self.local_addr[0]}, {self.data_port})")
+        except OSError as e:
+            print(f"連接錯誤: {e}")
+            self.close()
+            return False
+        self.ring.clear()
+        self.frame_assembler.reset()
+        self._poll_task = self._loop.create_task(self._poll_loop())
+        self.connected = True
+        return True
+
+    def close(self) -> None:
+        """關閉端口並結束所有幀迭代器"""
+        self.connected = False
+        for transport in (self._control_transport, self._data_transport):
+            if transport is not None:
+                transport.close()
+        self._control_transport = self._data_transport = None
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+        for futures in self._pending.values():
+            for future in futures:
+                future.cancel()
+        self._pending.clear()
+        for queue in self._frame_queues:
+            self._offer(queue, None)
+
+    async def __aenter__(self) -> 'AsyncLidarController':
+        if not await self.connect():
+            raise OSError("無法綁定 LiDAR 端口")
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+    # 指令
+    def _send(self, data: bytes) -> None:
+        if not self.connected:
+            return
+        try:
+            self._control_transport.sendto(data, self.remote_addr)
+        except Exception as e:
+            print(f"發送錯誤: {e}")
+
+    async def send_command(self, command_code: int, params: bytes = b'',
+                           timeout: Optional[float] = None, retries: Optional[int] = None) -> bytes:
+        """發送指令並等待回應，返回回應資料
+
+        command_echo 時依回傳的指令碼配對，否則等前一個指令完成後才發送，回應依順序配對。
+        逾時或系統忙時重送，次數用完仍失敗則拋出 CommandTimeout；其他回應碼拋出 CommandError。
+        """
+        if not self.connected:
+            raise CommandError(command_code, message='未連接')
+        if self.command_echo:
+            return await self._send_command(command_code, params, timeout, retries)
+        async with self._command_lock:
+            return await self._send_command(command_code, params, timeout, retries)
+
+    async def _send_command(self, command_code: int, params: bytes, timeout: Optional[float],
+                            retries: Optional[int]) -> bytes:
+        key = command_code if self.command_echo else None
+        packet = build_command_packet(command_code, params)
+        timeout = self.command_timeout if timeout is None else timeout
+        retries = self.command_retries if retries is None else retries
+        for attempt in range(retries + 1):
+            future = self._loop.create_future()
+            self._pending.setdefault(key, []).append(future)
+            self._send(packet)
+            try:
+                response: CommandResponse = await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                if attempt < retries:
+                    print(f"[指令重送] 0x{command_code:02X} 第 {attempt + 2} 次")
+                continue
+            finally:
+                waiters = self._pending.get(key)
+                if waiters and future in waiters:
+                    waiters.remove(future)
+            if response.result == RESULT_OK:
+                return response.payload
+            if response.result != RESULT_BUSY or attempt == retries:
+                raise CommandError(command_code, response.result)
+            await asyncio.sleep(RETRY_DELAY * (attempt + 1))
+        print(f"[指令逾時] 0x{command_code:02X}")
+        raise CommandTimeout(command_code, retries + 1)
+
+    def register_response_handler(self, response_code: int, handler: callable) -> None:
+        """註冊回應處理函數"""
+        self.response_handlers[response_code] = handler
+
+    async def system_reset(self) -> bytes:
+        """系統重置 (0x01)"""
+        return await self.send_command(0x01)
+
+    async def get_device_info(self) -> bytes:
+        """獲取設備信息 (0x03)"""
+        return await self.send_command(0x03)
+
+    async def set_system_mode(self, mode: int) -> bytes:
+        """設定系統模式 (0x11)"""
+        return await self.send_command(0x11, bytes([mode]))
+
+    async def start_motors(self) -> bytes:
+        """開始馬達運行 (0x20)"""
+        return await self.send_command(0x20)
+
+    async def stop_motors(self) -> bytes:
+        """停止馬達運行 (0x21)"""
+        return await self.send_command(0x21)
+
+    async def set_motor_speed(self, speed: int) -> bytes:
+        """設定BLDC馬達轉速 (0x22)"""
+        return await self.send_command(0x22, speed.to_bytes(2, 'big'))
+
+    async def set_scan_range(self, start_angle: int, end_angle: int) -> bytes:
+        """設定水平掃描範圍 (0x40)，設備接受後才更新點雲轉換用的角度"""
+        params = start_angle.to_bytes(2, 'big', signed=True) + end_angle.to_bytes(2, 'big', signed=True)
+        result = await self.send_command(0x40, params)
+        self.horizontal_range = [start_angle / 10.0, end_angle / 10.0]
+        return result
+
+    async def set_vertical_scan_range(self, start_angle: int, end_angle: int) -> bytes:
+        """設定垂直掃描範圍 (0x41)，設備接受後才更新點雲轉換用的角度"""
+        params = start_angle.to_bytes(2, 'big', signed=True) + end_angle.to_bytes(2, 'big', signed=True)
+        result = await self.send_command(0x41, params)
+        self.vertical_range = [start_angle / 10.0, end_angle / 10.0]
+        return result
+
+    async def set_laser_power(self, power: int) -> bytes:
+        """設定雷射功率 (0x51)"""
+        return await self.send_command(0x51, bytes([power]))
+
+    async def start_data_transmission(self) -> None:
+        """開始數據傳輸 (scanxy 1)"""
+        self._send(b'scanxy 1')
+
+    async def stop_data_transmission(self) -> None:
+        """停止數據傳輸 (scanxy 0)，並輸出組裝中的幀"""
+        self._send(b'scanxy 0')
+        self._drain()
+        self.frame_assembler.flush()
+
+    async def set_data_format(self, fmt: int) -> bytes:
+        """設定數據格式 (0x72)，0=距離資料, 1=強度資料, 2=距離+強度"""
+        return await self.send_command(0x72, bytes([fmt]))
+
+    async def set_packet_split_mode(self, mode: int) -> bytes:
+        """設定封包分割模式 (0x74)，0=完整幀傳輸, 1=分割傳輸"""
+        return await self.send_command(0x74, bytes([mode]))
+
+    # 接收
+    def _handle_response(self, data: bytes) -> None:
+        """處理控制端口封包：狀態、掃描數據或指令回應"""
+        if len(data) < 3 or data[0:2] != b'\xAA\x55':
+            return
+        if len(data) >= 7 and data[2] == 0xFF:
+            self.last_status = {'status': data[3], 'error': data[4],
+                                'mode': data[5], 'temperature': data[6]}
+            return
+        if len(data) >= PACKET_SIZE:
+            self._enqueue_data(data)
+            return
+        response = parse_command_response(data, self.command_echo)
+        if response is None:
+            return
+        waiters = self._pending.get(response.command)
+        while waiters:
+            future = waiters.pop(0)
+            if not future.done():
+                future.set_result(response)
+                break
+        if response.result in self.response_handlers:
+            self.response_handlers[response.result](data[3:])
+
+    def _enqueue_data(self, data: bytes) -> None:
+        """寫入環形緩衝區，同一輪事件循環內收到的數據報合併為一次批次解碼"""
+        slot = self.ring.write_slot()
+        nbytes = min(len(data), len(slot))
+        slot[:nbytes] = data[:nbytes]
+        self.ring.commit(nbytes)
+        if not self._drain_scheduled:
+            self._drain_scheduled = True
+            self._loop.call_soon(self._drain)
+
+    def _drain(self) -> None:
+        """批次解碼環形緩衝區中的封包並寫入幀組裝器"""
+        self._drain_scheduled = False
+        span = self.ring.read_span()
+        while span is not None:
+            data, lengths = span
+            decoded = decode_packets(data, len(lengths))
+            mask = decoded.valid & (lengths == PACKET_SIZE)
+            mask &= (decoded.packet_type == PACKET_TYPE_D) | (decoded.packet_type == PACKET_TYPE_E)
+            self.frame_assembler.add_packets(decoded, mask)
+            self.ring.release(len(lengths))
+            span = self.ring.read_span()
+
+    async def _poll_loop(self) -> None:
+        """定期結束逾時的幀"""
+        interval = min(1.0, self.frame_assembler.timeout) / 2
+        while True:
+            await asyncio.sleep(interval)
+            self.frame_assembler.poll()
+
+    def _emit_frame(self, frame: RangeFrame) -> None:
+        """將完成的幀複製後分發給各迭代器（組裝器緩衝區會被重用）"""
+        self.current_frame_id = frame.frame_id
+        if not self._frame_queues:
+            return
+        frame = frame._replace(distances=frame.distances.copy(), line_mask=frame.line_mask.copy())
+        for queue in self._frame_queues:
+            self._offer(queue, frame)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, item: Any) -> None:
+        """放入佇列，佇列滿時丟棄最舊的幀"""
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(item)
+
+    async def frames(self, maxsize: int = 4) -> AsyncIterator[RangeFrame]:
+        """非同步幀迭代器；消費過慢時只保留最新的 maxsize 幀，close() 後結束"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._frame_queues.append(queue)
+        try:
+            while True:
+                frame = await queue.get()
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self._frame_queues.remove(queue)
+
+    def to_point_cloud(self, frame: RangeFrame) -> np.ndarray:
+        """將幀轉為 (N, 6) 點雲"""
+        return range_image_to_point_cloud(frame.distances, frame.line_mask,
+                                          self.horizontal_range, self.vertical_range)
+
+    def get_ingest_stats(self) -> Dict[str, Any]:
+        """取得幀組裝統計"""
+        stats = self.frame_assembler.get_stats()
+        stats['ring_overruns'] = self.ring.overruns
+        stats['iterators'] = len(self._frame_queues)
+        return stats
@@ -0,0 +1,82 @@
+import select
+import socket
+import time
+from typing import Dict, Any
+
+from src.controller.packet_ring import PacketRing
+
+
+class BatchReceiver:
+    """批次接收UDP數據報（recvmmsg風格）
+
+    每次喚醒後盡量取出socket中已排隊的數據報，以 recv_into 直接寫入
+    PacketRing 的槽位，避免逐包 recvfrom / settimeout 的呼叫開銷。
+    """
+
+    def __init__(self, sock: socket.socket, ring: PacketRing,
+                 batch_size: int = 64, timeout: float = 1.0):
+        self.sock = sock
+        self.ring = ring
+        self.batch_size = batch_size
+        self.timeout = timeout
+        # 只設定一次：改為非阻塞，等待交給 select
+        self.sock.setblocking(False)
+
+        # 統計計數
+        self.total_packets = 0
+        self.total_bytes = 0
+        self.total_syscalls = 0
+        self.total_batches = 0
+        self._rate_start = time.monotonic()
+        self._rate_packets = 0
+        self.packets_per_second = 0.0
+
+    def receive_batch(self) -> int:
+        """等待數據並批次取出，返回本次取得的數據報數量（逾時返回0）"""
+        readable, _, _ = select.select([self.sock], [], [], self.timeout)
+        self.total_syscalls += 1
+        if not readable:
+            self._update_rate()
+            return 0
+
+        count = 0
+        ring = self.ring
+        while count < self.batch_size:
+            try:
+                nbytes = self.sock.recv_into(ring.write_slot())
+            except (BlockingIOError, InterruptedError):
+                self.total_syscalls += 1
+                break
+            self.total_syscalls += 1
+            ring.commit(nbytes, time.monotonic_ns())
+            self.total_bytes += nbytes
+            count += 1
+
+        if count:
+            self.total_packets += count
+            self.total_batches += 1
+        self._update_rate()
+        return count
+
+    def _update_rate(self) -> None:
+        """每秒更新一次封包速率"""
+        now = time.monotonic()
+        elapsed = now - self._rate_start
+        if elapsed >= 1.0:
+            self.packets_per_second = (self.total_packets - self._rate_packets) / elapsed
+            self._rate_packets = self.total_packets
+            self._rate_start = now
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得接收統計"""
+        packets = self.total_packets
+        return {
+            'packets': packets,
+            'bytes': self.total_bytes,
+            'batches': self.total_batches,
+            'syscalls': self.total_syscalls,
+            'packets_per_second': self.packets_per_second,
+            'syscalls_per_packet': self.total_syscalls / packets if packets else 0.0,
+            'packets_per_batch': packets / self.total_batches if self.total_batches else 0.0,
+            'ring_overruns': self.ring.overruns,
+        }
@@ -0,0 +1,142 @@
+"""依設備回覆推進的文字指令序列
+
+每一步發送後等待完成條件，而不是固定 sleep：
+    WAIT_TEXT    收到文字回覆（可指定須包含的字串）
+    WAIT_DATA    收到第一個數據封包
+    WAIT_STATUS  狀態封包的狀態碼改變（可指定目標狀態碼）
+    WAIT_NONE    發送後立即進行下一步
+每一步有各自的期限，逾時依 stop_on_timeout 決定中止序列或繼續下一步。
+設備回覆只代表指令已收到時（如 stephomeup、startbldc 沒有「完成」回覆），以 settle 指定發送後至少等待的
+時間，讓硬體動作完成後才進行下一步。
+接收線程以 on_text / on_data_packet / on_status 通知序列器。
+"""
+import threading
+import time
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+from src.data.packet_decoder import FRAME_HEADER
+
+WAIT_TEXT = 'text'
+WAIT_DATA = 'data'
+WAIT_STATUS = 'status'
+WAIT_NONE = 'none'
+
+
+class SequenceStep(NamedTuple):
+    command: str                   # 文字指令
+    wait: str = WAIT_TEXT          # 完成條件
+    expect: Optional[str] = None   # WAIT_TEXT 時回覆須包含的字串
+    status: Optional[int] = None   # WAIT_STATUS 時的目標狀態碼，None 表示任何變化
+    deadline: float = 2.0          # 等待期限 (秒)
+    settle: float = 0.0            # 發送後至少等待的時間 (秒)，用於沒有完成訊號的硬體動作
+
+
+class StepResult(NamedTuple):
+    command: str
+    ok: bool
+    elapsed: float    # 發送到完成條件成立的時間 (秒)
+    response: str     # 等待期間收到的文字回覆
+
+
+# 完整啟動序列：回原點、啟動無刷馬達、開始掃描並等到第一個數據封包
+# 回原點與馬達加速沒有完成回覆，保留原本的 2 秒作為最短等待時間
+START_SEQUENCE = (
+    SequenceStep('stephomeup', deadline=5.0, settle=2.0),
+    SequenceStep('startbldc 0 1000', deadline=3.0, settle=2.0),
+    SequenceStep('scanxy 1', wait=WAIT_DATA, deadline=3.0),
+)
+# 完整停止序列（馬達減速同樣沒有完成回覆）
+STOP_SEQUENCE = (
+    SequenceStep('scanxy 0'),
+    SequenceStep('stopbldc', settle=1.0),
+    SequenceStep('stopfire', expect='stopfire'),
+)
+
+
+class CommandSequencer:
+    """依序發送文字指令，每一步等到完成條件成立或期限到才進行下一步"""
+
+    def __init__(self, send: Callable[[bytes], None]):
+        self.send = send
+        self._cond = threading.Condition()
+        self._text: List[str] = []
+        self._data_packets = 0
+        self._status: Optional[int] = None
+        self._status_changes = 0
+
+    # 接收線程通知
+    def on_text(self, text: str) -> None:
+        with self._cond:
+            self._text.append(text)
+            self._cond.notify_all()
+
+    def on_data_packet(self) -> None:
+        with self._cond:
+            self._data_packets += 1
+            self._cond.notify_all()
+
+    def on_status(self, status: int) -> None:
+        with self._cond:
+            if status != self._status:
+                self._status = status
+                self._status_changes += 1
+                self._cond.notify_all()
+
+    def on_datagram(self, data: bytes) -> None:
+        """依內容分辨狀態封包 (AA 55 FF)、數據封包 (0xAA55 小端序) 或文字回覆"""
+        if len(data) < 2:
+            self.on_text(data.decode(errors='replace'))
+        elif data[0] | data[1] << 8 == FRAME_HEADER:
+            self.on_data_packet()
+        elif data[0] == 0xAA and data[1] == 0x55:
+            if len(data) >= 7 and data[2] == 0xFF:
+                self.on_status(data[3])
+        else:
+            self.on_text(data.decode(errors='replace'))
+
+    def run_step(self, step: SequenceStep) -> StepResult:
+        """發送一步並等待其完成條件"""
+        with self._cond:
+            text_mark = len(self._text)
+            data_mark = self._data_packets
+            status_mark = self._status_changes
+
+        def replies() -> str:
+            return ''.join(self._text[text_mark:])
+
+        def done() -> bool:
+            if step.wait == WAIT_TEXT:
+                text = replies()
+                return bool(text) if step.expect is None else step.expect in text
+            if step.wait == WAIT_DATA:
+                return self._data_packets > data_mark
+            if step.wait == WAIT_STATUS:
+                if step.status is None:
+                    return self._status_changes > status_mark
+                return self._status == step.status
+            return True
+
+        start = time.monotonic()
+        self.send(step.command.encode())
+        with self._cond:
+            ok = self._cond.wait_for(done, step.deadline)
+            response = replies()
+            if len(self._text) > 256:
+                del self._text[:text_mark]
+        remaining = step.settle - (time.monotonic() - start)
+        if ok and remaining > 0:
+            time.sleep(remaining)
+        return StepResult(step.command, ok, time.monotonic() - start, response)
+
+    def run(self, steps: Sequence[SequenceStep], stop_on_timeout: bool = True,
+            on_step: Optional[Callable[[StepResult], None]] = None) -> List[StepResult]:
+        """執行整個序列，返回每一步的結果；stop_on_timeout 時第一個逾時的步驟後中止"""
+        results = []
+        for step in steps:
+            result = self.run_step(step)
+            results.append(result)
+            if on_step is not None:
+                on_step(result)
+            if not result.ok and stop_on_timeout:
+                break
+        return results
@@ -0,0 +1,271 @@
+"""二進位指令與回應配對
+
+回應格式（lidar_command_set.md 1.1）: 0xAA55 | 回應碼(1) | 資料長度(1) | 資料(n) | 校驗和(1)，
+回應本身不含指令碼，因此預設一次只讓一個指令等待回應，其餘依提交順序排隊，回應一律配對給最早的指令。
+設備韌體若在資料的第一個字節回傳指令碼（echo=True，etherInform.json 的 commandEcho），
+則多個指令可同時發送，依回傳的指令碼配對；同一指令碼同時有多筆時依發送順序配對。
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional
+
+# 回應碼
+RESULT_OK = 0x00
+RESULT_PARAM_ERROR = 0x01
+RESULT_BUSY = 0x02
+RESULT_HARDWARE_ERROR = 0x03
+RESULT_UNSUPPORTED = 0x04
+RESULT_UNKNOWN = 0xFF
+RESULT_NAMES = {
+    RESULT_OK: '命令執行成功',
+    RESULT_PARAM_ERROR: '參數錯誤',
+    RESULT_BUSY: '系統忙',
+    RESULT_HARDWARE_ERROR: '硬體錯誤',
+    RESULT_UNSUPPORTED: '指令不支援',
+    RESULT_UNKNOWN: '未知錯誤',
+}
+RETRY_DELAY = 0.05  # 系統忙時重送前的等待時間 (秒)
+
+
+def build_command_packet(command_code: int, params: bytes = b'') -> bytes:
+    """構建指令包: Header(0xAA55) + 指令碼(1) + 參數長度(1) + 參數 + 校驗和(1)"""
+    packet = bytearray([0xAA, 0x55, command_code, len(params)])
+    packet.extend(params)
+    
+    # 計算校驗和
+    checksum = 0
+    for b in packet[2:]:
+        checksum += b
+    checksum = (~checksum + 1) & 0xFF
+    packet.append(checksum)
+    return bytes(packet)
+
+
+class CommandError(Exception):
+    """指令執行失敗（設備返回非 0x00 回應碼）"""
+
+    def __init__(self, command_code: int, result_code: Optional[int] = None,
+                 message: Optional[str] = None):
+        self.command_code = command_code
+        self.result_code = result_code
+        if message is None:
+            message = RESULT_NAMES.get(result_code, f'回應碼 0x{result_code:02X}')
+        super().__init__(f"指令 0x{command_code:02X}: {message}")
+
+
+class CommandTimeout(CommandError):
+    """重試次數用完仍未收到回應"""
+
+    def __init__(self, command_code: int, attempts: int):
+        super().__init__(command_code, None, f'{attempts} 次發送皆未收到回應')
+        self.attempts = attempts
+
+
+class CommandResponse(NamedTuple):
+    result: int                # 回應碼
+    command: Optional[int]     # 設備回傳的指令碼，無回傳 (echo=False) 時為 None
+    payload: bytes             # 回應資料（echo=True 時不含指令碼）
+
+
+def parse_command_response(data: bytes, echo: bool = False) -> Optional[CommandResponse]:
+    """解析指令回應，格式或校驗和不符時返回 None"""
+    if len(data) < 5 or data[0] != 0xAA or data[1] != 0x55:
+        return None
+    length = data[3]
+    if length < (1 if echo else 0) or len(data) < 5 + length:
+        return None
+    if sum(data[2:5 + length]) & 0xFF:  # 校驗和為總和的補數，加總後應為 0
+        return None
+    if echo:
+        return CommandResponse(data[2], data[4], bytes(data[5:4 + length]))
+    return CommandResponse(data[2], None, bytes(data[4:4 + length]))
+
+
+class _PendingCommand:
+    __slots__ = ('command_code', 'packet', 'future', 'timeout', 'retries_left', 'attempts', 'deadline')
+
+    def __init__(self, command_code: int, packet: bytes, future: Future, timeout: float, retries: int):
+        self.command_code = command_code
+        self.packet = packet
+        self.future = future
+        self.timeout = timeout
+        self.retries_left = retries
+        self.attempts = 0
+        self.deadline = 0.0
+
+
+class CommandTracker:
+    """為每個指令建立 Future，收到回應時完成，逾時依次數上限重送
+
+    echo=False 時指令依提交順序逐一發送，前一個完成（或逾時）後才發送下一個；echo=True 時可同時等待多個回應。
+    逾時與重送由單一背景線程依最近的期限處理。send 由呼叫端提供（通常為 socket.sendto），在鎖外呼叫。
+    """
+
+    def __init__(self, send: Callable[[bytes], None], timeout: float = 1.0, retries: int = 2,
+                 echo: bool = False):
+        self.send = send
+        self.timeout = timeout  # 每次發送等待回應的時間 (秒)
+        self.retries = retries  # 逾時或系統忙時的重送次數上限
+        self.echo = echo  # 設備是否在回應中回傳指令碼
+        # 指令碼 -> 等待中的指令；echo=False 時全部放在 None 之下，依提交順序排隊
+        self._pending: Dict[Optional[int], Deque[_PendingCommand]] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        # 統計計數
+        self.sent = 0
+        self.retransmits = 0
+        self.completed = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.unmatched = 0
+
+    def submit(self, command_code: int, params: bytes = b'', timeout: Optional[float] = None,
+               retries: Optional[int] = None) -> Future:
+        """發送指令，返回在回應到達時完成的 Future（結果為回應資料）"""
+        future: Future = Future()
+        entry = _PendingCommand(command_code, build_command_packet(command_code, params), future,
+                                self.timeout if timeout is None else timeout,
+                                self.retries if retries is None else retries)
+        with self._cond:
+            self._running = True
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._timer_loop, name='command-tracker')
+                self._thread.daemon = True
+                self._thread.start()
+            entry.deadline = time.monotonic() + entry.timeout  # 加入前設定期限，避免計時線程立即重送
+            waiters = self._pending.setdefault(self._key(entry), deque())
+            waiters.append(entry)
+            send_now = self.echo or len(waiters) == 1
+        if send_now:
+            self._transmit(entry)
+        return future
+
+    def _key(self, entry: _PendingCommand) -> Optional[int]:
+        return entry.command_code if self.echo else None
+
+    def _transmit(self, entry: _PendingCommand) -> None:
+        with self._cond:
+            entry.attempts += 1
+            entry.deadline = time.monotonic() + entry.timeout
+            self.sent += 1
+            self._cond.notify()
+        try:
+            self.send(entry.packet)
+        except Exception as e:
+            self._finish(entry, exception=CommandError(entry.command_code, message=f'發送錯誤: {e}'))
+
+    def _finish(self, entry: _PendingCommand, result: Optional[bytes] = None,
+                exception: Optional[Exception] = None) -> None:
+        with self._cond:
+            waiters = self._pending.get(self._key(entry))
+            if waiters is None or entry not in waiters:
+                return
+            waiters.remove(entry)
+            if not waiters:
+                del self._pending[self._key(entry)]
+            # 逐一發送時由下一個排隊中的指令接手
+            following = waiters[0] if waiters and waiters[0].attempts == 0 else None
+            if not entry.future.cancelled():
+                if exception is None:
+                    self.completed += 1
+                elif isinstance(exception, CommandTimeout):
+                    self.timeouts += 1
+                else:
+                    self.errors += 1
+        if following is not None:
+            self._transmit(following)
+        if entry.future.cancelled():
+            return
+        if exception is None:
+            entry.future.set_result(result)
+        else:
+            entry.future.set_exception(exception)
+
+    def handle_response(self, response: CommandResponse) -> bool:
+        """配對回應，返回是否有等待中的指令"""
+        with self._cond:
+            waiters = self._pending.get(response.command if self.echo else None)
+            entry = waiters[0] if waiters and waiters[0].attempts else None
+            if entry is None:
+                self.unmatched += 1
+                return False
+            if response.result == RESULT_BUSY and entry.retries_left > 0:
+                entry.deadline = time.monotonic() + RETRY_DELAY * entry.attempts
+                self._cond.notify()
+                return True
+        if response.result == RESULT_OK:
+            self._finish(entry, result=response.payload)
+        else:
+            self._finish(entry, exception=CommandError(entry.command_code, response.result))
+        return True
+
+    def _timer_loop(self) -> None:
+        with self._cond:
+            while self._running:
+                now = time.monotonic()
+                expired: List[_PendingCommand] = []
+                next_deadline = None
+                for waiters in self._pending.values():
+                    for entry in waiters:
+                        if not entry.attempts:
+                            continue  # 排隊中尚未發送
+                        if entry.deadline <= now:
+                            expired.append(entry)
+                        elif next_deadline is None or entry.deadline < next_deadline:
+                            next_deadline = entry.deadline
+                if not expired:
+                    self._cond.wait(None if next_deadline is None else next_deadline - now)
+                    continue
+                self._cond.release()
+                try:
+                    for entry in expired:
+                        self._expire(entry)
+                finally:
+                    self._cond.acquire()
+
+    def _expire(self, entry: _PendingCommand) -> None:
+        with self._cond:
+            waiters = self._pending.get(self._key(entry))
+            if waiters is None or entry not in waiters or entry.deadline > time.monotonic():
+                return  # 已完成或期限已被延後
+            retry = entry.retries_left > 0 and not entry.future.cancelled()
+            if retry:
+                entry.retries_left -= 1
+                self.retransmits += 1
+        if entry.future.cancelled():
+            self._finish(entry)
+        elif retry:
+            print(f"[指令重送] 0x{entry.command_code:02X} 第 {entry.attempts + 1} 次")
+            self._transmit(entry)
+        else:
+            print(f"[指令逾時] 0x{entry.command_code:02X}")
+            self._finish(entry, exception=CommandTimeout(entry.command_code, entry.attempts))
+
+    def cancel_all(self) -> None:
+        """取消所有等待中的指令並結束背景線程"""
+        with self._cond:
+            entries = [entry for waiters in self._pending.values() for entry in waiters]
+            self._pending.clear()
+            self._running = False
+            self._cond.notify()
+        for entry in entries:
+            entry.future.cancel()
+
+    def in_flight(self) -> int:
+        with self._cond:
+            return sum(len(waiters) for waiters in self._pending.values())
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'sent': self.sent,
+            'retransmits': self.retransmits,
+            'completed': self.completed,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'unmatched': self.unmatched,
+            'in_flight': self.in_flight(),
+        }
@@ -2,7 +2,24 @@ import socket
 import json
 import threading
 import time
-from typing import Optional, Tuple, Dict, Any
+from concurrent.futures import Future
+from typing import Optional, Tuple, Dict, Any, List
+
+import numpy as np
+
+from src.controller.batch_receiver import BatchReceiver
+from src.controller.command_tracker import CommandError, CommandTracker, parse_command_response
+from src.controller.packet_ring import PacketRing
+from src.controller.pipeline import BoundedQueue, FrameConsumer, DROP_OLDEST, LATEST_ONLY
+from src.data.packet_decoder import decode_packets, PACKET_SIZE, PACKET_TYPE_D, PACKET_TYPE_E
+from src.data.frame_assembler import (FrameAssembler, RangeFrame, DEFAULT_LINES,
+                                      DEFAULT_WINDOW, DEFAULT_TIMEOUT)
+from src.data.frame_recorder import FrameRecorder
+from src.data.packet_recorder import PacketRecorder
+from src.data.range_codec import CODEC_NONE
+from src.data.point_cloud import range_image_to_point_cloud
+from src.monitor.socket_stats import KernelDropSampler, set_receive_buffer
+
 
 class LidarController:
     def __init__(self, processor):
@@ -18,17 +35,45 @@ class LidarController:
         self.tx_running: bool = False
         self.command_queue = []
         self.response_handlers = {}
-        self.frame_packets = {}
-        self.last_frame_id = None
         self.on_new_frame = None  # UI callback
         self.data_socket: Optional[socket.socket] = None
         self.data_rx_thread: Optional[threading.Thread] = None
         self.data_rx_running: bool = False
-        self.frame_buffer = {}  # {frame_id: {y_scan: {'d': d_packet, 'e': e_packet}}}
         self.current_frame_id = None
+        self.scan_lines: int = DEFAULT_LINES  # 每幀掃描線數
+        self.horizontal_range = [-30.0, 30.0]  # 水平角度範圍 (度)
+        self.vertical_range = [-15.0, 15.0]    # 垂直角度範圍 (度)
+        self.frame_window: int = DEFAULT_WINDOW  # 同時組裝中的幀數上限
+        self.frame_timeout: float = DEFAULT_TIMEOUT  # 幀逾時 (秒)
+        self.assembler_lock = threading.Lock()
+        self.rx_batch_size: int = 64  # 每次喚醒最多取出的數據報數量
+        self.ring_depth: int = 2048  # 封包環形緩衝區槽位數
+        self.rx_buffer_size: int = 4 * 1024 * 1024  # 數據 socket 請求的 SO_RCVBUF (字節)
+        self.drop_sampler: Optional[KernelDropSampler] = None
+        self.recorder: Optional[PacketRecorder] = None  # 原始封包錄製
+        self.frame_recorder: Optional[FrameRecorder] = None  # 組裝完成的幀錄製
+        self.record_policy: str = DROP_OLDEST  # 幀錄製佇列滿時的背壓策略
+        self.record_queue_size: int = 64  # 幀錄製佇列長度
+        self.record_codec: str = CODEC_NONE  # 幀錄製壓縮方式 (none/zlib/lzma)
+        self.record_codec_level: int = 1  # 幀錄製壓縮等級，越高壓縮率越高但越慢
+        self.data_receiver: Optional[BatchReceiver] = None
+        self.packet_ring: Optional[PacketRing] = None
+        self.assembly_thread: Optional[threading.Thread] = None
+        self.data_ready = threading.Event()  # 接收線程通知組裝線程有新封包
+        self.frame_consumers: List[FrameConsumer] = []
+        self._ui_consumer: Optional[FrameConsumer] = None
+        # 狀態封包佇列：接收線程只放入不等待，由 LidarMonitor.attach 在背景取出
+        self.status_queue = BoundedQueue(maxsize=4096, policy=DROP_OLDEST)
+        self.command_timeout: float = 1.0  # 每次發送等待指令回應的時間 (秒)
+        self.command_retries: int = 2  # 指令逾時或系統忙時的重送次數
+        self.command_echo: bool = False  # 設備回應是否回傳指令碼（否則指令逐一發送，依順序配對）
         
         # 載入配置
         self.load_config()
+        self.command_tracker = CommandTracker(self._send_packet, self.command_timeout,
+                                              self.command_retries, self.command_echo)
+        self.frame_assembler = FrameAssembler(
+            self.scan_lines, self.frame_window, self.frame_timeout, on_frame=self._emit_frame)
     
     def load_config(self) -> None:
         """載入網路配置"""
@@ -40,7 +85,20 @@ class LidarController:
                 self.remote_addr = (config['remoteIP'], config['port'])
                 # 讀取數據端口配置，如果不存在則使用默認值8881
                 self.data_port = config.get('dataPort', 8881)
-        except FileNotFoundError:
+                self.rx_batch_size = config.get('rxBatchSize', 64)
+                self.ring_depth = config.get('ringDepth', 2048)
+                self.rx_buffer_size = config.get('rxBufferSize', 4 * 1024 * 1024)
+                self.scan_lines = config.get('scanLines', DEFAULT_LINES)
+                self.frame_window = config.get('frameWindow', DEFAULT_WINDOW)
+                self.frame_timeout = config.get('frameTimeout', DEFAULT_TIMEOUT)
+                self.command_timeout = config.get('commandTimeout', 1.0)
+                self.command_retries = config.get('commandRetries', 2)
+                self.command_echo = config.get('commandEcho', False)
+                self.record_policy = config.get('recordPolicy', DROP_OLDEST)
+                self.record_queue_size = config.get('recordQueueSize', 64)
+                self.record_codec = config.get('recordCodec', CODEC_NONE)
+                self.record_codec_level = config.get('recordCodecLevel', 1)
+        except (FileNotFoundError, json.JSONDecodeError):
             # 使用預設配置
             self.local_addr = ("192.168.2.194", 8880)
             self.remote_addr = ("192.168.2.10", 8880)
@@ -52,7 +110,20 @@ class LidarController:
             'localIP': self.local_addr[0],
             'remoteIP': self.remote_addr[0],
             'port': self.local_addr[1],  # 控制端口
-            'dataPort': self.data_port   # 數據端口
+            'dataPort': self.data_port,  # 數據端口
+            'rxBatchSize': self.rx_batch_size,  # 批次接收大小
+            'ringDepth': self.ring_depth,  # 封包環形緩衝區深度
+            'rxBufferSize': self.rx_buffer_size,  # 數據 socket 接收緩衝區
+            'scanLines': self.scan_lines,  # 每幀掃描線數
+            'frameWindow': self.frame_window,  # 同時組裝中的幀數上限
+            'frameTimeout': self.frame_timeout,  # 幀逾時 (秒)
+            'commandTimeout': self.command_timeout,  # 指令回應逾時 (秒)
+            'commandRetries': self.command_retries,  # 指令逾時重送次數
+            'commandEcho': self.command_echo,  # 設備回應是否帶回指令碼
+            'recordPolicy': self.record_policy,  # 幀錄製背壓策略
+            'recordQueueSize': self.record_queue_size,  # 幀錄製佇列長度
+            'recordCodec': self.record_codec,  # 幀錄製壓縮方式
+            'recordCodecLevel': self.record_codec_level  # 幀錄製壓縮等級
         }
         with open('etherInform.json', 'w') as f:
             json.dump(config, f, indent=4)
@@ -90,6 +161,9 @@ class LidarController:
             self.data_rx_running = False
             self.data_socket.close()
         self.connected = False
+        self.command_tracker.cancel_all()
+        self.stop_recording()
+        self.stop_frame_recording()
     
     def start_rx_thread(self) -> None:
         """啟動接收線程"""
@@ -126,106 +200,105 @@ class LidarController:
         if len(data) >= 1206:
             self._parse_scan_data_packet(data)
             return
-        # 其他回應（如指令回應）
-        response_code = data[2]
-        if response_code in self.response_handlers:
-            self.response_handlers[response_code](data[3:])
+        # 指令回應: 回應碼(1) + 長度(1) + 資料 + 校驗和(1)，commandEcho 時資料以指令碼開頭
+        response = parse_command_response(data, self.command_echo)
+        if response is None:
+            return
+        self.command_tracker.handle_response(response)
+        if response.result in self.response_handlers:
+            self.response_handlers[response.result](data[3:])
 
     def _parse_scan_data_packet(self, data: bytes) -> None:
-        """解析新協議掃描數據封包"""
-        # 0-1: Header, 2: Echo ID/Depth, 3: Echo Line, 4-1203: Echo Data, 1204-1205: Frame Count
-        if len(data) < 1206:
+        """解析新協議掃描數據封包（與數據端口共用幀組裝器）"""
+        if len(data) < PACKET_SIZE:
             return
-        frame_id = int.from_bytes(data[1204:1206], 'big')
-        # 收集封包
-        if frame_id not in self.frame_packets:
-            self.frame_packets[frame_id] = []
-        self.frame_packets[frame_id].append(data)
-        # 檢查 frame_id 變化
-        if self.last_frame_id is not None and frame_id != self.last_frame_id:
-            packets = self.frame_packets.pop(self.last_frame_id, [])
-            if packets:
-                point_cloud = self.processor.assemble_frame_packets(packets)
-                self.processor.current_frame = point_cloud
-                if self.on_new_frame:
-                    self.on_new_frame(point_cloud)
-        self.last_frame_id = frame_id
+        self._handle_data_packets(memoryview(data)[:PACKET_SIZE],
+                                  np.array([PACKET_SIZE], dtype=np.uint16))
 
     def _parse_status_packet(self, data: bytes) -> None:
-        """解析狀態封包"""
-        # Header(2) + Type(1) + 狀態(1) + 錯誤(1) + 模式(1) + 溫度(1) + ...
-        status_code = data[3]
-        error_code = data[4]
-        mode = data[5]
-        temp = data[6]
-        print(f"[STATUS] 狀態={status_code}, 錯誤={error_code}, 模式={mode}, 溫度={temp}")
+        """解析狀態封包並放入 status_queue（欄位順序同 STATUS_DTYPE）"""
+        # Header(2) + Type(1) + 狀態(1) + 錯誤(1) + 模式(1) + 溫度(1) + 馬達轉速(2) + 雷射功率(1)
+        motor_speed = data[7] << 8 | data[8] if len(data) >= 9 else 0
+        laser_power = data[9] if len(data) >= 10 else 0
+        self.status_queue.put((time.monotonic(), data[3], data[4], data[5], data[6],
+                               motor_speed, laser_power))
     
-    def send_command(self, command_code: int, params: bytes = b'') -> None:
-        """發送指令"""
+    def _send_packet(self, packet: bytes) -> None:
+        self.socket.sendto(packet, self.remote_addr)
+
+    def send_command(self, command_code: int, params: bytes = b'', timeout: Optional[float] = None,
+                     retries: Optional[int] = None) -> Future:
+        """發送指令，返回 Future：收到 0x00 回應時結果為回應資料，
+        其他回應碼或重送後仍逾時則為 CommandError"""
         if not self.connected:
-            return
-            
-        # 構建指令包
-        packet = bytearray([0xAA, 0x55, command_code, len(params)])
-        packet.extend(params)
-        
-        # 計算校驗和
-        checksum = 0
-        for b in packet[2:]:
-            checksum += b
-        checksum = (~checksum + 1) & 0xFF
-        packet.append(checksum)
-        
-        try:
-            self.socket.sendto(bytes(packet), self.remote_addr)
-        except Exception as e:
-            print(f"發送錯誤: {e}")
+            future: Future = Future()
+            future.set_exception(CommandError(command_code, message='未連接'))
+            return future
+        future = self.command_tracker.submit(command_code, params, timeout, retries)
+        future.add_done_callback(self._report_command_error)
+        return future
+
+    @staticmethod
+    def _report_command_error(future: Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            print(f"[指令錯誤] {future.exception()}")
     
     def register_response_handler(self, response_code: int, handler: callable) -> None:
         """註冊回應處理函數"""
         self.response_handlers[response_code] = handler
     
     # 系統控制指令
-    def system_reset(self) -> None:
+    def system_reset(self) -> Future:
         """系統重置 (0x01)"""
-        self.send_command(0x01)
+        return self.send_command(0x01)
     
-    def get_device_info(self) -> None:
+    def get_device_info(self) -> Future:
         """獲取設備信息 (0x03)"""
-        self.send_command(0x03)
+        return self.send_command(0x03)
     
-    def set_system_mode(self, mode: int) -> None:
+    def set_system_mode(self, mode: int) -> Future:
         """設定系統模式 (0x11)"""
-        self.send_command(0x11, bytes([mode]))
+        return self.send_command(0x11, bytes([mode]))
     
     # 馬達控制指令
-    def start_motors(self) -> None:
+    def start_motors(self) -> Future:
         """開始馬達運行 (0x20)"""
-        self.send_command(0x20)
+        return self.send_command(0x20)
     
-    def stop_motors(self) -> None:
+    def stop_motors(self) -> Future:
         """停止馬達運行 (0x21)"""
-        self.send_command(0x21)
+        return self.send_command(0x21)
     
-    def set_motor_speed(self, speed: int) -> None:
+    def set_motor_speed(self, speed: int) -> Future:
         """設定BLDC馬達轉速 (0x22)"""
         speed_bytes = speed.to_bytes(2, 'big')
-        self.send_command(0x22, speed_bytes)
+        return self.send_command(0x22, speed_bytes)
     
     # 掃描控制指令
-    def set_scan_range(self, start_angle: int, end_angle: int) -> None:
-        """設定水平掃描範圍 (0x40)"""
-        params = start_angle.to_bytes(2, 'big') + end_angle.to_bytes(2, 'big')
-        self.send_command(0x40, params)
+    def set_scan_range(self, start_angle: int, end_angle: int) -> Future:
+        """設定水平掃描範圍 (0x40)，設備接受後才更新 horizontal_range"""
+        params = start_angle.to_bytes(2, 'big', signed=True) + end_angle.to_bytes(2, 'big', signed=True)
+        future = self.send_command(0x40, params)
+        self._set_on_success(future, 'horizontal_range', [start_angle / 10.0, end_angle / 10.0])
+        return future
     
-    def set_vertical_scan_range(self, start_angle: int, end_angle: int) -> None:
-        """設定垂直掃描範圍 (0x41)"""
-        params = start_angle.to_bytes(2, 'big') + end_angle.to_bytes(2, 'big')
-        self.send_command(0x41, params)
+    def set_vertical_scan_range(self, start_angle: int, end_angle: int) -> Future:
+        """設定垂直掃描範圍 (0x41)，設備接受後才更新 vertical_range"""
+        params = start_angle.to_bytes(2, 'big', signed=True) + end_angle.to_bytes(2, 'big', signed=True)
+        future = self.send_command(0x41, params)
+        self._set_on_success(future, 'vertical_range', [start_angle / 10.0, end_angle / 10.0])
+        return future
     
-    def set_laser_power(self, power: int) -> None:
+    def _set_on_success(self, future: Future, name: str, value: Any) -> None:
+        """指令成功回應後才設定屬性（逾時、錯誤或取消時保持原值）"""
+        def apply(done: Future) -> None:
+            if not done.cancelled() and done.exception() is None:
+                setattr(self, name, value)
+        future.add_done_callback(apply)
+    
+    def set_laser_power(self, power: int) -> Future:
         """設定雷射功率 (0x51)"""
-        self.send_command(0x51, bytes([power]))
+        return self.send_command(0x51, bytes([power]))
     
     # 數據獲取指令
     def start_data_transmission(self) -> None:
@@ -246,58 +319,166 @@ class LidarController:
         except Exception as e:
             print(f"發送錯誤: {e}")
     
-    def get_current_frame(self) -> None:
+    def get_current_frame(self) -> Future:
         """請求當前幀 (0x80)"""
-        self.send_command(0x80)
+        return self.send_command(0x80)
 
-    def set_data_format(self, fmt: int) -> None:
+    def set_data_format(self, fmt: int) -> Future:
         """設定數據格式 (0x72)，0=距離資料, 1=強度資料, 2=距離+強度"""
-        self.send_command(0x72, bytes([fmt]))
+        return self.send_command(0x72, bytes([fmt]))
 
-    def set_packet_split_mode(self, mode: int) -> None:
+    def set_packet_split_mode(self, mode: int) -> Future:
         """設定封包分割模式 (0x74)，0=完整幀傳輸, 1=分割傳輸"""
-        self.send_command(0x74, bytes([mode]))
+        return self.send_command(0x74, bytes([mode]))
 
-    def request_scan_line(self, line: int) -> None:
+    def request_scan_line(self, line: int) -> Future:
         """請求特定掃描線 (0x84)，line: 0-299"""
-        self.send_command(0x84, bytes([line]))
+        return self.send_command(0x84, bytes([line]))
 
-    def request_intensity_data(self, line: int) -> None:
+    def request_intensity_data(self, line: int) -> Future:
         """請求強度資料 (0x85)，line: 0-299"""
-        self.send_command(0x85, bytes([line]))
+        return self.send_command(0x85, bytes([line]))
 
     def set_on_new_frame_callback(self, callback):
+        """設定UI回呼；回呼在獨立消費者線程中執行，繪圖較慢時只處理最新一幀"""
+        if self._ui_consumer is not None:
+            self.remove_frame_consumer(self._ui_consumer)
+            self._ui_consumer = None
         self.on_new_frame = callback
+        if callback:
+            self._ui_consumer = self.add_frame_consumer(callback, LATEST_ONLY, name='ui-frame')
+
+    def add_frame_consumer(self, callback, policy: str = LATEST_ONLY, maxsize: int = 4,
+                           name: str = 'frame-consumer') -> FrameConsumer:
+        """新增點雲幀消費者（各自擁有有界佇列與背壓策略）"""
+        consumer = FrameConsumer(callback, policy, maxsize, name)
+        self.frame_consumers = self.frame_consumers + [consumer]
+        return consumer
+
+    def remove_frame_consumer(self, consumer: FrameConsumer) -> None:
+        """移除並停止點雲幀消費者"""
+        self.frame_consumers = [c for c in self.frame_consumers if c is not consumer]
+        consumer.close()
+
+    def start_recording(self, path: str) -> PacketRecorder:
+        """開始將數據端口收到的原始封包錄製到檔案"""
+        self.stop_recording()
+        self.recorder = PacketRecorder(path)
+        return self.recorder
+
+    def stop_recording(self) -> None:
+        """停止錄製並寫完剩餘數據"""
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
+
+    def start_frame_recording(self, path: str) -> FrameRecorder:
+        """開始將每一幀組裝完成的距離影像錄製到多幀存檔（.larc 未壓縮，.lrz 以 record_codec 壓縮）"""
+        self.stop_frame_recording()
+        self.frame_recorder = FrameRecorder(
+            path, self.scan_lines, self.record_policy, self.record_queue_size,
+            horizontal_range=self.horizontal_range, vertical_range=self.vertical_range,
+            codec=self.record_codec, codec_level=self.record_codec_level)
+        return self.frame_recorder
+
+    def stop_frame_recording(self) -> None:
+        """停止幀錄製並寫完佇列中剩餘的幀"""
+        recorder, self.frame_recorder = self.frame_recorder, None
+        if recorder is not None:
+            recorder.close()
+
+    def get_ingest_stats(self) -> Dict[str, Any]:
+        """取得數據端口接收統計（封包/秒、每包系統呼叫數、幀完整度、核心丟包）
+
+        kernel_drops 為封包在進入程式前被核心丟棄的數量，half_lines_missing 為組裝時缺少的半線數；
+        後者增加而前者不變時，表示遺失發生在設備或網路端，而非接收端處理不及。
+        """
+        stats = self.frame_assembler.get_stats()
+        if self.data_receiver is not None:
+            stats.update(self.data_receiver.get_stats())
+        if self.drop_sampler is not None:
+            stats.update(self.drop_sampler.get_stats())
+        stats['ring_depth_used'] = len(self.packet_ring) if self.packet_ring is not None else 0
+        if self.recorder is not None:
+            stats['recorder'] = self.recorder.get_stats()
+        if self.frame_recorder is not None:
+            stats['frame_recorder'] = self.frame_recorder.get_stats()
+        stats['consumers'] = {c.name: c.get_stats() for c in self.frame_consumers}
+        return stats
 
     def _data_rx_loop(self) -> None:
-        """數據端口(8881)接收循環"""
+        """數據端口(8881)接收循環：只負責將封包收進環形緩衝區，組裝交給組裝線程"""
+        if self.packet_ring is None or self.packet_ring.depth != self.ring_depth:
+            self.packet_ring = PacketRing(self.ring_depth)
+        ring = self.packet_ring
+        ring.clear()
+        self.frame_assembler.reset()
+        granted = set_receive_buffer(self.data_socket, self.rx_buffer_size)
+        print(f"[數據端口] SO_RCVBUF 請求 {self.rx_buffer_size} 字節，實際 {granted} 字節")
+        self.drop_sampler = KernelDropSampler(self.data_socket)
+        sampler = self.drop_sampler
+        self.data_receiver = BatchReceiver(self.data_socket, ring, self.rx_batch_size,
+                                           timeout=min(1.0, self.frame_timeout))
+        receiver = self.data_receiver
+        self.data_ready.clear()
+        self.assembly_thread = threading.Thread(target=self._assembly_loop, args=(ring,))
+        self.assembly_thread.daemon = True
+        self.assembly_thread.start()
         while getattr(self, 'data_rx_running', False):
             try:
-                self.data_socket.settimeout(1)
-                data, addr = self.data_socket.recvfrom(2048)
-                pkt = self.processor.parse_lidar_packet(data)
-                if pkt is None or pkt['packet_type'] not in ('d', 'e'):
-                    continue
-                frame_id = pkt['frame_id']
-                y_scan = pkt['y_scan']
-                ptype = pkt['packet_type']
-                # 初始化frame_buffer
-                if frame_id not in self.frame_buffer:
-                    self.frame_buffer[frame_id] = {}
-                if y_scan not in self.frame_buffer[frame_id]:
-                    self.frame_buffer[frame_id][y_scan] = {}
-                self.frame_buffer[frame_id][y_scan][ptype] = pkt
-                # frame_id變化時組裝上一幀
-                if self.current_frame_id is not None and frame_id != self.current_frame_id:
-                    prev_packets = self.frame_buffer.pop(self.current_frame_id, {})
-                    if prev_packets:
-                        point_cloud = self.processor.assemble_point_cloud(prev_packets)
-                        self.processor.current_frame = point_cloud
-                        if self.on_new_frame:
-                            self.on_new_frame(point_cloud)
-                self.current_frame_id = frame_id
-            except socket.timeout:
-                continue
+                if receiver.receive_batch():
+                    self.data_ready.set()
+                sampler.sample()
             except Exception as e:
-                print(f"[8881接收錯誤] {e}")
-                break 
\ No newline at end of file
+                if self.data_rx_running:
+                    print(f"[8881接收錯誤] {e}")
+                break
+        self.data_rx_running = False
+        self.data_ready.set()
+
+    def _assembly_loop(self, ring: PacketRing) -> None:
+        """幀組裝循環：從環形緩衝區批次解碼、組裝並處理逾時幀"""
+        timeout = min(1.0, self.frame_timeout)
+        while self.data_rx_running:
+            self.data_ready.wait(timeout)
+            self.data_ready.clear()
+            try:
+                span = ring.read_span()
+                while span is not None:
+                    recorder = self.recorder
+                    if recorder is not None:
+                        recorder.record_span(span[0], span[1], ring.span_timestamps(len(span[1])),
+                                             ring.slot_size)
+                    self._handle_data_packets(*span)
+                    ring.release(len(span[1]))
+                    span = ring.read_span()
+                with self.assembler_lock:
+                    self.frame_assembler.poll()
+            except Exception as e:
+                print(f"[幀組裝錯誤] {e}")
+
+    def inject_packets(self, data: memoryview, lengths: np.ndarray) -> None:
+        """直接注入一批封包（重播或測試用，不經過 socket）"""
+        self._handle_data_packets(data, lengths)
+        with self.assembler_lock:
+            self.frame_assembler.poll()
+
+    def _handle_data_packets(self, data: memoryview, lengths: np.ndarray) -> None:
+        """批次處理數據端口封包（data 為環形緩衝區中連續槽位的視圖）"""
+        decoded = decode_packets(data, len(lengths))
+        mask = decoded.valid & (lengths == PACKET_SIZE)
+        mask &= (decoded.packet_type == PACKET_TYPE_D) | (decoded.packet_type == PACKET_TYPE_E)
+        with self.assembler_lock:
+            self.frame_assembler.add_packets(decoded, mask)
+
+    def _emit_frame(self, frame: RangeFrame) -> None:
+        """將完成的距離影像轉為點雲並分發給各消費者"""
+        point_cloud = range_image_to_point_cloud(
+            frame.distances, frame.line_mask, self.horizontal_range, self.vertical_range)
+        self.current_frame_id = frame.frame_id
+        self.processor.current_frame = point_cloud
+        frame_recorder = self.frame_recorder
+        if frame_recorder is not None:
+            frame_recorder.submit(frame)
+        for consumer in self.frame_consumers:
+            consumer.submit(point_cloud)
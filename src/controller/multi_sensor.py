@@ -0,0 +1,393 @@
+"""多台 LiDAR 同時接收：每台設備一個接收/組裝進程，完成的距離影像經共享記憶體交給消費者
+
+etherInform.json 以 devices 列出各設備（未列出時沿用頂層的單一設備設定）：
+
+    "devices": [
+        {"name": "front", "localIP": "192.168.2.194", "remoteIP": "192.168.2.10",
+         "port": 8880, "dataPort": 8881},
+        {"name": "rear", "localIP": "192.168.2.194", "remoteIP": "192.168.2.11",
+         "port": 8890, "dataPort": 8891}
+    ]
+"""
+import argparse
+import json
+import multiprocessing
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.controller.batch_receiver import BatchReceiver
+from src.controller.command_tracker import CommandError, CommandTracker, parse_command_response
+from src.controller.packet_ring import PacketRing
+from src.data.packet_decoder import decode_packets, PACKET_SIZE, PACKET_TYPE_D, PACKET_TYPE_E
+from src.data.frame_assembler import (FrameAssembler, RangeFrame, COLUMNS, DEFAULT_LINES,
+                                      DEFAULT_WINDOW, DEFAULT_TIMEOUT)
+from src.monitor.socket_stats import KernelDropSampler, set_receive_buffer
+
+DEFAULT_SLOTS = 3  # 每台設備的共享幀槽位數
+
+# 每個槽位的標頭；seq 為奇數表示寫入中
+SLOT_HEADER_DTYPE = np.dtype([
+    ('seq', '<u8'),
+    ('frame_id', '<u4'),
+    ('completeness', '<f8'),
+    ('timestamp', '<f8'),
+])
+
+# 共享區塊開頭的統計欄位，由接收進程更新
+STATS_FIELDS = ('published', 'packets', 'frames_complete', 'frames_partial',
+                'frames_dropped', 'late_packets', 'ring_overruns', 'half_lines_missing',
+                'kernel_drops', 'rcvbuf_granted')
+
+
+def load_device_configs(path: str = 'etherInform.json') -> List[Dict[str, Any]]:
+    """讀取設備列表；沒有 devices 欄位時以頂層設定作為唯一設備"""
+    try:
+        with open(path, 'r') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        config = {}
+    defaults = {
+        'localIP': config.get('localIP', '192.168.2.194'),
+        'remoteIP': config.get('remoteIP', '192.168.2.10'),
+        'port': config.get('port', 8880),
+        'dataPort': config.get('dataPort', 8881),
+        'rxBatchSize': config.get('rxBatchSize', 64),
+        'ringDepth': config.get('ringDepth', 2048),
+        'rxBufferSize': config.get('rxBufferSize', 4 * 1024 * 1024),
+        'scanLines': config.get('scanLines', DEFAULT_LINES),
+        'frameWindow': config.get('frameWindow', DEFAULT_WINDOW),
+        'frameTimeout': config.get('frameTimeout', DEFAULT_TIMEOUT),
+        'commandTimeout': config.get('commandTimeout', 1.0),
+        'commandRetries': config.get('commandRetries', 2),
+        'commandEcho': config.get('commandEcho', False),
+    }
+    devices = []
+    for index, device in enumerate(config.get('devices') or [{}]):
+        merged = dict(defaults)
+        merged.update(device)
+        merged.setdefault('name', f"lidar{index}")
+        devices.append(merged)
+    return devices
+
+
+class SharedFrameBuffer:
+    """存放於 multiprocessing.shared_memory 的距離影像槽位
+
+    單一寫入者（接收進程）輪流寫入 slots 個槽位，讀取者以 seq 檢查避免讀到寫入中的幀。
+    readonly 時（預設的讀取端）所有陣列標記為唯讀。
+    """
+
+    def __init__(self, name: Optional[str], lines: int = DEFAULT_LINES,
+                 slots: int = DEFAULT_SLOTS, create: bool = False, readonly: bool = True):
+        self.lines = lines
+        self.slots = slots
+        stats_size = len(STATS_FIELDS) * 8
+        latest_size = 8
+        headers_size = slots * SLOT_HEADER_DTYPE.itemsize
+        image_size = lines * COLUMNS * 4
+        mask_size = lines * 2
+        size = stats_size + latest_size + headers_size + slots * (image_size + mask_size)
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.name = self.shm.name
+        buf = self.shm.buf
+        offset = 0
+        self.stats = np.ndarray(len(STATS_FIELDS), np.uint64, buf, offset)
+        offset += stats_size
+        self._latest = np.ndarray(1, np.uint64, buf, offset)  # 已發佈的幀數
+        offset += latest_size
+        self.headers = np.ndarray(slots, SLOT_HEADER_DTYPE, buf, offset)
+        offset += headers_size
+        self.images = np.ndarray((slots, lines, COLUMNS), np.uint32, buf, offset)
+        offset += slots * image_size
+        self.masks = np.ndarray((slots, lines, 2), np.bool_, buf, offset)
+        if create:
+            self.stats.fill(0)
+            self._latest[0] = 0
+            self.headers.fill(0)
+        elif readonly:
+            for array in (self.stats, self._latest, self.headers, self.images, self.masks):
+                array.flags.writeable = False
+
+    @property
+    def published(self) -> int:
+        return int(self._latest[0])
+
+    def publish(self, frame: RangeFrame) -> None:
+        """寫入下一個槽位並發佈（僅接收進程呼叫）"""
+        count = int(self._latest[0])
+        slot = count % self.slots
+        headers = self.headers
+        headers['seq'][slot] += 1  # 奇數：寫入中
+        self.images[slot] = frame.distances
+        self.masks[slot] = frame.line_mask
+        headers['frame_id'][slot] = frame.frame_id
+        headers['completeness'][slot] = frame.completeness
+        headers['timestamp'][slot] = frame.timestamp
+        headers['seq'][slot] += 1
+        self._latest[0] = count + 1
+
+    def read_latest(self, after: int = 0, retries: int = 3) -> Optional[RangeFrame]:
+        """讀取最新一幀的複本；沒有比 after 更新的幀或持續被覆寫時返回 None"""
+        for _ in range(retries):
+            count = int(self._latest[0])
+            if count <= after or count == 0:
+                return None
+            slot = (count - 1) % self.slots
+            seq = int(self.headers[slot]['seq'])
+            if seq % 2:
+                continue
+            header = self.headers[slot].copy()
+            distances = self.images[slot].copy()
+            line_mask = self.masks[slot].copy()
+            if int(self.headers[slot]['seq']) == seq:
+                return RangeFrame(int(header['frame_id']), distances, line_mask,
+                                  float(header['timestamp']), float(header['completeness']))
+        return None
+
+    def update_stats(self, values: Dict[str, int]) -> None:
+        for index, field in enumerate(STATS_FIELDS):
+            if field in values:
+                self.stats[index] = values[field]
+
+    def get_stats(self) -> Dict[str, int]:
+        return {field: int(self.stats[index]) for index, field in enumerate(STATS_FIELDS)}
+
+    def close(self) -> None:
+        # 釋放 numpy 視圖後才能關閉共享記憶體
+        self.stats = self._latest = self.headers = self.images = self.masks = None
+        self.shm.close()
+
+    def unlink(self) -> None:
+        self.shm.unlink()
+
+
+def _ingest_worker(device: Dict[str, Any], shm_name: str, slots: int, stop_event) -> None:
+    """接收進程：批次接收單一設備的數據端口，組裝後寫入共享記憶體"""
+    lines = device['scanLines']
+    buffer = SharedFrameBuffer(shm_name, lines, slots, readonly=False)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.bind((device['localIP'], device['dataPort']))
+    except OSError as e:
+        print(f"[{device['name']}] 數據端口綁定失敗: {e}")
+        buffer.close()
+        return
+    set_receive_buffer(sock, device['rxBufferSize'])
+    sampler = KernelDropSampler(sock)
+    ring = PacketRing(device['ringDepth'])
+    assembler = FrameAssembler(lines, device['frameWindow'], device['frameTimeout'],
+                               on_frame=buffer.publish)
+    receiver = BatchReceiver(sock, ring, device['rxBatchSize'],
+                             timeout=min(1.0, device['frameTimeout']))
+    try:
+        while not stop_event.is_set():
+            receiver.receive_batch()
+            span = ring.read_span()
+            while span is not None:
+                data, lengths = span
+                decoded = decode_packets(data, len(lengths))
+                mask = decoded.valid & (lengths == PACKET_SIZE)
+                mask &= (decoded.packet_type == PACKET_TYPE_D) | (decoded.packet_type == PACKET_TYPE_E)
+                assembler.add_packets(decoded, mask)
+                ring.release(len(lengths))
+                span = ring.read_span()
+            assembler.poll()
+            stats = assembler.get_stats()
+            stats['packets'] = receiver.total_packets
+            stats['ring_overruns'] = ring.overruns
+            stats['published'] = buffer.published
+            sampler.sample()
+            stats.update(sampler.get_stats())
+            buffer.update_stats(stats)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"[{device['name']}接收錯誤] {e}")
+    finally:
+        sock.close()
+        buffer.close()
+
+
+class _ControlChannel:
+    """單一設備的控制端口：綁定本機控制端口，接收指令回應與狀態封包"""
+
+    def __init__(self, device: Dict[str, Any]):
+        self.name = device['name']
+        self.remote_addr = (device['remoteIP'], device['port'])
+        self.last_status: Optional[Dict[str, int]] = None
+        self.echo = device['commandEcho']
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((device['localIP'], device['port']))
+        self.tracker = CommandTracker(self.send, device['commandTimeout'], device['commandRetries'],
+                                      self.echo)
+        self.running = True
+        self._thread = threading.Thread(target=self._rx_loop, name=f"lidar-control-{self.name}")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def send(self, data: bytes) -> None:
+        self.socket.sendto(data, self.remote_addr)
+
+    def _rx_loop(self) -> None:
+        self.socket.settimeout(0.5)
+        while self.running:
+            try:
+                data = self.socket.recv(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if data[:2] != b'\xAA\x55':
+                continue  # 文字指令的回覆
+            if len(data) >= 7 and data[2] == 0xFF:
+                self.last_status = {'status': data[3], 'error': data[4],
+                                    'mode': data[5], 'temperature': data[6]}
+                continue
+            response = parse_command_response(data, self.echo)
+            if response is not None:
+                self.tracker.handle_response(response)
+
+    def close(self) -> None:
+        self.running = False
+        self.tracker.cancel_all()
+        self.socket.close()
+        self._thread.join(timeout=1.0)
+
+
+class MultiSensorManager:
+    """管理多台設備的接收進程、共享幀緩衝區與控制端口"""
+
+    def __init__(self, devices: Optional[List[Dict[str, Any]]] = None,
+                 slots: int = DEFAULT_SLOTS):
+        self.devices = {d['name']: d for d in (devices if devices is not None else load_device_configs())}
+        self.slots = slots
+        self.buffers: Dict[str, SharedFrameBuffer] = {}
+        self.processes: Dict[str, multiprocessing.Process] = {}
+        self._stop_event = multiprocessing.Event()
+        self.controls: Dict[str, _ControlChannel] = {}
+        self._last_read: Dict[str, int] = {}
+
+    def start(self) -> None:
+        """為每台設備綁定控制端口、建立共享記憶體並啟動接收進程"""
+        self._stop_event.clear()
+        for name, device in self.devices.items():
+            try:
+                self.controls[name] = _ControlChannel(device)
+            except OSError as e:
+                print(f"[{name}] 控制端口綁定失敗: {e}")
+            buffer = SharedFrameBuffer(None, device['scanLines'], self.slots, create=True)
+            self.buffers[name] = buffer
+            process = multiprocessing.Process(
+                target=_ingest_worker, args=(device, buffer.name, self.slots, self._stop_event),
+                name=f"lidar-ingest-{name}")
+            process.daemon = True
+            process.start()
+            self.processes[name] = process
+            self._last_read[name] = 0
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """停止所有接收進程並釋放共享記憶體"""
+        self._stop_event.set()
+        for process in self.processes.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.processes.clear()
+        for buffer in self.buffers.values():
+            buffer.close()
+            buffer.unlink()
+        self.buffers.clear()
+        for control in self.controls.values():
+            control.close()
+        self.controls.clear()
+
+    def shm_names(self) -> Dict[str, str]:
+        """各設備共享記憶體名稱，供其他進程以 SharedFrameBuffer(name, lines) 唯讀映射"""
+        return {name: buffer.name for name, buffer in self.buffers.items()}
+
+    def read_latest(self, name: str, only_new: bool = True) -> Optional[RangeFrame]:
+        """讀取指定設備的最新幀（only_new 時同一幀只返回一次）"""
+        buffer = self.buffers[name]
+        frame = buffer.read_latest(self._last_read[name] if only_new else 0)
+        if frame is not None:
+            self._last_read[name] = buffer.published
+        return frame
+
+    def send_command(self, name: str, command_code: int, params: bytes = b'') -> Future:
+        """經控制端口對指定設備發送指令，返回 Future（同 LidarController.send_command）"""
+        control = self.controls.get(name)
+        if control is None:
+            future: Future = Future()
+            future.set_exception(CommandError(command_code, message=f'{name} 控制端口未綁定'))
+            return future
+        return control.tracker.submit(command_code, params)
+
+    def get_status(self, name: str) -> Optional[Dict[str, int]]:
+        """指定設備最近一次的狀態封包"""
+        control = self.controls.get(name)
+        return control.last_status if control else None
+
+    def start_data_transmission(self, name: Optional[str] = None) -> None:
+        """開始數據傳輸 (scanxy 1)，未指定設備時對所有設備發送"""
+        for device in [name] if name else self.devices:
+            self._send(device, b'scanxy 1')
+
+    def stop_data_transmission(self, name: Optional[str] = None) -> None:
+        """停止數據傳輸 (scanxy 0)，未指定設備時對所有設備發送"""
+        for device in [name] if name else self.devices:
+            self._send(device, b'scanxy 0')
+
+    def _send(self, name: str, data: bytes) -> None:
+        control = self.controls.get(name)
+        if control is None:
+            print(f"[{name}] 控制端口未綁定")
+            return
+        try:
+            control.send(data)
+        except Exception as e:
+            print(f"[{name}] 發送錯誤: {e}")
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """各設備的接收與組裝統計"""
+        stats = {}
+        for name, buffer in self.buffers.items():
+            stats[name] = buffer.get_stats()
+            process = self.processes.get(name)
+            stats[name]['alive'] = bool(process and process.is_alive())
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多台 LiDAR 同時接收')
+    parser.add_argument('--config', default='etherInform.json', help='設備設定檔')
+    parser.add_argument('--interval', type=float, default=5.0, help='統計輸出間隔（秒）')
+    parser.add_argument('--no-scan', action='store_true', help='不發送 scanxy 1，只監聽數據端口')
+    args = parser.parse_args()
+
+    manager = MultiSensorManager(load_device_configs(args.config))
+    manager.start()
+    for name, device in manager.devices.items():
+        print(f"[{name}] {device['remoteIP']}:{device['port']} 數據端口 {device['dataPort']}")
+    if not args.no_scan:
+        manager.start_data_transmission()
+    try:
+        while True:
+            time.sleep(args.interval)
+            for name, stats in manager.get_stats().items():
+                print(f"[{name}] {stats}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if not args.no_scan:
+            manager.stop_data_transmission()
+        manager.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+from src.data.packet_decoder import PACKET_SIZE
+
+
+class PacketRing:
+    """固定大小的封包環形緩衝區
+
+    所有槽位共用一個 bytearray，槽位的 memoryview 在初始化時切好，
+    接收端以 recv_into 直接寫入槽位，穩態下每個封包不需要額外配置記憶體。
+    單一生產者 / 單一消費者，可跨線程使用：生產者只移動 head，消費者只移動 tail；
+    環滿時新封包寫入暫存槽後丟棄，不覆蓋消費者尚未處理的槽位。
+    """
+
+    def __init__(self, depth: int = 2048, slot_size: int = PACKET_SIZE):
+        self.depth = depth
+        self.slot_size = slot_size
+        self.buffer = bytearray(depth * slot_size)
+        self.view = memoryview(self.buffer)
+        # 預先切好的槽位視圖
+        self.slots = [self.view[i * slot_size:(i + 1) * slot_size] for i in range(depth)]
+        self.lengths = np.zeros(depth, dtype=np.uint16)
+        self.timestamps = np.zeros(depth, dtype=np.int64)  # 接收時間 (time.monotonic_ns)
+        self._scratch = memoryview(bytearray(slot_size))
+        self._dropping = False  # 最近一次 write_slot 是否返回暫存槽
+        self.head = 0  # 下一個寫入序號
+        self.tail = 0  # 下一個讀取序號
+        self.overruns = 0  # 環滿而被丟棄的封包數
+
+    def __len__(self) -> int:
+        return self.head - self.tail
+
+    def full(self) -> bool:
+        return self.head - self.tail >= self.depth
+
+    def write_slot(self) -> memoryview:
+        """取得下一個可寫入的槽位（環滿時返回暫存槽）"""
+        self._dropping = self.full()
+        if self._dropping:
+            return self._scratch
+        return self.slots[self.head % self.depth]
+
+    def commit(self, nbytes: int, timestamp_ns: int = 0) -> None:
+        """提交剛寫入的槽位"""
+        if self._dropping:
+            self.overruns += 1
+            return
+        index = self.head % self.depth
+        self.lengths[index] = nbytes
+        self.timestamps[index] = timestamp_ns
+        self.head += 1
+
+    def read_span(self, max_count: Optional[int] = None) -> Optional[Tuple[memoryview, np.ndarray]]:
+        """取得一段連續的未讀槽位（不跨越環尾），返回 (連續視圖, 各槽有效長度)
+
+        處理完畢後需呼叫 release(count) 歸還槽位。
+        """
+        available = self.head - self.tail
+        if available <= 0:
+            return None
+        start = self.tail % self.depth
+        count = min(available, self.depth - start)
+        if max_count is not None:
+            count = min(count, max_count)
+        return (self.view[start * self.slot_size:(start + count) * self.slot_size],
+                self.lengths[start:start + count])
+
+    def span_timestamps(self, count: int) -> np.ndarray:
+        """read_span 返回的同一段槽位的接收時間"""
+        start = self.tail % self.depth
+        return self.timestamps[start:start + count]
+
+    def release(self, count: int) -> None:
+        """歸還已處理的槽位"""
+        self.tail += count
+
+    def clear(self) -> None:
+        """丟棄所有未讀封包"""
+        self.tail = self.head
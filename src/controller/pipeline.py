@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+# 背壓策略
+DROP_OLDEST = 'drop_oldest'   # 佇列滿時丟棄最舊的項目
+LATEST_ONLY = 'latest_only'   # 只保留最新的一個項目
+BLOCK = 'block'               # 佇列滿時阻塞生產者
+POLICIES = (DROP_OLDEST, LATEST_ONLY, BLOCK)
+
+
+class BoundedQueue:
+    """有界佇列，佇列滿時依背壓策略處理"""
+
+    def __init__(self, maxsize: int = 4, policy: str = DROP_OLDEST):
+        if policy not in POLICIES:
+            raise ValueError(f"未知的背壓策略: {policy}")
+        self.policy = policy
+        self.maxsize = 1 if policy == LATEST_ONLY else maxsize
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.put_count = 0
+        self.dropped = 0
+        self.high_water = 0
+
+    def put(self, item: Any, timeout: Optional[float] = None) -> bool:
+        """放入項目，返回是否成功（BLOCK 策略逾時或佇列已關閉時返回 False）"""
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._items) >= self.maxsize:
+                if self.policy == BLOCK:
+                    if not self._cond.wait_for(
+                            lambda: len(self._items) < self.maxsize or self._closed, timeout):
+                        self.dropped += 1
+                        return False
+                    if self._closed:
+                        return False
+                else:
+                    self._items.popleft()
+                    self.dropped += 1
+            self._items.append(item)
+            self.put_count += 1
+            self.high_water = max(self.high_water, len(self._items))
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """取出項目，逾時或佇列已關閉時返回 None"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def get_batch(self, max_items: int = 256, timeout: Optional[float] = None) -> list:
+        """等待至少一個項目後一次取出最多 max_items 個，逾時或佇列已關閉時返回空列表"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return []
+            count = min(max_items, len(self._items))
+            items = [self._items.popleft() for _ in range(count)]
+            if items:
+                self._cond.notify_all()
+            return items
+
+    def close(self) -> None:
+        """關閉佇列並喚醒所有等待者"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'policy': self.policy,
+            'depth': len(self._items),
+            'put': self.put_count,
+            'dropped': self.dropped,
+            'high_water': self.high_water,
+        }
+
+
+class FrameConsumer:
+    """管線消費者：在獨立線程中從有界佇列取出幀並呼叫回呼函數
+
+    消費者過慢時只會依策略丟幀（或在 BLOCK 策略下阻塞組裝階段），不會阻塞 UDP 接收。
+    """
+
+    def __init__(self, callback: Callable[[Any], None], policy: str = LATEST_ONLY,
+                 maxsize: int = 4, name: str = 'frame-consumer'):
+        self.callback = callback
+        self.queue = BoundedQueue(maxsize, policy)
+        self.name = name
+        self.processed = 0
+        self.busy_time = 0.0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=name)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, frame: Any) -> bool:
+        """提交一幀給此消費者"""
+        return self.queue.put(frame)
+
+    def _run(self) -> None:
+        while self._running:
+            frame = self.queue.get(timeout=1.0)
+            if frame is None:
+                continue
+            start = time.perf_counter()
+            try:
+                self.callback(frame)
+            except Exception as e:
+                print(f"[{self.name}錯誤] {e}")
+            self.busy_time += time.perf_counter() - start
+            self.processed += 1
+
+    def close(self) -> None:
+        """停止消費者線程"""
+        self._running = False
+        self.queue.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.queue.get_stats()
+        stats['processed'] = self.processed
+        stats['avg_callback_ms'] = 1000.0 * self.busy_time / self.processed if self.processed else 0.0
+        return stats
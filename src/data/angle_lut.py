@@ -0,0 +1,38 @@
+from functools import lru_cache
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+
+class AngleLUT(NamedTuple):
+    """每個 (列, 欄) 的單位方向向量與對應角度"""
+    directions: np.ndarray  # (lines, columns, 3) 單位方向 [x, y, z]
+    h_angles: np.ndarray    # (columns,) 水平角 (度)
+    v_angles: np.ndarray    # (lines,) 垂直角 (度)
+
+
+@lru_cache(maxsize=8)
+def _build_angle_lut(h_start: float, h_end: float, v_start: float, v_end: float,
+                     lines: int, columns: int) -> AngleLUT:
+    h_angles = np.linspace(h_start, h_end, columns)
+    v_angles = np.linspace(v_start, v_end, lines)
+    h = np.radians(h_angles)
+    v = np.radians(v_angles)[:, None]
+    directions = np.empty((lines, columns, 3), dtype=np.float64)
+    directions[..., 0] = np.cos(v) * np.cos(h)
+    directions[..., 1] = np.cos(v) * np.sin(h)
+    directions[..., 2] = np.sin(v)
+    for array in (directions, h_angles, v_angles):
+        array.flags.writeable = False  # 快取共用，禁止修改
+    return AngleLUT(directions, h_angles, v_angles)
+
+
+def get_angle_lut(horizontal_range: Sequence[float], vertical_range: Sequence[float],
+                  lines: int, columns: int) -> AngleLUT:
+    """取得角度查表；以角度範圍與解析度為鍵快取，範圍改變時才重新計算
+
+    水平角沿欄、垂直角沿列線性分佈，XYZ = 距離 * directions。
+    """
+    return _build_angle_lut(float(horizontal_range[0]), float(horizontal_range[1]),
+                            float(vertical_range[0]), float(vertical_range[1]),
+                            int(lines), int(columns))
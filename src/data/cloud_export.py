@@ -0,0 +1,171 @@
+"""串流匯出二進位小端序 PLY / PCD 點雲
+
+欄位: x y z distance (float32，米) | intensity (uint16，可選) | RGB (uint8，可選)
+點雲分塊轉為結構化陣列後直接寫入檔案，數千萬點也只佔用一個分塊的記憶體；點數在關閉時才寫回檔頭
+（檔頭中的點數欄位預留固定寬度），可直接以 Open3D / CloudCompare 開啟。
+
+    python -m src.data.cloud_export data/recordings/frames_20250115_143025.larc merged.ply --color
+    python -m src.data.cloud_export data/saved_clouds/point_cloud_20250115_143025.lcloud cloud.pcd
+"""
+import argparse
+import os
+import time
+from typing import Optional
+
+import numpy as np
+
+from src.data.point_cloud import range_image_to_point_cloud, valid_point_mask
+
+PLY_SUFFIX = '.ply'
+PCD_SUFFIX = '.pcd'
+CHUNK_POINTS = 1 << 20
+_COUNT_WIDTH = 12  # 檔頭點數欄位寬度，關閉時原位改寫
+
+
+def point_dtype(intensity: bool = False, color: bool = False, packed_rgb: bool = False) -> np.dtype:
+    """每點的記錄格式；packed_rgb 時顏色依 PCL 慣例打包為一個 4 字節的 rgb 欄位 (0x00RRGGBB)"""
+    fields = [('x', '<f4'), ('y', '<f4'), ('z', '<f4'), ('distance', '<f4')]
+    if intensity:
+        fields.append(('intensity', '<u2'))
+    if color:
+        fields.extend([('rgb', '<u4')] if packed_rgb else [('red', 'u1'), ('green', 'u1'), ('blue', 'u1')])
+    return np.dtype(fields)
+
+
+def _ply_header(dtype: np.dtype, count: int) -> bytes:
+    types = {'<f4': 'float', '<u2': 'ushort', '|u1': 'uchar'}
+    lines = ['ply', 'format binary_little_endian 1.0', 'comment LiDAR point cloud export',
+             f'element vertex {count:<{_COUNT_WIDTH}d}']
+    lines += [f'property {types[dtype[name].str]} {name}' for name in dtype.names]
+    lines.append('end_header')
+    return ('\n'.join(lines) + '\n').encode('ascii')
+
+
+def _pcd_header(dtype: np.dtype, count: int) -> bytes:
+    names = dtype.names
+    sizes = [str(dtype[name].itemsize) for name in names]
+    types = ['F' if dtype[name].kind == 'f' or name == 'rgb' else 'U' for name in names]
+    lines = ['# .PCD v0.7 - Point Cloud Data file format', 'VERSION 0.7',
+             'FIELDS ' + ' '.join(names), 'SIZE ' + ' '.join(sizes), 'TYPE ' + ' '.join(types),
+             'COUNT ' + ' '.join('1' for _ in names), f'WIDTH {count:<{_COUNT_WIDTH}d}', 'HEIGHT 1',
+             'VIEWPOINT 0 0 0 1 0 0 0', f'POINTS {count:<{_COUNT_WIDTH}d}', 'DATA binary']
+    return ('\n'.join(lines) + '\n').encode('ascii')
+
+
+class CloudWriter:
+    """以追加方式寫入 PLY 或 PCD（依副檔名），close 時寫回點數"""
+
+    def __init__(self, path: str, intensity: bool = False, color: bool = False,
+                 chunk_points: int = CHUNK_POINTS):
+        suffix = os.path.splitext(path)[1].lower()
+        if suffix not in (PLY_SUFFIX, PCD_SUFFIX):
+            raise ValueError(f"不支援的點雲格式: {path}（僅支援 {PLY_SUFFIX} / {PCD_SUFFIX}）")
+        self.path = path
+        self.dtype = point_dtype(intensity, color, packed_rgb=suffix == PCD_SUFFIX)
+        self._header = _ply_header if suffix == PLY_SUFFIX else _pcd_header
+        self._chunk = np.zeros(chunk_points, dtype=self.dtype)
+        self._file = open(path, 'wb')
+        self._file.write(self._header(self.dtype, 0))
+        self.points = 0
+
+    def write(self, points: np.ndarray, intensity: Optional[np.ndarray] = None,
+              colors: Optional[np.ndarray] = None) -> None:
+        """寫入 (N, >=4) 點雲 [x, y, z, distance, ...]；未提供的強度或顏色寫為 0"""
+        names = self.dtype.names
+        for start in range(0, len(points), len(self._chunk)):
+            end = min(start + len(self._chunk), len(points))
+            chunk = self._chunk[:end - start]
+            for column, name in enumerate(('x', 'y', 'z', 'distance')):
+                chunk[name] = points[start:end, column]
+            if 'intensity' in names:
+                chunk['intensity'] = 0 if intensity is None else intensity[start:end]
+            if 'red' in names:
+                for channel, name in enumerate(('red', 'green', 'blue')):
+                    chunk[name] = 0 if colors is None else colors[start:end, channel]
+            elif 'rgb' in names:
+                if colors is None:
+                    chunk['rgb'] = 0
+                else:
+                    rgb = colors[start:end].astype(np.uint32)
+                    chunk['rgb'] = (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+            self._file.write(chunk.tobytes())
+        self.points += len(points)
+
+    def close(self) -> None:
+        self._file.seek(0)
+        self._file.write(self._header(self.dtype, self.points))
+        self._file.close()
+
+    def __enter__(self) -> 'CloudWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def distance_colors(mapper, distances: np.ndarray) -> np.ndarray:
+    """以 DistanceColorMapper 的顏色區間將距離轉為 (N, 3) uint8 RGB"""
+    from matplotlib.colors import to_rgb
+
+    palette = (np.array([to_rgb(name) for name in mapper.colors]) * 255).round().astype(np.uint8)
+    return palette[np.asarray(mapper.map_distances_to_colors(distances), dtype=np.intp)]
+
+
+def export_point_cloud(path: str, points: np.ndarray, intensity: Optional[np.ndarray] = None,
+                       colors: Optional[np.ndarray] = None) -> str:
+    """匯出單一點雲，返回檔案路徑"""
+    with CloudWriter(path, intensity is not None, colors is not None) as writer:
+        writer.write(points, intensity, colors)
+    return path
+
+
+def export_recording(path: str, recording, start: int = 0, end: Optional[int] = None,
+                     mapper=None) -> int:
+    """將錄製檔 (.larc / .lrz) 中 [start, end) 的幀逐幀轉為點雲並累積匯出，返回點數
+
+    存檔含強度時一併匯出；指定 mapper 時依距離加上顏色。
+    """
+    end = len(recording) if end is None else min(end, len(recording))
+    with CloudWriter(path, recording.has_intensity, mapper is not None) as writer:
+        for k in range(start, end):
+            frame = recording[k]
+            points = range_image_to_point_cloud(frame.distances, frame.line_mask,
+                                                recording.horizontal_range, recording.vertical_range)
+            intensity = None
+            if recording.has_intensity:
+                intensity = recording.intensity(k)[valid_point_mask(frame.distances, frame.line_mask)]
+            colors = distance_colors(mapper, points[:, 3]) if mapper is not None else None
+            writer.write(points, intensity, colors)
+    return writer.points
+
+
+def main():
+    parser = argparse.ArgumentParser(description='匯出二進位 PLY / PCD 點雲')
+    parser.add_argument('source', help='.lcloud / .json 點雲或 .larc / .lrz 錄製檔')
+    parser.add_argument('output', help='輸出檔 (.ply 或 .pcd)')
+    parser.add_argument('--start', type=int, default=0, help='錄製檔的起始幀序號')
+    parser.add_argument('--end', type=int, default=None, help='錄製檔的結束幀序號（不含）')
+    parser.add_argument('--color', action='store_true', help='以 DistanceColorMapper 加上距離顏色')
+    args = parser.parse_args()
+
+    from src.data.cloud_snapshot import is_snapshot, load_cloud
+    from src.data.frame_recorder import open_recording
+
+    mapper = None
+    if args.color:
+        from src.data.color_mapper import DistanceColorMapper
+        mapper = DistanceColorMapper()
+    start = time.perf_counter()
+    if is_snapshot(args.source) or args.source.endswith('.json'):
+        cloud = load_cloud(args.source)
+        colors = distance_colors(mapper, cloud.points[:, 3]) if mapper is not None else cloud.colors
+        export_point_cloud(args.output, cloud.points, colors=colors)
+        count = len(cloud.points)
+    else:
+        count = export_recording(args.output, open_recording(args.source), args.start, args.end, mapper)
+    print(f"{args.source} -> {args.output} ({count} 點, {os.path.getsize(args.output)} 字節, "
+          f"{time.perf_counter() - start:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""二進位點雲快照 (.lcloud)
+
+    檔頭 72 字節 (SNAPSHOT_HEADER_DTYPE): magic 'LIDARPC1' | version | header_size | point_count |
+        columns | color_channels | dtype ('<f4' 或 '<f8') | timestamp (time.time 秒) | frame_id (-1 未知) |
+        水平角度範圍 | 垂直角度範圍
+    點雲: point_count x columns 小端序浮點數，欄位同 JSON 格式 [x, y, z, distance, x_angle, y_angle]
+    顏色: point_count x color_channels uint8 (可選)
+載入時以 np.memmap 唯讀映射，不需要解析整個檔案。舊的 JSON 點雲可用 convert_json_to_snapshot 轉換：
+
+    python -m src.data.cloud_snapshot data/saved_clouds/*.json
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+SNAPSHOT_MAGIC = b'LIDARPC1'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = '.lcloud'
+SNAPSHOT_HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('header_size', '<u4'),
+    ('point_count', '<u8'),
+    ('columns', '<u4'),
+    ('color_channels', '<u4'),
+    ('dtype', 'S4'),
+    ('reserved', 'V4'),
+    ('timestamp', '<f8'),
+    ('frame_id', '<i8'),
+    ('horizontal_range', '<f4', 2),
+    ('vertical_range', '<f4', 2),
+])
+
+
+class CloudSnapshot(NamedTuple):
+    points: np.ndarray              # (N, columns)
+    colors: Optional[np.ndarray]    # (N, channels) uint8 或 None
+    timestamp: float                # time.time() 秒
+    frame_id: Optional[int]
+    horizontal_range: Optional[Sequence[float]]
+    vertical_range: Optional[Sequence[float]]
+
+
+def save_snapshot(path: str, points: np.ndarray, colors: Optional[np.ndarray] = None,
+                  frame_id: Optional[int] = None, horizontal_range: Optional[Sequence[float]] = None,
+                  vertical_range: Optional[Sequence[float]] = None, timestamp: Optional[float] = None,
+                  dtype: str = '<f4') -> str:
+    """保存點雲快照，返回檔案路徑"""
+    if dtype not in ('<f4', '<f8'):
+        raise ValueError(f"不支援的數據類型: {dtype}")
+    points = np.ascontiguousarray(points, dtype=dtype)
+    if points.ndim != 2:
+        raise ValueError("點雲必須是 (N, columns) 陣列")
+    if colors is not None:
+        colors = np.ascontiguousarray(colors, dtype=np.uint8).reshape(len(points), -1)
+    header = np.zeros(1, dtype=SNAPSHOT_HEADER_DTYPE)
+    header['magic'] = SNAPSHOT_MAGIC
+    header['version'] = SNAPSHOT_VERSION
+    header['header_size'] = SNAPSHOT_HEADER_DTYPE.itemsize
+    header['point_count'] = len(points)
+    header['columns'] = points.shape[1]
+    header['color_channels'] = 0 if colors is None else colors.shape[1]
+    header['dtype'] = dtype.encode()
+    header['timestamp'] = time.time() if timestamp is None else timestamp
+    header['frame_id'] = -1 if frame_id is None else frame_id
+    header['horizontal_range'] = horizontal_range if horizontal_range is not None else (np.nan, np.nan)
+    header['vertical_range'] = vertical_range if vertical_range is not None else (np.nan, np.nan)
+    with open(path, 'wb') as f:
+        f.write(header.tobytes())
+        f.write(points.tobytes())
+        if colors is not None:
+            f.write(colors.tobytes())
+    return path
+
+
+def _range(values: np.ndarray) -> Optional[Sequence[float]]:
+    return None if np.isnan(values).any() else [float(v) for v in values]
+
+
+def load_snapshot(path: str, mmap: bool = True) -> CloudSnapshot:
+    """載入點雲快照；mmap=True 時點雲與顏色為唯讀記憶體映射"""
+    header = np.fromfile(path, dtype=SNAPSHOT_HEADER_DTYPE, count=1)
+    if len(header) != 1 or bytes(header['magic'][0]) != SNAPSHOT_MAGIC:
+        raise ValueError(f"不是點雲快照: {path}")
+    header = header[0]
+    count, columns = int(header['point_count']), int(header['columns'])
+    channels = int(header['color_channels'])
+    dtype = np.dtype(header['dtype'].decode())
+    offset = int(header['header_size'])
+    if mmap:
+        data = np.memmap(path, dtype=np.uint8, mode='r')
+    else:
+        data = np.fromfile(path, dtype=np.uint8)
+    points_bytes = count * columns * dtype.itemsize
+    points = data[offset:offset + points_bytes].view(dtype).reshape(count, columns)
+    colors = None
+    if channels:
+        colors = data[offset + points_bytes:offset + points_bytes + count * channels].reshape(count, channels)
+    frame_id = int(header['frame_id'])
+    return CloudSnapshot(points, colors, float(header['timestamp']),
+                         None if frame_id < 0 else frame_id,
+                         _range(header['horizontal_range']), _range(header['vertical_range']))
+
+
+def load_json_cloud(path: str) -> CloudSnapshot:
+    """載入舊的 JSON 點雲 (data/saved_clouds/point_cloud_*.json)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    points = np.asarray(data['points'], dtype=np.float64)
+    if points.ndim != 2:
+        points = points.reshape(0, 6)
+    try:
+        timestamp = datetime.fromisoformat(data['timestamp']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        timestamp = os.path.getmtime(path)
+    return CloudSnapshot(points, None, timestamp, data.get('frame_id'),
+                         data.get('horizontal_range'), data.get('vertical_range'))
+
+
+def is_snapshot(path: str) -> bool:
+    with open(path, 'rb') as f:
+        return f.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+
+
+def load_cloud(path: str, mmap: bool = True) -> CloudSnapshot:
+    """依檔案內容自動載入二進位快照或 JSON 點雲"""
+    if is_snapshot(path):
+        return load_snapshot(path, mmap)
+    return load_json_cloud(path)
+
+
+def convert_json_to_snapshot(json_path: str, out_path: Optional[str] = None,
+                             dtype: str = '<f4') -> str:
+    """將 JSON 點雲轉為二進位快照，預設輸出到同名 .lcloud"""
+    if out_path is None:
+        out_path = os.path.splitext(json_path)[0] + SNAPSHOT_SUFFIX
+    cloud = load_json_cloud(json_path)
+    return save_snapshot(out_path, cloud.points, None, cloud.frame_id, cloud.horizontal_range,
+                         cloud.vertical_range, cloud.timestamp, dtype)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON 點雲轉換為二進位快照')
+    parser.add_argument('paths', nargs='+', help='JSON 點雲檔')
+    parser.add_argument('--double', action='store_true', help='以 float64 保存（預設 float32）')
+    args = parser.parse_args()
+    for path in args.paths:
+        start = time.perf_counter()
+        out_path = convert_json_to_snapshot(path, dtype='<f8' if args.double else '<f4')
+        print(f"{path} -> {out_path} ({os.path.getsize(path)} -> {os.path.getsize(out_path)} 字節, "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
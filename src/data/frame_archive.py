@@ -0,0 +1,208 @@
+"""多幀距離影像存檔 (.larc)
+
+    檔頭 64 字節 (ARCHIVE_HEADER_DTYPE): magic 'LIDARARC' | version | header_size | lines | columns |
+        distance_dtype ('<u2' 或 '<u4') | intensity (0/1) | record_size | start_wall_ns | 水平/垂直角度範圍
+    記錄: 固定大小，依 record_dtype(): frame_id | completeness | timestamp | line_mask | distances | intensity
+旁邊的索引檔 (.larc.idx) 為 ARCHIVE_INDEX_DTYPE 陣列 (frame_id, timestamp, offset)。
+存檔以 np.memmap 開啟，第 k 幀位於 header_size + k * record_size，讀取任一幀或時間區間不需要解析整個檔案。
+"""
+import os
+import time
+from typing import Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.data.cloud_snapshot import CloudSnapshot
+from src.data.frame_assembler import COLUMNS, DEFAULT_LINES, RangeFrame
+from src.data.point_cloud import range_image_to_point_cloud
+
+ARCHIVE_MAGIC = b'LIDARARC'
+ARCHIVE_VERSION = 1
+ARCHIVE_SUFFIX = '.larc'
+INDEX_SUFFIX = '.idx'
+ARCHIVE_HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('header_size', '<u4'),
+    ('lines', '<u4'),
+    ('columns', '<u4'),
+    ('distance_dtype', 'S4'),
+    ('intensity', '<u4'),
+    ('record_size', '<u8'),
+    ('start_wall_ns', '<u8'),
+    ('horizontal_range', '<f4', 2),
+    ('vertical_range', '<f4', 2),
+])
+ARCHIVE_INDEX_DTYPE = np.dtype([('frame_id', '<u4'), ('timestamp', '<f8'), ('offset', '<u8')])
+
+
+def record_dtype(lines: int, columns: int, distance_dtype: str = '<u2',
+                 intensity: bool = False) -> np.dtype:
+    """每幀固定大小記錄的 dtype"""
+    fields = [
+        ('frame_id', '<u4'),
+        ('completeness', '<f4'),
+        ('timestamp', '<f8'),
+        ('line_mask', 'u1', (lines, 2)),
+        ('distances', distance_dtype, (lines, columns)),
+    ]
+    if intensity:
+        fields.append(('intensity', '<u2', (lines, columns)))
+    return np.dtype(fields)
+
+
+def is_archive(path: str) -> bool:
+    with open(path, 'rb') as f:
+        return f.read(len(ARCHIVE_MAGIC)) == ARCHIVE_MAGIC
+
+
+class FrameArchiveWriter:
+    """將 RangeFrame 追加寫入存檔
+
+    uint16 存檔中超出範圍的距離（均為無效值）寫為 0。
+    """
+
+    def __init__(self, path: str, lines: int = DEFAULT_LINES, columns: int = COLUMNS,
+                 distance_dtype: str = '<u2', intensity: bool = False,
+                 horizontal_range: Sequence[float] = (-30.0, 30.0),
+                 vertical_range: Sequence[float] = (-15.0, 15.0)):
+        if distance_dtype not in ('<u2', '<u4'):
+            raise ValueError(f"不支援的距離類型: {distance_dtype}")
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self.lines = lines
+        self.columns = columns
+        self.dtype = record_dtype(lines, columns, distance_dtype, intensity)
+        self._max_distance = np.iinfo(np.dtype(distance_dtype)).max
+        header = np.zeros(1, dtype=ARCHIVE_HEADER_DTYPE)
+        header['magic'] = ARCHIVE_MAGIC
+        header['version'] = ARCHIVE_VERSION
+        header['header_size'] = ARCHIVE_HEADER_DTYPE.itemsize
+        header['lines'] = lines
+        header['columns'] = columns
+        header['distance_dtype'] = distance_dtype.encode()
+        header['intensity'] = int(intensity)
+        header['record_size'] = self.dtype.itemsize
+        header['start_wall_ns'] = time.time_ns()
+        header['horizontal_range'] = horizontal_range
+        header['vertical_range'] = vertical_range
+        self._file = open(path, 'wb')
+        self._index_file = open(self.index_path, 'wb')
+        self._file.write(header.tobytes())
+        self._record = np.zeros(1, dtype=self.dtype)
+        self._offset = ARCHIVE_HEADER_DTYPE.itemsize
+        self.frames = 0
+        self.bytes = self._offset
+
+    def append(self, frame: RangeFrame, intensity: Optional[np.ndarray] = None) -> int:
+        """寫入一幀，返回其在存檔中的序號"""
+        record = self._record[0]
+        record['frame_id'] = frame.frame_id
+        record['completeness'] = frame.completeness
+        record['timestamp'] = frame.timestamp
+        record['line_mask'] = frame.line_mask
+        distances = record['distances']
+        np.copyto(distances, frame.distances, casting='unsafe')
+        distances[frame.distances > self._max_distance] = 0
+        if 'intensity' in self.dtype.names:
+            record['intensity'] = 0 if intensity is None else intensity
+        self._file.write(self._record.tobytes())
+        index = np.array([(frame.frame_id, frame.timestamp, self._offset)], dtype=ARCHIVE_INDEX_DTYPE)
+        self._index_file.write(index.tobytes())
+        self._offset += self.dtype.itemsize
+        self.frames += 1
+        self.bytes = self._offset
+        return self.frames - 1
+
+    def flush(self) -> None:
+        self._file.flush()
+        self._index_file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+        self._index_file.close()
+
+
+class FrameArchive:
+    """以記憶體映射讀取存檔；archive[k] 返回第 k 幀的 RangeFrame（指向映射的唯讀視圖）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        header = np.fromfile(path, dtype=ARCHIVE_HEADER_DTYPE, count=1)
+        if len(header) != 1 or bytes(header['magic'][0]) != ARCHIVE_MAGIC:
+            raise ValueError(f"不是距離影像存檔: {path}")
+        header = header[0]
+        self.version = int(header['version'])
+        self.header_size = int(header['header_size'])
+        self.lines = int(header['lines'])
+        self.columns = int(header['columns'])
+        self.distance_dtype = header['distance_dtype'].decode()
+        self.has_intensity = bool(header['intensity'])
+        self.start_wall_ns = int(header['start_wall_ns'])
+        self.horizontal_range = [float(v) for v in header['horizontal_range']]
+        self.vertical_range = [float(v) for v in header['vertical_range']]
+        self.dtype = record_dtype(self.lines, self.columns, self.distance_dtype, self.has_intensity)
+        if int(header['record_size']) != self.dtype.itemsize:
+            raise ValueError(f"存檔記錄大小不符: {path}")
+        # 錄製中斷時最後一筆可能不完整，只映射完整的記錄
+        count = (os.path.getsize(path) - self.header_size) // self.dtype.itemsize
+        if count:
+            self.records = np.memmap(path, dtype=self.dtype, mode='r', offset=self.header_size,
+                                     shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=self.dtype)
+        self._index: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, k: int) -> RangeFrame:
+        record = self.records[k]
+        return RangeFrame(int(record['frame_id']), record['distances'],
+                          record['line_mask'].astype(bool), float(record['timestamp']),
+                          float(record['completeness']))
+
+    def __iter__(self) -> Iterator[RangeFrame]:
+        for k in range(len(self)):
+            yield self[k]
+
+    @property
+    def index(self) -> np.ndarray:
+        """(frame_id, timestamp, offset) 索引；索引檔不存在或不完整時由記錄重建"""
+        if self._index is None:
+            index_path = self.path + INDEX_SUFFIX
+            index = np.fromfile(index_path, dtype=ARCHIVE_INDEX_DTYPE) \
+                if os.path.exists(index_path) else np.zeros(0, dtype=ARCHIVE_INDEX_DTYPE)
+            if len(index) < len(self):
+                index = np.zeros(len(self), dtype=ARCHIVE_INDEX_DTYPE)
+                index['frame_id'] = self.records['frame_id']
+                index['timestamp'] = self.records['timestamp']
+                index['offset'] = self.header_size + np.arange(len(self), dtype=np.uint64) * self.dtype.itemsize
+            self._index = index[:len(self)]
+        return self._index
+
+    def intensity(self, k: int) -> Optional[np.ndarray]:
+        return self.records[k]['intensity'] if self.has_intensity else None
+
+    def find_frame(self, frame_id: int) -> Optional[int]:
+        """返回 frame_id 第一次出現的序號"""
+        hits = np.flatnonzero(self.index['frame_id'] == frame_id)
+        return int(hits[0]) if hits.size else None
+
+    def time_slice(self, start: float, end: float = float('inf')) -> Tuple[int, int]:
+        """返回 start <= timestamp < end 的序號範圍 [lo, hi)（time.time() 秒）"""
+        timestamps = self.index['timestamp']
+        return (int(np.searchsorted(timestamps, start, 'left')),
+                int(np.searchsorted(timestamps, end, 'left')))
+
+    def to_point_cloud(self, k: int) -> np.ndarray:
+        """將第 k 幀轉為 (N, 6) 點雲"""
+        frame = self[k]
+        return range_image_to_point_cloud(frame.distances, frame.line_mask,
+                                          self.horizontal_range, self.vertical_range)
+
+    def snapshot(self, k: int) -> CloudSnapshot:
+        """將第 k 幀轉為與點雲快照相同的 CloudSnapshot，供 GUI 直接顯示"""
+        frame = self[k]
+        return CloudSnapshot(self.to_point_cloud(k), None, frame.timestamp, frame.frame_id,
+                             self.horizontal_range, self.vertical_range)
@@ -0,0 +1,176 @@
+import time
+from collections import deque
+from typing import Callable, Dict, NamedTuple, Optional
+
+import numpy as np
+
+from src.data.packet_decoder import (DecodedPackets, MAX_SCAN_LINES, POINTS_PER_PACKET,
+                                     PACKET_TYPE_D, PACKET_TYPE_E)
+
+COLUMNS = 2 * POINTS_PER_PACKET  # 每條掃描線 600 點 (d + e)
+DEFAULT_LINES = MAX_SCAN_LINES   # 封包的掃描線序號為 1 字節
+DEFAULT_WINDOW = 3           # 同時組裝中的幀數上限
+DEFAULT_TIMEOUT = 0.5        # 幀逾時 (秒)，超過此時間未收到封包即結束該幀
+DEFAULT_MIN_COMPLETENESS = 0.5  # 未完整的幀至少需達此比例才輸出，否則丟棄
+
+
+class RangeFrame(NamedTuple):
+    """組裝完成的一幀距離影像"""
+    frame_id: int
+    distances: np.ndarray  # (lines, 600) uint32 距離 (cm)
+    line_mask: np.ndarray  # (lines, 2) bool，[y, 0]/[y, 1] 表示 d/e 半線已收到
+    timestamp: float       # 完成時間 (time.time())
+    completeness: float    # 已收到的半線比例 0~1
+
+
+class FrameAssembler:
+    """以預先配置的 (lines x 600) 距離影像組裝幀
+
+    每個封包的 300 點直接寫入影像第 y_scan 列，d 封包寫入 0-299 欄，e 封包寫入 300-599 欄。
+    最多同時組裝 window 幀，允許封包亂序；幀在收齊所有半線、逾時或被新幀擠出視窗時結束。
+    所有影像在初始化時一次配置 (window + 1 塊)，長時間運行記憶體不會增長。
+    結束的幀以 on_frame(RangeFrame) 同步回呼輸出；RangeFrame 指向內部緩衝區，
+    在下一幀輸出前有效，需要保留時請自行複製。
+    """
+
+    def __init__(self, lines: int = DEFAULT_LINES, window: int = DEFAULT_WINDOW,
+                 timeout: float = DEFAULT_TIMEOUT,
+                 min_completeness: float = DEFAULT_MIN_COMPLETENESS,
+                 on_frame: Optional[Callable[[RangeFrame], None]] = None):
+        self.lines = lines
+        self.on_frame = on_frame
+        self.window = window
+        self.timeout = timeout
+        self.min_completeness = min_completeness
+        pool = window + 1  # 額外一塊保留給最近輸出的幀
+        self._images = np.zeros((pool, lines, COLUMNS), dtype=np.uint32)
+        self._masks = np.zeros((pool, lines, 2), dtype=bool)
+        self._last_seen = np.zeros(pool, dtype=np.float64)
+        self._free = list(range(pool))
+        self._inflight: Dict[int, int] = {}  # frame_id -> 槽位，依開始順序排列
+        self._output_slot: Optional[int] = None
+        self._finished = deque(maxlen=64)  # 最近結束的 frame_id，用於識別遲到封包
+        self._finished_set = set()
+
+        # 統計計數
+        self.frames_complete = 0
+        self.frames_partial = 0
+        self.frames_dropped = 0
+        self.late_packets = 0
+        self.packets_out_of_range = 0
+        self.half_lines_missing = 0  # 已結束幀中未收到的半線總數
+        self.last_completeness = 0.0
+
+    @property
+    def frames_completed(self) -> int:
+        """已輸出的幀數（完整 + 部分）"""
+        return self.frames_complete + self.frames_partial
+
+    def add_packets(self, decoded: DecodedPackets, mask: Optional[np.ndarray] = None,
+                    now: Optional[float] = None) -> int:
+        """寫入一批已解碼的 d/e 封包，返回本批次中結束並輸出的幀數"""
+        index = np.arange(len(decoded.frame_id))
+        if mask is not None:
+            index = index[mask]
+        if index.size == 0:
+            return 0
+        if now is None:
+            now = time.monotonic()
+
+        frame_ids = decoded.frame_id[index]
+        emitted = self.frames_completed
+        # 依 frame_id 分段，每段一次向量化寫入
+        breaks = np.flatnonzero(frame_ids[1:] != frame_ids[:-1]) + 1
+        for run in np.split(index, breaks):
+            frame_id = int(decoded.frame_id[run[0]])
+            slot = self._inflight.get(frame_id)
+            if slot is None:
+                if frame_id in self._finished_set:
+                    self.late_packets += run.size
+                    continue
+                # 視窗已滿時先結束最舊的幀
+                while len(self._inflight) >= self.window:
+                    self._retire(next(iter(self._inflight)))
+                slot = self._free.pop()
+                self._masks[slot].fill(False)
+                self._inflight[frame_id] = slot
+            self._write(slot, decoded, run)
+            self._last_seen[slot] = now
+            if self._masks[slot].all():
+                self._retire(frame_id)
+        return self.frames_completed - emitted
+
+    def poll(self, now: Optional[float] = None) -> int:
+        """結束逾時的幀，接收循環每次喚醒時呼叫，返回輸出的幀數"""
+        if now is None:
+            now = time.monotonic()
+        emitted = self.frames_completed
+        for frame_id, slot in list(self._inflight.items()):
+            if now - self._last_seen[slot] >= self.timeout:
+                self._retire(frame_id)
+        return self.frames_completed - emitted
+
+    def _write(self, slot: int, decoded: DecodedPackets, run: np.ndarray) -> None:
+        """將同一幀的封包寫入指定槽位的距離影像"""
+        rows = decoded.y_scan[run].astype(np.intp)
+        types = decoded.packet_type[run]
+        halves = (types == PACKET_TYPE_E).astype(np.intp)
+        keep = (rows < self.lines) & ((types == PACKET_TYPE_D) | (types == PACKET_TYPE_E))
+        if not keep.all():
+            self.packets_out_of_range += int((~keep).sum())
+            run, rows, halves = run[keep], rows[keep], halves[keep]
+        image = self._images[slot].reshape(self.lines, 2, POINTS_PER_PACKET)
+        image[rows, halves] = decoded.distances[run]
+        self._masks[slot][rows, halves] = True
+
+    def _retire(self, frame_id: int) -> None:
+        """結束一幀：足夠完整則輸出，否則丟棄並回收槽位"""
+        slot = self._inflight.pop(frame_id)
+        if len(self._finished) == self._finished.maxlen:
+            self._finished_set.discard(self._finished[0])
+        self._finished.append(frame_id)
+        self._finished_set.add(frame_id)
+
+        received = int(self._masks[slot].sum())
+        completeness = received / self._masks[slot].size
+        self.half_lines_missing += self._masks[slot].size - received
+        self.last_completeness = completeness
+        if completeness < self.min_completeness:
+            self.frames_dropped += 1
+            self._free.append(slot)
+            return
+        if completeness == 1.0:
+            self.frames_complete += 1
+        else:
+            self.frames_partial += 1
+        # 釋放上一個輸出槽位，保留本次輸出的槽位直到下一幀輸出
+        if self._output_slot is not None:
+            self._free.append(self._output_slot)
+        self._output_slot = slot
+        if self.on_frame:
+            self.on_frame(RangeFrame(frame_id, self._images[slot], self._masks[slot],
+                                     time.time(), completeness))
+
+    def flush(self) -> None:
+        """強制結束所有組裝中的幀（例如停止掃描時）"""
+        for frame_id in list(self._inflight):
+            self._retire(frame_id)
+
+    def reset(self) -> None:
+        """丟棄所有組裝中的幀"""
+        for slot in self._inflight.values():
+            self._free.append(slot)
+        self._inflight.clear()
+
+    def get_stats(self) -> Dict[str, float]:
+        """取得幀組裝統計"""
+        return {
+            'frames_complete': self.frames_complete,
+            'frames_partial': self.frames_partial,
+            'frames_dropped': self.frames_dropped,
+            'frames_in_flight': len(self._inflight),
+            'late_packets': self.late_packets,
+            'packets_out_of_range': self.packets_out_of_range,
+            'half_lines_missing': self.half_lines_missing,
+            'last_completeness': self.last_completeness,
+        }
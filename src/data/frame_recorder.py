@@ -0,0 +1,94 @@
+"""連續錄製組裝完成的距離影像到多幀存檔 (.larc)
+
+submit 在組裝線程中複製一幀（組裝器會重用幀緩衝區）並放入有界佇列，磁碟寫入由背景線程批次進行，
+掃描與繪圖不需要等待磁碟。佇列滿時依背壓策略處理：
+    DROP_OLDEST  丟棄最舊的待寫幀（預設，不影響接收）
+    BLOCK        阻塞組裝線程直到寫入線程跟上（不丟幀，但磁碟過慢時會拖慢組裝）
+路徑副檔名為 .lrz 時以 range_codec 的關鍵幀 + 差分壓縮寫入，否則寫入未壓縮的 .larc 存檔。
+"""
+import threading
+import time
+from typing import Any, Dict, Sequence, Union
+
+from src.controller.pipeline import BLOCK, BoundedQueue, DROP_OLDEST
+from src.data.frame_archive import FrameArchive, FrameArchiveWriter, is_archive
+from src.data.frame_assembler import DEFAULT_LINES, RangeFrame
+from src.data.range_codec import (CODEC_SUFFIX, CODEC_ZLIB, RangeCodecReader, RangeCodecWriter,
+                                  is_codec_file)
+
+
+class FrameRecorder:
+    """背景線程寫入的幀錄製器"""
+
+    def __init__(self, path: str, lines: int = DEFAULT_LINES, policy: str = DROP_OLDEST,
+                 queue_size: int = 64, distance_dtype: str = '<u2',
+                 horizontal_range: Sequence[float] = (-30.0, 30.0),
+                 vertical_range: Sequence[float] = (-15.0, 15.0),
+                 codec: str = CODEC_ZLIB, codec_level: int = 1):
+        self.path = path
+        self.policy = policy
+        self.queue = BoundedQueue(queue_size, policy)
+        if path.endswith(CODEC_SUFFIX):
+            self.writer = RangeCodecWriter(path, lines, method=codec, level=codec_level,
+                                           distance_dtype=distance_dtype,
+                                           horizontal_range=horizontal_range,
+                                           vertical_range=vertical_range)
+        else:
+            self.writer = FrameArchiveWriter(path, lines, distance_dtype=distance_dtype,
+                                             horizontal_range=horizontal_range,
+                                             vertical_range=vertical_range)
+        self.started = time.monotonic()
+        self.write_time = 0.0  # 寫入線程花在磁碟寫入的時間 (秒)
+        self._thread = threading.Thread(target=self._writer_loop, name='frame-recorder')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, frame: RangeFrame) -> bool:
+        """複製一幀並放入寫入佇列，返回是否成功放入"""
+        frame = frame._replace(distances=frame.distances.copy(), line_mask=frame.line_mask.copy())
+        return self.queue.put(frame, timeout=1.0 if self.policy == BLOCK else None)
+
+    def _writer_loop(self) -> None:
+        while True:
+            frames = self.queue.get_batch(64, timeout=0.5)
+            if not frames:
+                if self.queue.closed:
+                    break
+                continue
+            start = time.perf_counter()
+            try:
+                for frame in frames:
+                    self.writer.append(frame)
+                self.writer.flush()
+            except Exception as e:
+                print(f"[錄製寫入錯誤] {e}")
+            self.write_time += time.perf_counter() - start
+
+    def close(self) -> None:
+        """停止接收新幀，寫完佇列中剩餘的幀並關閉存檔"""
+        self.queue.close()
+        self._thread.join()
+        self.writer.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started
+        stats = self.queue.get_stats()
+        stats.update({
+            'frames': self.writer.frames,
+            'bytes': self.writer.bytes,
+            'elapsed': elapsed,
+            'mb_per_s': self.writer.bytes / elapsed / 1e6 if elapsed > 0 else 0.0,
+            'ratio': self.writer.raw_bytes / self.writer.bytes
+            if isinstance(self.writer, RangeCodecWriter) else 1.0,
+            'disk_busy': self.write_time / elapsed if elapsed > 0 else 0.0,
+        })
+        return stats
+
+
+def open_recording(path: str) -> Union[FrameArchive, RangeCodecReader]:
+    """依檔案內容開啟 .larc 存檔或 .lrz 編碼錄製檔（兩者都提供 len、[k]、time_slice 與 snapshot）"""
+    if is_archive(path):
+        return FrameArchive(path)
+    if is_codec_file(path):
+        return RangeCodecReader(path)
+    raise ValueError(f"不是幀錄製檔: {path}")
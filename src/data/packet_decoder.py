@@ -0,0 +1,132 @@
+"""LiDAR 距離封包批次解碼器
+
+封包格式參見 lidar_packet_spec.md（1206 字節）：
+    0-1     幀標識符 0xAA55 (little-endian)
+    2       [type(高4bit)][echo_depth(低4bit)]
+    3       y_scan 掃描線序號 (0-255)
+    4-1203  300 點距離，每點 uint32 little-endian (cm)
+    1204-1205 Frame ID (little-endian)
+強度封包 ("a") 為 606 字節，300 點強度為 uint16 little-endian。
+掃描線序號依 lidar_packet_spec.md 6.1 / 10 取自第 3 字節（實測封包 d1 ed 為第 237 線），
+第 2 字節低 4 bit 與原 integrated_lidar_control 相同解讀為 echo_depth，不併入線序號。
+"""
+from typing import NamedTuple, Optional, Union
+
+import numpy as np
+
+PACKET_SIZE = 1206
+INTENSITY_PACKET_SIZE = 606
+POINTS_PER_PACKET = 300
+FRAME_HEADER = 0xAA55
+MAX_VALID_DISTANCE_CM = 10000  # 有效距離上限 (不含)
+MAX_SCAN_LINES = 256  # 掃描線序號只佔 1 字節
+
+# 封包類型碼 (第2位元組高4 bit)
+PACKET_TYPE_D = 0xD  # X軸前300點
+PACKET_TYPE_E = 0xE  # X軸後300點
+PACKET_TYPE_A = 0xA  # 強度封包
+PACKET_TYPE_NAMES = {PACKET_TYPE_D: 'd', PACKET_TYPE_E: 'e', PACKET_TYPE_A: 'a'}
+
+PACKET_DTYPE = np.dtype([
+    ('header', '<u2'),
+    ('type_echo', 'u1'),
+    ('line', 'u1'),
+    ('distances', '<u4', (POINTS_PER_PACKET,)),
+    ('frame_id', '<u2'),
+])
+assert PACKET_DTYPE.itemsize == PACKET_SIZE
+
+INTENSITY_PACKET_DTYPE = np.dtype([
+    ('header', '<u2'),
+    ('type_echo', 'u1'),
+    ('line', 'u1'),
+    ('intensity', '<u2', (POINTS_PER_PACKET,)),
+    ('frame_id', '<u2'),
+])
+assert INTENSITY_PACKET_DTYPE.itemsize == INTENSITY_PACKET_SIZE
+
+
+class DecodedPackets(NamedTuple):
+    """批次解碼結果，每個欄位的第一維對應封包序號"""
+    packet_type: np.ndarray  # (N,) uint8 類型碼
+    y_scan: np.ndarray       # (N,) uint16 Y軸掃描順序
+    frame_id: np.ndarray     # (N,) uint16
+    distances: np.ndarray    # (N, 300) uint32 距離 (cm)
+    valid: np.ndarray        # (N,) bool 幀標識符正確
+    echo_depth: np.ndarray   # (N,) uint8 第2字節低4 bit
+
+
+BufferLike = Union[bytes, bytearray, memoryview, np.ndarray]
+
+
+def decode_packets(buffer: BufferLike, count: Optional[int] = None) -> DecodedPackets:
+    """將 N 個連續封包一次解碼
+
+    distances 為指向輸入緩衝區的視圖（不複製），緩衝區會被重用時需自行複製。
+    """
+    if count is None:
+        count = memoryview(buffer).nbytes // PACKET_SIZE
+    records = np.frombuffer(buffer, dtype=PACKET_DTYPE, count=count)
+    type_echo = records['type_echo']
+    return DecodedPackets(
+        packet_type=type_echo >> 4,
+        y_scan=records['line'].astype(np.uint16),
+        frame_id=records['frame_id'].astype(np.uint16),
+        distances=records['distances'],
+        valid=records['header'] == FRAME_HEADER,
+        echo_depth=type_echo & 0x0F,
+    )
+
+
+def decode_intensity_packets(buffer: BufferLike, count: Optional[int] = None) -> DecodedPackets:
+    """批次解碼強度封包，distances 欄位為 (N, 300) uint16 強度值"""
+    if count is None:
+        count = memoryview(buffer).nbytes // INTENSITY_PACKET_SIZE
+    records = np.frombuffer(buffer, dtype=INTENSITY_PACKET_DTYPE, count=count)
+    type_echo = records['type_echo']
+    return DecodedPackets(
+        packet_type=type_echo >> 4,
+        y_scan=records['line'].astype(np.uint16),
+        frame_id=records['frame_id'].astype(np.uint16),
+        distances=records['intensity'],
+        valid=records['header'] == FRAME_HEADER,
+        echo_depth=type_echo & 0x0F,
+    )
+
+
+def valid_distance_mask(distances: np.ndarray) -> np.ndarray:
+    """有效距離遮罩：0 < distance < 10000 cm"""
+    return (distances > 0) & (distances < MAX_VALID_DISTANCE_CM)
+
+
+def _line_bytes(y_scan: np.ndarray) -> np.ndarray:
+    y_scan = np.asarray(y_scan)
+    if y_scan.size and (y_scan.min() < 0 or y_scan.max() >= MAX_SCAN_LINES):
+        raise ValueError(f"掃描線序號需在 0-{MAX_SCAN_LINES - 1} 之間")
+    return y_scan.astype(np.uint8)
+
+
+def encode_packets(packet_type: np.ndarray, y_scan: np.ndarray,
+                   frame_id: np.ndarray, distances: np.ndarray, echo_depth: int = 0) -> bytes:
+    """將欄位編碼為連續封包（decode_packets 的反向操作，供模擬與測試使用）"""
+    packet_type = np.atleast_1d(np.asarray(packet_type, dtype=np.uint8))
+    records = np.zeros(len(packet_type), dtype=PACKET_DTYPE)
+    records['header'] = FRAME_HEADER
+    records['type_echo'] = (packet_type << 4) | (np.asarray(echo_depth, dtype=np.uint8) & 0x0F)
+    records['line'] = _line_bytes(y_scan)
+    records['frame_id'] = frame_id
+    records['distances'] = np.asarray(distances).reshape(len(packet_type), POINTS_PER_PACKET)
+    return records.tobytes()
+
+
+def encode_intensity_packets(y_scan: np.ndarray, frame_id: np.ndarray,
+                             intensity: np.ndarray) -> bytes:
+    """將強度值編碼為連續的 "a" 封包（decode_intensity_packets 的反向操作）"""
+    y_scan = np.atleast_1d(np.asarray(y_scan))
+    records = np.zeros(len(y_scan), dtype=INTENSITY_PACKET_DTYPE)
+    records['header'] = FRAME_HEADER
+    records['type_echo'] = PACKET_TYPE_A << 4
+    records['line'] = _line_bytes(y_scan)
+    records['frame_id'] = frame_id
+    records['intensity'] = np.asarray(intensity).reshape(len(y_scan), POINTS_PER_PACKET)
+    return records.tobytes()
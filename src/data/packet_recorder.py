@@ -0,0 +1,201 @@
+"""原始封包錄製與讀取
+
+錄製檔 (.lcap) 為只追加的二進位檔：
+    檔頭 32 字節: magic 'LIDARCAP' | version <u4 | header_size <u4 | start_wall_ns <u8 | start_mono_ns <u8
+    記錄: timestamp_ns <u8 (time.monotonic_ns) | length <u2 | 原始數據報 (length 字節)
+旁邊的索引檔 (.lcap.idx) 為 INDEX_DTYPE 陣列，記錄每個 frame_id 第一次出現的記錄偏移，用於快速定位。
+"""
+import os
+import queue
+import struct
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from src.data.packet_decoder import FRAME_HEADER, INTENSITY_PACKET_SIZE, PACKET_SIZE
+
+CAPTURE_MAGIC = b'LIDARCAP'
+CAPTURE_VERSION = 1
+CAPTURE_HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('header_size', '<u4'),
+    ('start_wall_ns', '<u8'),
+    ('start_mono_ns', '<u8'),
+])
+RECORD_HEADER_DTYPE = np.dtype([('timestamp_ns', '<u8'), ('length', '<u2')])
+INDEX_DTYPE = np.dtype([('frame_id', '<u4'), ('offset', '<u8'), ('timestamp_ns', '<u8')])
+INDEX_SUFFIX = '.idx'
+
+
+def packet_frame_id(packet) -> Optional[int]:
+    """取得 d/e/a 封包的 frame_id（最後 2 字節），非 LiDAR 封包返回 None"""
+    length = len(packet)
+    if length not in (PACKET_SIZE, INTENSITY_PACKET_SIZE):
+        return None
+    if packet[0] | (packet[1] << 8) != FRAME_HEADER:
+        return None
+    return packet[length - 2] | (packet[length - 1] << 8)
+
+
+class PacketRecorder:
+    """將原始數據報追加寫入錄製檔
+
+    record_span 只複製一次數據並放入佇列，磁碟寫入在背景線程進行，不會阻塞接收；
+    佇列滿時（磁碟跟不上）丟棄整批並計入 dropped_packets。
+    """
+
+    def __init__(self, path: str, queue_size: int = 256):
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self._queue: queue.Queue = queue.Queue(queue_size)
+        self._file = open(path, 'wb')
+        self._index_file = open(self.index_path, 'wb')
+        header = np.zeros(1, dtype=CAPTURE_HEADER_DTYPE)
+        header['magic'] = CAPTURE_MAGIC
+        header['version'] = CAPTURE_VERSION
+        header['header_size'] = CAPTURE_HEADER_DTYPE.itemsize
+        header['start_wall_ns'] = time.time_ns()
+        header['start_mono_ns'] = time.monotonic_ns()
+        self._file.write(header.tobytes())
+        self._offset = CAPTURE_HEADER_DTYPE.itemsize
+        self._recent_frames = deque(maxlen=8)  # 最近出現的 frame_id，亂序時不重複建立索引
+
+        # 統計計數
+        self.packets = 0
+        self.bytes = 0
+        self.dropped_packets = 0
+        self.frames_indexed = 0
+
+        self._thread = threading.Thread(target=self._writer_loop, name='packet-recorder')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def record_span(self, data: memoryview, lengths: np.ndarray, timestamps_ns: np.ndarray,
+                    slot_size: int = PACKET_SIZE) -> bool:
+        """錄製一段連續槽位中的封包（PacketRing.read_span 的結果）"""
+        item = (bytes(data[:len(lengths) * slot_size]), lengths.copy(),
+                timestamps_ns.copy(), slot_size)
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped_packets += len(lengths)
+            return False
+
+    def record(self, packet: bytes, timestamp_ns: Optional[int] = None) -> bool:
+        """錄製單一封包"""
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        return self.record_span(memoryview(packet), np.array([len(packet)], dtype=np.uint16),
+                                np.array([timestamp_ns], dtype=np.int64), len(packet))
+
+    def _writer_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            try:
+                self._write_span(*item)
+            except Exception as e:
+                print(f"[錄製錯誤] {e}")
+
+    def _write_span(self, data: bytes, lengths: np.ndarray, timestamps_ns: np.ndarray,
+                    slot_size: int) -> None:
+        headers = np.empty(len(lengths), dtype=RECORD_HEADER_DTYPE)
+        headers['timestamp_ns'] = timestamps_ns
+        headers['length'] = lengths
+        header_bytes = headers.tobytes()
+        size = RECORD_HEADER_DTYPE.itemsize
+        view = memoryview(data)
+        chunks = []
+        index_entries = []
+        offset = self._offset
+        for i, length in enumerate(lengths.tolist()):
+            packet = view[i * slot_size:i * slot_size + length]
+            frame_id = packet_frame_id(packet)
+            if frame_id is not None and frame_id not in self._recent_frames:
+                self._recent_frames.append(frame_id)
+                index_entries.append((frame_id, offset, int(timestamps_ns[i])))
+            chunks.append(header_bytes[i * size:(i + 1) * size])
+            chunks.append(packet)
+            offset += size + length
+        self._file.write(b''.join(chunks))
+        if index_entries:
+            self._index_file.write(np.array(index_entries, dtype=INDEX_DTYPE).tobytes())
+            self.frames_indexed += len(index_entries)
+        self.packets += len(lengths)
+        self.bytes += offset - self._offset
+        self._offset = offset
+
+    def close(self) -> None:
+        """寫完佇列中剩餘的數據並關閉檔案"""
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        self._index_file.close()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'packets': self.packets,
+            'bytes': self.bytes,
+            'dropped_packets': self.dropped_packets,
+            'frames_indexed': self.frames_indexed,
+            'queue_depth': self._queue.qsize(),
+        }
+
+
+class CaptureReader:
+    """讀取錄製檔與索引"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._data = np.memmap(path, dtype=np.uint8, mode='r')
+        header = np.frombuffer(self._data, dtype=CAPTURE_HEADER_DTYPE, count=1)[0]
+        if bytes(header['magic']) != CAPTURE_MAGIC:
+            raise ValueError(f"不是錄製檔: {path}")
+        self.version = int(header['version'])
+        self.header_size = int(header['header_size'])
+        self.start_wall_ns = int(header['start_wall_ns'])
+        self.start_mono_ns = int(header['start_mono_ns'])
+
+    def load_index(self) -> np.ndarray:
+        """讀取 frame_id 索引；索引檔不存在時掃描整個錄製檔重建"""
+        index_path = self.path + INDEX_SUFFIX
+        if os.path.exists(index_path):
+            return np.fromfile(index_path, dtype=INDEX_DTYPE)
+        entries = []
+        recent = deque(maxlen=8)
+        for offset, timestamp_ns, packet in self.iter_records():
+            frame_id = packet_frame_id(packet)
+            if frame_id is not None and frame_id not in recent:
+                recent.append(frame_id)
+                entries.append((frame_id, offset, timestamp_ns))
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+    def find_frame(self, frame_id: int) -> Optional[int]:
+        """返回 frame_id 第一次出現的記錄偏移"""
+        index = self.load_index()
+        hits = np.flatnonzero(index['frame_id'] == frame_id)
+        return int(index['offset'][hits[0]]) if hits.size else None
+
+    def iter_records(self, offset: Optional[int] = None) -> Iterator[Tuple[int, int, memoryview]]:
+        """從 offset 開始依序返回 (記錄偏移, timestamp_ns, 數據報視圖)"""
+        data = memoryview(self._data)
+        record_header = struct.Struct('<QH')  # 與 RECORD_HEADER_DTYPE 相同
+        size = record_header.size
+        position = self.header_size if offset is None else offset
+        end = len(self._data)
+        while position + size <= end:
+            timestamp_ns, length = record_header.unpack_from(data, position)
+            if position + size + length > end:
+                break  # 錄製中斷留下的不完整記錄
+            yield position, timestamp_ns, data[position + size:position + size + length]
+            position += size + length
+
+    def __iter__(self) -> Iterator[Tuple[int, memoryview]]:
+        for _, timestamp_ns, packet in self.iter_records():
+            yield timestamp_ns, packet
@@ -0,0 +1,232 @@
+"""錄製檔重播：讀取 .lcap 錄製檔或 tcpdump 的 pcap 檔，以原速、N 倍速或不限速重播
+
+重播目標可以是本機 UDP 端口（實際經過 LidarController 的接收路徑），
+或直接注入 LidarController / FrameAssembler（離線測量解碼與組裝吞吐量）：
+
+    python -m src.data.packet_replay capture.lcap --speed 1 --udp 127.0.0.1:8881
+    python -m src.data.packet_replay field.pcap --speed 0
+"""
+import argparse
+import socket
+import struct
+import time
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from src.data.packet_decoder import decode_packets, PACKET_SIZE, PACKET_TYPE_D, PACKET_TYPE_E
+from src.data.packet_recorder import CaptureReader, CAPTURE_MAGIC
+
+PCAP_MAGIC_US = 0xA1B2C3D4
+PCAP_MAGIC_NS = 0xA1B23C4D
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_LINUX_SLL2 = 276
+DEFAULT_DATA_PORT = 8881
+
+
+def _udp_payload(frame: memoryview, linktype: int, port: Optional[int]) -> Optional[memoryview]:
+    """從鏈路層封包取出 IPv4 UDP 負載；不符合或目的端口不同時返回 None"""
+    if linktype == LINKTYPE_ETHERNET:
+        offset = 14
+        ethertype = frame[12] << 8 | frame[13]
+        while ethertype == 0x8100 and len(frame) >= offset + 4:  # VLAN 標籤
+            ethertype = frame[offset + 2] << 8 | frame[offset + 3]
+            offset += 4
+        if ethertype != 0x0800:
+            return None
+    elif linktype == LINKTYPE_LINUX_SLL:
+        offset = 16
+    elif linktype == LINKTYPE_LINUX_SLL2:
+        offset = 20
+    elif linktype == LINKTYPE_NULL:
+        offset = 4
+    elif linktype == LINKTYPE_RAW:
+        offset = 0
+    else:
+        return None
+    if len(frame) < offset + 28 or frame[offset] >> 4 != 4 or frame[offset + 9] != 17:
+        return None
+    if (frame[offset + 6] & 0x3F) or frame[offset + 7]:
+        return None  # IP 分段
+    udp = offset + (frame[offset] & 0x0F) * 4
+    dst_port = frame[udp + 2] << 8 | frame[udp + 3]
+    if port is not None and dst_port != port:
+        return None
+    length = (frame[udp + 4] << 8 | frame[udp + 5]) - 8
+    return frame[udp + 8:udp + 8 + length]
+
+
+def iter_pcap(path: str, port: Optional[int] = DEFAULT_DATA_PORT) -> Iterator[Tuple[int, memoryview]]:
+    """讀取 libpcap 檔，返回 (timestamp_ns, UDP 負載)；檔案以 np.memmap 唯讀映射，不整檔讀入"""
+    data = memoryview(np.memmap(path, dtype=np.uint8, mode='r'))
+    magic = struct.unpack_from('<I', data, 0)[0]
+    if magic in (PCAP_MAGIC_US, PCAP_MAGIC_NS):
+        endian = '<'
+    else:
+        endian = '>'
+        magic = struct.unpack_from('>I', data, 0)[0]
+    if magic not in (PCAP_MAGIC_US, PCAP_MAGIC_NS):
+        raise ValueError(f"不支援的 pcap 格式: {path}")
+    scale = 1 if magic == PCAP_MAGIC_NS else 1000
+    linktype = struct.unpack_from(endian + 'I', data, 20)[0] & 0x0FFFFFFF
+    record = struct.Struct(endian + 'IIII')
+    position = 24
+    while position + record.size <= len(data):
+        ts_sec, ts_frac, incl_len, _ = record.unpack_from(data, position)
+        position += record.size
+        frame = data[position:position + incl_len]
+        position += incl_len
+        payload = _udp_payload(frame, linktype, port)
+        if payload is not None:
+            yield ts_sec * 1_000_000_000 + ts_frac * scale, payload
+
+
+def iter_capture(path: str, port: Optional[int] = DEFAULT_DATA_PORT) -> Iterator[Tuple[int, memoryview]]:
+    """依檔案開頭自動判斷 .lcap 或 pcap，返回 (timestamp_ns, 數據報)"""
+    with open(path, 'rb') as f:
+        magic = f.read(len(CAPTURE_MAGIC))
+    if magic == CAPTURE_MAGIC:
+        return iter(CaptureReader(path))
+    return iter_pcap(path, port)
+
+
+class PacketReplayer:
+    """依原始封包間隔重播錄製檔
+
+    speed=1 為原速，speed=N 為 N 倍速，speed=0 為不限速。注入模式下，到期的封包會合併成
+    連續緩衝區批次交給接收端，與 PacketRing.read_span 的格式相同。
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, port: Optional[int] = DEFAULT_DATA_PORT,
+                 batch_size: int = 64):
+        self.path = path
+        self.speed = speed
+        self.port = port
+        self.batch_size = batch_size
+        self.packets = 0
+        self.bytes = 0
+        self.elapsed = 0.0
+        self._running = False
+
+    def _paced(self) -> Iterator[Tuple[memoryview, bool]]:
+        """依設定速度返回 (數據報, 下一個封包是否需要等待)"""
+        start_wall = time.perf_counter()
+        first_ts = None
+        for timestamp_ns, packet in iter_capture(self.path, self.port):
+            if not self._running:
+                break
+            if self.speed > 0:
+                if first_ts is None:
+                    first_ts = timestamp_ns
+                due = (timestamp_ns - first_ts) / 1e9 / self.speed
+                delay = due - (time.perf_counter() - start_wall)
+                if delay > 0:
+                    yield None, True
+                    time.sleep(delay)
+            yield packet, False
+
+    def replay_udp(self, target: Tuple[str, int]) -> Dict[str, float]:
+        """將封包重送到 UDP 位址"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._running = True
+        start = time.perf_counter()
+        try:
+            for packet, _ in self._paced():
+                if packet is None:
+                    continue
+                sock.sendto(packet, target)
+                self.packets += 1
+                self.bytes += len(packet)
+        finally:
+            sock.close()
+            self._running = False
+        self.elapsed = time.perf_counter() - start
+        return self.get_stats()
+
+    def replay_into(self, handler: Callable[[memoryview, np.ndarray], None],
+                    slot_size: int = PACKET_SIZE) -> Dict[str, float]:
+        """將封包批次注入 handler(data, lengths)，data 為 batch_size 個槽位的連續緩衝區"""
+        buffer = bytearray(self.batch_size * slot_size)
+        view = memoryview(buffer)
+        lengths = np.zeros(self.batch_size, dtype=np.uint16)
+        count = 0
+        self._running = True
+        start = time.perf_counter()
+        try:
+            for packet, waiting in self._paced():
+                if waiting or count == self.batch_size:
+                    if count:
+                        handler(view[:count * slot_size], lengths[:count])
+                        count = 0
+                    if waiting:
+                        continue
+                length = min(len(packet), slot_size)
+                view[count * slot_size:count * slot_size + length] = packet[:length]
+                lengths[count] = length
+                count += 1
+                self.packets += 1
+                self.bytes += len(packet)
+            if count:
+                handler(view[:count * slot_size], lengths[:count])
+        finally:
+            self._running = False
+        self.elapsed = time.perf_counter() - start
+        return self.get_stats()
+
+    def replay_to_controller(self, controller) -> Dict[str, float]:
+        """直接注入 LidarController（經過解碼、組裝與消費者分發，不經過 socket）"""
+        stats = self.replay_into(controller.inject_packets)
+        with controller.assembler_lock:
+            controller.frame_assembler.flush()
+        return stats
+
+    def replay_to_assembler(self, assembler) -> Dict[str, float]:
+        """直接注入 FrameAssembler，只測量解碼與組裝"""
+        def handler(data, lengths):
+            decoded = decode_packets(data, len(lengths))
+            mask = decoded.valid & (lengths == PACKET_SIZE)
+            mask &= (decoded.packet_type == PACKET_TYPE_D) | (decoded.packet_type == PACKET_TYPE_E)
+            assembler.add_packets(decoded, mask)
+            assembler.poll()
+        stats = self.replay_into(handler)
+        assembler.flush()
+        return stats
+
+    def stop(self) -> None:
+        self._running = False
+
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            'packets': self.packets,
+            'bytes': self.bytes,
+            'elapsed': self.elapsed,
+            'packets_per_second': self.packets / self.elapsed if self.elapsed else 0.0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LiDAR 錄製檔重播')
+    parser.add_argument('path', help='.lcap 錄製檔或 pcap 檔')
+    parser.add_argument('--speed', type=float, default=1.0, help='重播倍速，0 表示不限速')
+    parser.add_argument('--port', type=int, default=DEFAULT_DATA_PORT, help='pcap 中篩選的目的端口')
+    parser.add_argument('--udp', default=None, help='重送目標 IP:PORT，未指定時直接注入幀組裝器並輸出吞吐量')
+    args = parser.parse_args()
+
+    replayer = PacketReplayer(args.path, args.speed, args.port)
+    if args.udp:
+        host, port = args.udp.rsplit(':', 1)
+        print(replayer.replay_udp((host, int(port))))
+    else:
+        from src.data.frame_assembler import FrameAssembler
+        assembler = FrameAssembler()
+        stats = replayer.replay_to_assembler(assembler)
+        stats.update(assembler.get_stats())
+        stats['frames_per_second'] = assembler.frames_completed / stats['elapsed'] if stats['elapsed'] else 0.0
+        print(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""以欄式 NumPy 陣列保存解析後的掃描線封包
+
+每個封包一列：timestamp (time.time() 秒) | frame_count | line | echo_id | distances (300 點原始距離)。
+各欄預先配置並以倍數成長；記憶體中的資料超過 max_memory_bytes 時整批寫入磁碟上的暫存檔
+（PACKET_ROW_DTYPE 記錄），匯出時以記憶體映射與記憶體中的資料依序分塊讀出，佔用記憶體固定。
+匯出可在另一個線程進行，期間接收線程可繼續 append。
+"""
+import os
+import tempfile
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+from src.data.packet_decoder import POINTS_PER_PACKET
+
+PACKET_ROW_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('frame_count', '<u2'),
+    ('line', '<u2'),
+    ('echo_id', 'u1'),
+    ('distances', '<u4', POINTS_PER_PACKET),
+])
+CSV_COLUMNS = ('timestamp', 'frame_count', 'echo_type', 'point_index', 'distance_mm',
+               'x_mm', 'y_mm', 'z_mm', 'horizontal_angle_deg')
+CSV_ROW_FORMAT = '%s,%d,%s,%d,%.3f,%.3f,%.3f,%.3f,%.4f\n'
+
+
+class PacketStore:
+    """可成長的欄式封包儲存，超過記憶體上限時溢出到磁碟"""
+
+    def __init__(self, max_memory_bytes: int = 256 * 1024 * 1024, initial_rows: int = 4096,
+                 spill_dir: Optional[str] = None):
+        self.max_rows = max(1, max_memory_bytes // PACKET_ROW_DTYPE.itemsize)
+        self.initial_rows = min(initial_rows, self.max_rows)
+        self.spill_dir = spill_dir
+        self.spill_path: Optional[str] = None
+        self._spill_file = None
+        self.spilled_rows = 0
+        self._lock = threading.Lock()  # append / 溢出與匯出讀取記憶體資料之間的互斥
+        self._allocate(self.initial_rows)
+
+    def _allocate(self, rows: int) -> None:
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.zeros((rows,) + PACKET_ROW_DTYPE[name].shape, dtype=PACKET_ROW_DTYPE[name].base)
+            for name in PACKET_ROW_DTYPE.names
+        }
+        self._rows = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self.columns['timestamp'])
+
+    def __len__(self) -> int:
+        return self.spilled_rows + self._rows
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+    def append(self, timestamp: float, frame_count: int, line: int, echo_id: int,
+               distances: np.ndarray) -> None:
+        """加入一個封包"""
+        with self._lock:
+            if self._rows == self.capacity:
+                self._make_room()
+            k = self._rows
+            columns = self.columns
+            columns['timestamp'][k] = timestamp
+            columns['frame_count'][k] = frame_count
+            columns['line'][k] = line
+            columns['echo_id'][k] = echo_id
+            columns['distances'][k] = distances
+            self._rows += 1
+
+    def _make_room(self) -> None:
+        """欄位已滿：未達記憶體上限時加倍，否則將記憶體中的資料寫入暫存檔"""
+        capacity = self.capacity
+        if capacity < self.max_rows:
+            grown = min(capacity * 2, self.max_rows)
+            for name, column in self.columns.items():
+                new = np.zeros((grown,) + column.shape[1:], dtype=column.dtype)
+                new[:capacity] = column
+                self.columns[name] = new
+            return
+        self._spill()
+
+    def _spill(self) -> None:
+        if self._spill_file is None:
+            fd, self.spill_path = tempfile.mkstemp(prefix='lidar_packets_', suffix='.bin',
+                                                   dir=self.spill_dir)
+            self._spill_file = os.fdopen(fd, 'wb')
+        self._spill_file.write(self._rows_array(0, self._rows).tobytes())
+        self._spill_file.flush()
+        self.spilled_rows += self._rows
+        self._rows = 0
+
+    def _rows_array(self, start: int, end: int) -> np.ndarray:
+        """記憶體中 [start, end) 的資料轉為 PACKET_ROW_DTYPE 記錄"""
+        rows = np.empty(end - start, dtype=PACKET_ROW_DTYPE)
+        for name, column in self.columns.items():
+            rows[name] = column[start:end]
+        return rows
+
+    def iter_chunks(self, rows: int = 16384) -> Iterator[np.ndarray]:
+        """依時間順序分塊返回 PACKET_ROW_DTYPE 記錄（先讀暫存檔，再讀記憶體中的資料）
+
+        只返回呼叫時已有的資料。迭代期間仍可 append；若期間發生溢出，原本在記憶體中的資料已接在
+        暫存檔中快照位置之後，改由暫存檔讀取。
+        """
+        with self._lock:
+            spilled_rows, memory_rows = self.spilled_rows, self._rows
+        if spilled_rows:
+            spilled = np.memmap(self.spill_path, dtype=PACKET_ROW_DTYPE, mode='r',
+                                shape=(spilled_rows,))
+            for start in range(0, spilled_rows, rows):
+                yield spilled[start:start + rows]
+            del spilled
+        for start in range(0, memory_rows, rows):
+            end = min(start + rows, memory_rows)
+            with self._lock:
+                chunk = self._rows_array(start, end) if self.spilled_rows == spilled_rows else None
+            if chunk is None:
+                chunk = np.fromfile(self.spill_path, dtype=PACKET_ROW_DTYPE, count=end - start,
+                                    offset=(spilled_rows + start) * PACKET_ROW_DTYPE.itemsize)
+            yield chunk
+
+    def export_binary(self, path: str) -> str:
+        """寫出 .npy 檔（PACKET_ROW_DTYPE 陣列，可用 np.load(path, mmap_mode='r') 開啟）"""
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=PACKET_ROW_DTYPE, shape=(len(self),))
+        offset = 0
+        for chunk in self.iter_chunks():
+            out[offset:offset + len(chunk)] = chunk
+            offset += len(chunk)
+        out.flush()
+        del out
+        return path
+
+    def export_csv(self, path: str, directions: np.ndarray, h_angles: np.ndarray,
+                   distance_scale: float = 1.0, echo_names: Optional[Dict[int, str]] = None) -> int:
+        """將有效點寫成 CSV（欄位見 CSV_COLUMNS），返回點數
+
+        directions (300, 3) 與 h_angles (300,) 為單條掃描線的角度查表，時間以本地時間 ISO 格式輸出。
+        """
+        echo_names = echo_names or {}
+        utc_offset = datetime.now().astimezone().utcoffset().total_seconds()
+        count = 0
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            f.write(','.join(CSV_COLUMNS) + '\n')
+            for chunk in self.iter_chunks(rows=512):  # 每塊最多約 15 萬點的文字
+                distance_mm = chunk['distances'] * distance_scale
+                rows, points = np.nonzero(distance_mm > 0)
+                if not rows.size:
+                    continue
+                distance = distance_mm[rows, points]
+                xyz = directions[points] * distance[:, None]
+                local = ((chunk['timestamp'] + utc_offset) * 1e6).astype('datetime64[us]')
+                timestamps = np.datetime_as_string(local)
+                echo_ids, inverse = np.unique(chunk['echo_id'], return_inverse=True)
+                echo_types = np.array([echo_names.get(int(e), f"Unknown ({int(e):04b})")
+                                       for e in echo_ids])[inverse]
+                columns = [timestamps[rows], chunk['frame_count'][rows], echo_types[rows], points,
+                           distance, xyz[:, 0], xyz[:, 1], xyz[:, 2], h_angles[points]]
+                f.write(''.join([CSV_ROW_FORMAT % row for row in zip(*[c.tolist() for c in columns])]))
+                count += rows.size
+        return count
+
+    def clear(self) -> None:
+        """清除所有資料並刪除暫存檔"""
+        with self._lock:
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+                os.remove(self.spill_path)
+                self.spill_path = None
+            self.spilled_rows = 0
+            self._allocate(self.initial_rows)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'rows': len(self),
+            'memory_rows': self._rows,
+            'spilled_rows': self.spilled_rows,
+            'memory_bytes': self.memory_bytes,
+        }
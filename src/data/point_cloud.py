@@ -0,0 +1,36 @@
+from typing import Sequence
+
+import numpy as np
+
+from src.data.angle_lut import get_angle_lut
+from src.data.packet_decoder import valid_distance_mask, POINTS_PER_PACKET
+
+
+def valid_point_mask(distances: np.ndarray, line_mask: np.ndarray) -> np.ndarray:
+    """距離影像中會輸出為點的像素；點雲依此遮罩的列優先順序排列"""
+    valid = valid_distance_mask(distances)
+    valid &= np.repeat(line_mask, POINTS_PER_PACKET, axis=1)
+    return valid
+
+
+def range_image_to_point_cloud(distances: np.ndarray, line_mask: np.ndarray,
+                               horizontal_range: Sequence[float],
+                               vertical_range: Sequence[float]) -> np.ndarray:
+    """將 (lines x 600) 距離影像轉為點雲
+
+    返回 (N, 6) 陣列：[x, y, z, distance, x_angle, y_angle]，
+    座標與距離單位為米，角度單位為度；水平角沿欄、垂直角沿列線性分佈。
+    """
+    lines, columns = distances.shape
+    lut = get_angle_lut(horizontal_range, vertical_range, lines, columns)
+
+    rows, cols = np.nonzero(valid_point_mask(distances, line_mask))
+
+    r = distances[rows, cols] / 100.0  # cm -> m
+
+    points = np.empty((r.size, 6), dtype=np.float64)
+    np.multiply(lut.directions[rows, cols], r[:, None], out=points[:, :3])
+    points[:, 3] = r
+    points[:, 4] = lut.h_angles[cols]
+    points[:, 5] = lut.v_angles[rows]
+    return points
@@ -0,0 +1,309 @@
+"""距離影像錄製編碼 (.lrz)：關鍵幀 + 幀間差分 + 分塊壓縮
+
+每 keyframe_interval 幀組成一塊：第一幀為關鍵幀（保存原值），其餘保存與前一幀的逐像素差
+（無號整數環繞相減，解碼時以 cumsum 還原）。差分值經 zigzag 映射（小的正負差都成為小的無號數）
+並依字節拆成平面後以 zlib 或 lzma 壓縮，固定安裝時相鄰幀幾乎相同，高位字節平面幾乎全為 0。
+每塊可獨立解碼。
+
+    檔頭 64 字節 (CODEC_HEADER_DTYPE): magic 'LIDARRZ1' | version | header_size | lines | columns |
+        distance_dtype | method | level | keyframe_interval | start_wall_ns | 水平/垂直角度範圍
+    塊: CHUNK_HEADER_DTYPE (frame_count, payload_size) | FRAME_META_DTYPE x frame_count (未壓縮) |
+        壓縮後的 (line_mask | 差分平面)
+旁邊的索引檔 (.lrz.idx) 與 .larc 相同為 ARCHIVE_INDEX_DTYPE，offset 指向該幀所在的塊。
+"""
+import lzma
+import os
+import time
+import zlib
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.data.cloud_snapshot import CloudSnapshot
+from src.data.frame_archive import ARCHIVE_INDEX_DTYPE, INDEX_SUFFIX
+from src.data.frame_assembler import COLUMNS, DEFAULT_LINES, RangeFrame
+from src.data.point_cloud import range_image_to_point_cloud
+
+CODEC_MAGIC = b'LIDARRZ1'
+CODEC_VERSION = 1
+CODEC_SUFFIX = '.lrz'
+CODEC_NONE = 'none'
+CODEC_ZLIB = 'zlib'
+CODEC_LZMA = 'lzma'
+CODEC_METHODS = (CODEC_NONE, CODEC_ZLIB, CODEC_LZMA)
+DEFAULT_KEYFRAME_INTERVAL = 30
+CODEC_HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('header_size', '<u4'),
+    ('lines', '<u4'),
+    ('columns', '<u4'),
+    ('distance_dtype', 'S4'),
+    ('method', 'S4'),
+    ('level', '<u4'),
+    ('keyframe_interval', '<u4'),
+    ('start_wall_ns', '<u8'),
+    ('horizontal_range', '<f4', 2),
+    ('vertical_range', '<f4', 2),
+])
+CHUNK_HEADER_DTYPE = np.dtype([('frame_count', '<u4'), ('payload_size', '<u4')])
+FRAME_META_DTYPE = np.dtype([('frame_id', '<u4'), ('completeness', '<f4'), ('timestamp', '<f8')])
+
+
+def _compress(data: bytes, method: str, level: int) -> bytes:
+    if method == CODEC_ZLIB:
+        return zlib.compress(data, level)
+    if method == CODEC_LZMA:
+        return lzma.compress(data, preset=level)
+    return data
+
+
+def _decompress(data: bytes, method: str) -> bytes:
+    if method == CODEC_ZLIB:
+        return zlib.decompress(data)
+    if method == CODEC_LZMA:
+        return lzma.decompress(data)
+    return data
+
+
+def encode_chunk(distances: np.ndarray, line_masks: np.ndarray, meta: np.ndarray,
+                 method: str = CODEC_ZLIB, level: int = 1) -> bytes:
+    """將 (n, lines, columns) 距離影像編碼為一塊（第一幀為關鍵幀）"""
+    deltas = np.diff(distances, axis=0, prepend=np.zeros_like(distances[:1]))
+    signed = deltas.view(deltas.dtype.str.replace('u', 'i'))
+    zigzag = ((signed << 1) ^ (signed >> (8 * distances.itemsize - 1))).view(deltas.dtype)
+    planes = zigzag.view(np.uint8).reshape(-1, distances.itemsize).T
+    payload = _compress(line_masks.astype(np.uint8).tobytes() + planes.tobytes(), method, level)
+    header = np.array([(len(distances), len(payload))], dtype=CHUNK_HEADER_DTYPE)
+    return header.tobytes() + meta.astype(FRAME_META_DTYPE).tobytes() + payload
+
+
+def decode_chunk(payload: bytes, count: int, lines: int, columns: int, distance_dtype: str,
+                 method: str) -> Tuple[np.ndarray, np.ndarray]:
+    """解碼一塊的壓縮部分，返回 (distances (n, lines, columns), line_masks (n, lines, 2))"""
+    raw = np.frombuffer(_decompress(payload, method), dtype=np.uint8)
+    mask_bytes = count * lines * 2
+    line_masks = raw[:mask_bytes].reshape(count, lines, 2).astype(bool)
+    dtype = np.dtype(distance_dtype)
+    zigzag = np.ascontiguousarray(raw[mask_bytes:].reshape(dtype.itemsize, -1).T).view(dtype)
+    deltas = (zigzag >> 1) ^ (dtype.type(0) - (zigzag & 1))
+    distances = np.cumsum(deltas.reshape(count, lines, columns), axis=0, dtype=dtype)
+    return distances, line_masks
+
+
+class RangeCodecWriter:
+    """將 RangeFrame 編碼寫入 .lrz 錄製檔，每滿 keyframe_interval 幀寫出一塊
+
+    uint16 錄製檔中超出範圍的距離（均為無效值）寫為 0。
+    """
+
+    def __init__(self, path: str, lines: int = DEFAULT_LINES, columns: int = COLUMNS,
+                 method: str = CODEC_ZLIB, level: int = 1,
+                 keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL, distance_dtype: str = '<u2',
+                 horizontal_range: Sequence[float] = (-30.0, 30.0),
+                 vertical_range: Sequence[float] = (-15.0, 15.0)):
+        if method not in CODEC_METHODS:
+            raise ValueError(f"未知的壓縮方式: {method}")
+        if distance_dtype not in ('<u2', '<u4'):
+            raise ValueError(f"不支援的距離類型: {distance_dtype}")
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self.method = method
+        self.level = level
+        self.keyframe_interval = keyframe_interval
+        self._max_distance = np.iinfo(np.dtype(distance_dtype)).max
+        self._distances = np.zeros((keyframe_interval, lines, columns), dtype=distance_dtype)
+        self._line_masks = np.zeros((keyframe_interval, lines, 2), dtype=bool)
+        self._meta = np.zeros(keyframe_interval, dtype=FRAME_META_DTYPE)
+        self._pending = 0
+        header = np.zeros(1, dtype=CODEC_HEADER_DTYPE)
+        header['magic'] = CODEC_MAGIC
+        header['version'] = CODEC_VERSION
+        header['header_size'] = CODEC_HEADER_DTYPE.itemsize
+        header['lines'] = lines
+        header['columns'] = columns
+        header['distance_dtype'] = distance_dtype.encode()
+        header['method'] = method.encode()
+        header['level'] = level
+        header['keyframe_interval'] = keyframe_interval
+        header['start_wall_ns'] = time.time_ns()
+        header['horizontal_range'] = horizontal_range
+        header['vertical_range'] = vertical_range
+        self._file = open(path, 'wb')
+        self._index_file = open(self.index_path, 'wb')
+        self._file.write(header.tobytes())
+        self._offset = CODEC_HEADER_DTYPE.itemsize
+        self.frames = 0
+        self.bytes = self._offset
+        self.raw_bytes = 0  # 未編碼時的距離影像字節數
+        self.encode_time = 0.0
+
+    def append(self, frame: RangeFrame) -> int:
+        """加入一幀，返回其在錄製檔中的序號"""
+        k = self._pending
+        distances = self._distances[k]
+        np.copyto(distances, frame.distances, casting='unsafe')
+        distances[frame.distances > self._max_distance] = 0
+        self._line_masks[k] = frame.line_mask
+        self._meta[k] = (frame.frame_id, frame.completeness, frame.timestamp)
+        self._pending += 1
+        self.frames += 1
+        self.raw_bytes += distances.nbytes
+        if self._pending == self.keyframe_interval:
+            self._write_chunk()
+        return self.frames - 1
+
+    def _write_chunk(self) -> None:
+        count = self._pending
+        if not count:
+            return
+        start = time.perf_counter()
+        chunk = encode_chunk(self._distances[:count], self._line_masks[:count], self._meta[:count],
+                             self.method, self.level)
+        self.encode_time += time.perf_counter() - start
+        self._file.write(chunk)
+        index = np.zeros(count, dtype=ARCHIVE_INDEX_DTYPE)
+        index['frame_id'] = self._meta['frame_id'][:count]
+        index['timestamp'] = self._meta['timestamp'][:count]
+        index['offset'] = self._offset
+        self._index_file.write(index.tobytes())
+        self._offset += len(chunk)
+        self.bytes = self._offset
+        self._pending = 0
+
+    def flush(self) -> None:
+        """寫入磁碟（未滿一塊的幀留到塊滿或 close 時寫出）"""
+        self._file.flush()
+        self._index_file.flush()
+
+    def close(self) -> None:
+        """寫出未滿的最後一塊並關閉檔案"""
+        self._write_chunk()
+        self._file.close()
+        self._index_file.close()
+
+
+class RangeCodecReader:
+    """讀取 .lrz 錄製檔；reader[k] 解碼第 k 幀所在的塊（保留最近解碼的一塊）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        header = np.fromfile(path, dtype=CODEC_HEADER_DTYPE, count=1)
+        if len(header) != 1 or bytes(header['magic'][0]) != CODEC_MAGIC:
+            raise ValueError(f"不是距離影像編碼錄製檔: {path}")
+        header = header[0]
+        self.header_size = int(header['header_size'])
+        self.lines = int(header['lines'])
+        self.columns = int(header['columns'])
+        self.distance_dtype = header['distance_dtype'].decode()
+        self.method = header['method'].decode()
+        self.level = int(header['level'])
+        self.keyframe_interval = int(header['keyframe_interval'])
+        self.start_wall_ns = int(header['start_wall_ns'])
+        self.horizontal_range = [float(v) for v in header['horizontal_range']]
+        self.vertical_range = [float(v) for v in header['vertical_range']]
+        self.has_intensity = False  # 編碼錄製檔只保存距離
+        self.index = self._load_index()
+        # 每塊的 (偏移, 第一幀序號)
+        self.chunk_offsets, self.chunk_starts = np.unique(self.index['offset'], return_index=True)
+        self._cached: Optional[Tuple[int, List[RangeFrame]]] = None
+
+    def _load_index(self) -> np.ndarray:
+        """讀取索引檔；不存在或不完整時掃描各塊的未壓縮幀資訊重建"""
+        size = os.path.getsize(self.path)
+        index_path = self.path + INDEX_SUFFIX
+        if os.path.exists(index_path):
+            index = np.fromfile(index_path, dtype=ARCHIVE_INDEX_DTYPE)
+            if not len(index) or self._chunk_end(int(index['offset'][-1])) == size:
+                return index
+        entries = []
+        offset = self.header_size
+        with open(self.path, 'rb') as f:
+            while True:
+                f.seek(offset)
+                header = np.frombuffer(f.read(CHUNK_HEADER_DTYPE.itemsize), dtype=CHUNK_HEADER_DTYPE)
+                if not len(header):
+                    break
+                count, payload_size = int(header['frame_count'][0]), int(header['payload_size'][0])
+                meta = np.frombuffer(f.read(count * FRAME_META_DTYPE.itemsize), dtype=FRAME_META_DTYPE)
+                end = offset + CHUNK_HEADER_DTYPE.itemsize + count * FRAME_META_DTYPE.itemsize + payload_size
+                if len(meta) < count or end > size:
+                    break  # 錄製中斷留下的不完整塊
+                index = np.zeros(count, dtype=ARCHIVE_INDEX_DTYPE)
+                index['frame_id'] = meta['frame_id']
+                index['timestamp'] = meta['timestamp']
+                index['offset'] = offset
+                entries.append(index)
+                offset = end
+        return np.concatenate(entries) if entries else np.zeros(0, dtype=ARCHIVE_INDEX_DTYPE)
+
+    def _chunk_end(self, offset: int) -> int:
+        header = np.fromfile(self.path, dtype=CHUNK_HEADER_DTYPE, count=1, offset=offset)
+        if not len(header):
+            return -1
+        count, payload_size = int(header['frame_count'][0]), int(header['payload_size'][0])
+        return offset + CHUNK_HEADER_DTYPE.itemsize + count * FRAME_META_DTYPE.itemsize + payload_size
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def read_chunk(self, chunk: int) -> List[RangeFrame]:
+        """解碼第 chunk 塊的所有幀"""
+        if self._cached is not None and self._cached[0] == chunk:
+            return self._cached[1]
+        offset = int(self.chunk_offsets[chunk])
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            header = np.frombuffer(f.read(CHUNK_HEADER_DTYPE.itemsize), dtype=CHUNK_HEADER_DTYPE)
+            count, payload_size = int(header['frame_count'][0]), int(header['payload_size'][0])
+            meta = np.frombuffer(f.read(count * FRAME_META_DTYPE.itemsize), dtype=FRAME_META_DTYPE)
+            payload = f.read(payload_size)
+        distances, line_masks = decode_chunk(payload, count, self.lines, self.columns,
+                                             self.distance_dtype, self.method)
+        frames = [RangeFrame(int(m['frame_id']), distances[i], line_masks[i], float(m['timestamp']),
+                             float(m['completeness'])) for i, m in enumerate(meta)]
+        self._cached = (chunk, frames)
+        return frames
+
+    def __getitem__(self, k: int) -> RangeFrame:
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError(k)
+        chunk = int(np.searchsorted(self.chunk_starts, k, 'right')) - 1
+        return self.read_chunk(chunk)[k - int(self.chunk_starts[chunk])]
+
+    def __iter__(self) -> Iterator[RangeFrame]:
+        for chunk in range(len(self.chunk_offsets)):
+            yield from self.read_chunk(chunk)
+
+    def intensity(self, k: int) -> Optional[np.ndarray]:
+        return None
+
+    def find_frame(self, frame_id: int) -> Optional[int]:
+        """返回 frame_id 第一次出現的序號"""
+        hits = np.flatnonzero(self.index['frame_id'] == frame_id)
+        return int(hits[0]) if hits.size else None
+
+    def time_slice(self, start: float, end: float = float('inf')) -> Tuple[int, int]:
+        """返回 start <= timestamp < end 的序號範圍 [lo, hi)（time.time() 秒）"""
+        timestamps = self.index['timestamp']
+        return (int(np.searchsorted(timestamps, start, 'left')),
+                int(np.searchsorted(timestamps, end, 'left')))
+
+    def to_point_cloud(self, k: int) -> np.ndarray:
+        """將第 k 幀轉為 (N, 6) 點雲"""
+        frame = self[k]
+        return range_image_to_point_cloud(frame.distances, frame.line_mask,
+                                          self.horizontal_range, self.vertical_range)
+
+    def snapshot(self, k: int) -> CloudSnapshot:
+        """將第 k 幀轉為 CloudSnapshot，供 GUI 直接顯示"""
+        frame = self[k]
+        return CloudSnapshot(self.to_point_cloud(k), None, frame.timestamp, frame.frame_id,
+                             self.horizontal_range, self.vertical_range)
+
+
+def is_codec_file(path: str) -> bool:
+    with open(path, 'rb') as f:
+        return f.read(len(CODEC_MAGIC)) == CODEC_MAGIC
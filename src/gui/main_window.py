@@ -6,7 +6,6 @@ from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 import numpy as np
 from typing import Optional, Dict, Any
-import socket
 import threading
 import matplotlib
 import subprocess
@@ -27,6 +26,11 @@ from src.controller.lidar_controller import LidarController
 from src.data.data_processor import LidarDataProcessor
 from src.monitor.system_monitor import LidarMonitor
 from src.data.color_mapper import DistanceColorMapper
+from src.data.cloud_export import PCD_SUFFIX, PLY_SUFFIX, distance_colors, export_point_cloud, export_recording
+from src.data.cloud_snapshot import CloudSnapshot, SNAPSHOT_SUFFIX, load_cloud, save_snapshot
+from src.data.frame_archive import ARCHIVE_SUFFIX, is_archive
+from src.data.frame_recorder import open_recording
+from src.data.range_codec import CODEC_NONE, CODEC_SUFFIX, is_codec_file
 
 class MainWindow:
     def __init__(self, root: ThemedTk, controller: LidarController, 
@@ -53,6 +57,9 @@ class MainWindow:
         # 初始化距離顏色映射器
         self.color_mapper = DistanceColorMapper()
         
+        # 載入的點雲快照（.lcloud 或舊的 JSON），清除前優先顯示
+        self.loaded_cloud: Optional[CloudSnapshot] = None
+        
         # 角度範圍設定
         self.horizontal_range = [-30, 30]  # 水平角度範圍 (度)
         self.vertical_range = [-15, 15]    # 垂直角度範圍 (度)
@@ -90,6 +97,8 @@ class MainWindow:
         file_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="文件", menu=file_menu)
         file_menu.add_command(label="保存數據", command=self._save_data)
+        file_menu.add_command(label="導出點雲 (PLY/PCD)", command=self._export_point_cloud)
+        file_menu.add_command(label="導出錄製檔 (PLY/PCD)", command=self._export_recording)
         file_menu.add_command(label="導出報告", command=self._export_report)
         file_menu.add_separator()
         file_menu.add_command(label="退出", command=self.root.quit)
@@ -120,6 +129,8 @@ class MainWindow:
             foreground="red"
         )
         self.status_label.pack(side=tk.LEFT, padx=5)
+        self.record_label = ttk.Label(self.status_frame, text="")
+        self.record_label.pack(side=tk.RIGHT, padx=5)
     
     def _create_control_panel(self) -> None:
         """創建控制面板"""
@@ -247,6 +258,13 @@ class MainWindow:
             state=tk.DISABLED
         )
         self.clear_loaded_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.record_btn = ttk.Button(
+            cloud_frame,
+            text="開始錄製",
+            command=self._toggle_recording
+        )
+        self.record_btn.pack(side=tk.LEFT, padx=5)
     
     def _create_visualization_panel(self) -> None:
         """創建可視化面板"""
@@ -501,7 +519,7 @@ class MainWindow:
         self.ax2.set_title("2D投影")
         
         # 使用新的方法獲取要顯示的點雲數據
-        data = self.processor.get_display_point_cloud()
+        data = self._display_point_cloud()
         
         # 如果有數據，繪製點雲
         if data is not None:
@@ -757,46 +775,33 @@ class MainWindow:
     # 事件處理函數
     def _connect_device(self) -> None:
         """連接設備"""
-        ctrl_ok = False
-        data_ok = False
-        try:            
-            # 嘗試綁定控制端口
-            self.controller.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.controller.socket.bind(self.controller.local_addr)
-            ctrl_ok = True
-            # 嘗試綁定數據端口
-            self.controller.data_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.controller.data_socket.bind((self.controller.local_addr[0], 8881))
-            data_ok = True
-            self.controller.connected = True
-            self.controller.start_rx_thread()
-            self.controller.data_rx_running = True
-            self.controller.data_rx_thread = threading.Thread(target=self.controller._data_rx_loop)
-            self.controller.data_rx_thread.daemon = True
-            self.controller.data_rx_thread.start()
-        except Exception as e:
-            print(f"連接錯誤: {e}")
+        data_addr = f"{self.controller.local_addr[0]}:{self.controller.data_port}"
+        data_ok = self.controller.connect()
+        # connect() 先綁定控制端口再綁定數據端口，connected 只在控制端口成功後設置
+        ctrl_ok = self.controller.connected
         # 狀態顯示
         if ctrl_ok and data_ok:
             self.status_label.config(text="已連接", foreground="green")
-            self._log_message(f"[連接成功] 控制端口: {self.controller.local_addr} (8880) 數據端口: {self.controller.local_addr[0]}:8881")
+            self._log_message(f"[連接成功] 控制端口: {self.controller.local_addr} 數據端口: {data_addr}")
             self.connect_btn.config(state=tk.DISABLED)
             self.disconnect_btn.config(state=tk.NORMAL)
         elif not ctrl_ok:
-            self.status_label.config(text="控制端口(8880)連接失敗", foreground="red")
-            self._log_message(f"[連接失敗] 控制端口: {self.controller.local_addr} (8880)")
+            self.status_label.config(text=f"控制端口({self.controller.local_addr[1]})連接失敗", foreground="red")
+            self._log_message(f"[連接失敗] 控制端口: {self.controller.local_addr}")
             self.connect_btn.config(state=tk.NORMAL)
             self.disconnect_btn.config(state=tk.DISABLED)
-        elif not data_ok:
-            self.status_label.config(text="數據端口(8881)連接失敗", foreground="red")
-            self._log_message(f"[連接失敗] 數據端口: {self.controller.local_addr[0]}:8881")
+        else:
+            # 釋放已綁定的控制端口，以便重新連接
+            self.controller.disconnect()
+            self.status_label.config(text=f"數據端口({self.controller.data_port})連接失敗", foreground="red")
+            self._log_message(f"[連接失敗] 數據端口: {data_addr}")
             self.connect_btn.config(state=tk.NORMAL)
             self.disconnect_btn.config(state=tk.DISABLED)
     
     def _disconnect_device(self) -> None:
         self.controller.disconnect()
         self.status_label.config(text="未連接", foreground="red")
-        self._log_message(f"[已斷開] 控制端口: {self.controller.local_addr} (8880) 數據端口: {self.controller.local_addr[0]}:8881")
+        self._log_message(f"[已斷開] 控制端口: {self.controller.local_addr} 數據端口: {self.controller.local_addr[0]}:{self.controller.data_port}")
         self._log_message("設備已斷開")
         self.connect_btn.config(state=tk.NORMAL)
         self.disconnect_btn.config(state=tk.DISABLED)
@@ -820,6 +825,7 @@ class MainWindow:
         """開始掃描"""
         # 清除載入的點雲數據
         self.processor.clear_loaded_point_cloud()
+        self.loaded_cloud = None
         
         self.controller.start_data_transmission()
         self._log_message("[指令] 已發送開始掃描指令 (start_data_transmission)")
@@ -865,6 +871,51 @@ class MainWindow:
         self.stop_scan_btn.config(state=tk.DISABLED)
         self.save_cloud_btn.config(state=tk.DISABLED)
         self.load_cloud_btn.config(state=tk.NORMAL)  # 停止後可以載入點雲
+        if self.controller.frame_recorder is not None:
+            self._toggle_recording()
+
+    def _toggle_recording(self) -> None:
+        """開始或停止將每一幀錄製到 data/recordings/frames_YYYYMMDD_HHMMSS.larc（啟用壓縮時為 .lrz）"""
+        if self.controller.frame_recorder is not None:
+            recorder = self.controller.frame_recorder
+            self.controller.stop_frame_recording()
+            stats = recorder.get_stats()
+            self.record_btn.config(text="開始錄製")
+            self.record_label.config(text="")
+            self._log_message(f"[錄製] 已停止: {recorder.path}，{stats['frames']} 幀，"
+                              f"丟棄 {stats['dropped']} 幀")
+            return
+        try:
+            os.makedirs("data/recordings", exist_ok=True)
+            suffix = ARCHIVE_SUFFIX if self.controller.record_codec == CODEC_NONE else CODEC_SUFFIX
+            path = os.path.join("data/recordings",
+                                f"frames_{datetime.now().strftime('%Y%m%d_%H%M%S')}{suffix}")
+            self.controller.start_frame_recording(path)
+        except (OSError, ValueError) as e:
+            self._log_message(f"錄製錯誤: {e}")
+            messagebox.showerror("錄製錯誤", f"無法開始錄製:\n{e}")
+            return
+        self.record_btn.config(text="停止錄製")
+        self._log_message(f"[錄製] 開始錄製到: {path}")
+        self._record_mark = (time.monotonic(), 0)
+        self._update_record_status()
+
+    def _update_record_status(self) -> None:
+        """錄製期間每秒在狀態欄顯示已寫入幀數、磁碟寫入速率與丟幀數"""
+        recorder = self.controller.frame_recorder
+        if recorder is None:
+            return
+        stats = recorder.get_stats()
+        now = time.monotonic()
+        last_time, last_bytes = self._record_mark
+        rate = (stats['bytes'] - last_bytes) / (now - last_time) / 1e6 if now > last_time else 0.0
+        self._record_mark = (now, stats['bytes'])
+        self.record_label.config(
+            text=f"● 錄製 {stats['frames']} 幀 | {stats['bytes'] / 1e6:.0f} MB (x{stats['ratio']:.1f}) | "
+                 f"{rate:.1f} MB/s | "
+                 f"佇列 {stats['depth']}/{recorder.queue.maxsize} | 丟棄 {stats['dropped']}",
+            foreground="red" if stats['dropped'] else "")
+        self.root.after(1000, self._update_record_status)
 
     def _change_power(self, value) -> None:
         pass  # 移除雷射功率調整功能
@@ -891,7 +942,7 @@ class MainWindow:
                 self.processor.is_paused = True
             
             try:
-                filename = self.processor.save_current_point_cloud()
+                filename = self._save_point_cloud_snapshot()
                 self._log_message(f"當前點雲已保存到: {filename}")
                 messagebox.showinfo("保存成功", f"當前點雲已保存到:\n{filename}")
             finally:
@@ -952,7 +1003,23 @@ class MainWindow:
         )
     
     def on_new_frame(self, point_cloud):
-        """處理新的點雲幀"""
+        """處理新的點雲幀（在控制器的消費者線程中呼叫）
+
+        繪圖交給 Tk 主線程執行，並等待其完成；繪圖期間到達的幀由控制器只保留最新一幀。
+        """
+        done = threading.Event()
+
+        def render():
+            try:
+                self._render_frame(point_cloud)
+            finally:
+                done.set()
+
+        self.root.after(0, render)
+        done.wait(timeout=5.0)
+
+    def _render_frame(self, point_cloud):
+        """在 Tk 主線程中繪製新的點雲幀"""
         print(f"[DEBUG] on_new_frame 被呼叫, shape={point_cloud.shape if point_cloud is not None else 'None'}")
         self.processor.current_frame = point_cloud
         # 取得frame_id與點數
@@ -1054,10 +1121,29 @@ class MainWindow:
         ttk.Button(button_frame, text="應用", command=apply_custom).pack(side=tk.RIGHT, padx=5)
         ttk.Button(button_frame, text="取消", command=custom_window.destroy).pack(side=tk.RIGHT)
 
+    def _display_point_cloud(self) -> Optional[np.ndarray]:
+        """要顯示的點雲：有載入的快照時優先顯示"""
+        if self.loaded_cloud is not None:
+            return self.loaded_cloud.points
+        return self.processor.get_display_point_cloud()
+
+    def _save_point_cloud_snapshot(self) -> str:
+        """將當前點雲保存為二進位快照 data/saved_clouds/point_cloud_YYYYMMDD_HHMMSS.lcloud"""
+        point_cloud = self.processor.current_frame
+        if point_cloud is None:
+            raise ValueError("沒有當前點雲數據可保存")
+        os.makedirs(os.path.join('data', 'saved_clouds'), exist_ok=True)
+        filename = os.path.join('data', 'saved_clouds',
+                                f"point_cloud_{datetime.now().strftime('%Y%m%d_%H%M%S')}{SNAPSHOT_SUFFIX}")
+        return save_snapshot(filename, point_cloud,
+                             frame_id=getattr(self.controller, 'current_frame_id', None),
+                             horizontal_range=self.controller.horizontal_range,
+                             vertical_range=self.controller.vertical_range)
+
     def _save_current_cloud(self) -> None:
         """保存當前點雲數據"""
         try:
-            filename = self.processor.save_current_point_cloud()
+            filename = self._save_point_cloud_snapshot()
             self._log_message(f"當前點雲已保存到: {filename}")
             messagebox.showinfo("保存成功", f"當前點雲已保存到:\n{filename}")
         except ValueError as e:
@@ -1067,6 +1153,48 @@ class MainWindow:
             self._log_message(f"保存錯誤: {e}")
             messagebox.showerror("保存錯誤", f"保存時發生錯誤:\n{e}")
 
+    def _export_point_cloud(self) -> None:
+        """將當前顯示的點雲連同距離顏色匯出為二進位 PLY / PCD"""
+        points = self._display_point_cloud()
+        if points is None or len(points) == 0:
+            messagebox.showwarning("警告", "沒有可導出的點雲數據")
+            return
+        filename = filedialog.asksaveasfilename(
+            title="導出點雲", initialdir="data/saved_clouds", defaultextension=PLY_SUFFIX,
+            filetypes=[("PLY", f"*{PLY_SUFFIX}"), ("PCD", f"*{PCD_SUFFIX}")])
+        if not filename:
+            return
+        try:
+            export_point_cloud(filename, points, colors=distance_colors(self.color_mapper, points[:, 3]))
+            self._log_message(f"點雲已導出到: {filename} ({len(points)} 點)")
+        except Exception as e:
+            self._log_message(f"導出錯誤: {e}")
+            messagebox.showerror("導出錯誤", f"導出時發生錯誤:\n{e}")
+
+    def _export_recording(self) -> None:
+        """將錄製檔所有幀累積匯出為一個 PLY / PCD，在背景線程中進行"""
+        source = filedialog.askopenfilename(
+            title="選擇錄製檔", initialdir="data/recordings",
+            filetypes=[("錄製存檔", f"*{ARCHIVE_SUFFIX} *{CODEC_SUFFIX}"), ("All files", "*.*")])
+        if not source:
+            return
+        filename = filedialog.asksaveasfilename(
+            title="導出點雲", initialdir="data/saved_clouds", defaultextension=PLY_SUFFIX,
+            filetypes=[("PLY", f"*{PLY_SUFFIX}"), ("PCD", f"*{PCD_SUFFIX}")])
+        if not filename:
+            return
+
+        def run():
+            try:
+                count = export_recording(filename, open_recording(source), mapper=self.color_mapper)
+                message = f"錄製檔已導出到: {filename} ({count} 點)"
+            except Exception as e:
+                message = f"導出錯誤: {e}"
+            self.root.after(0, self._log_message, message)
+
+        self._log_message(f"開始導出錄製檔: {source}")
+        threading.Thread(target=run, name='cloud-export', daemon=True).start()
+
     def _load_cloud(self) -> None:
         """載入點雲數據"""
         from tkinter import filedialog
@@ -1074,12 +1202,19 @@ class MainWindow:
         filename = filedialog.askopenfilename(
             title="選擇要載入的點雲文件",
             initialdir="data/saved_clouds",
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+            filetypes=[("點雲文件", f"*{SNAPSHOT_SUFFIX} *{ARCHIVE_SUFFIX} *{CODEC_SUFFIX} *.json"),
+                       ("點雲快照", f"*{SNAPSHOT_SUFFIX}"), ("錄製存檔", f"*{ARCHIVE_SUFFIX} *{CODEC_SUFFIX}"),
+                       ("JSON files", "*.json"), ("All files", "*.*")]
         )
         
         if filename:
             try:
-                self.processor.load_point_cloud(filename)
+                if is_archive(filename) or is_codec_file(filename):
+                    self.loaded_cloud = self._load_archive_frame(filename)
+                    if self.loaded_cloud is None:
+                        return
+                else:
+                    self.loaded_cloud = load_cloud(filename)
                 self._log_message(f"已載入點雲數據: {filename}")
                 messagebox.showinfo("載入成功", f"已載入點雲數據:\n{filename}")
                 self.clear_loaded_btn.config(state=tk.NORMAL)
@@ -1090,9 +1225,24 @@ class MainWindow:
                 self._log_message(f"載入錯誤: {e}")
                 messagebox.showerror("載入錯誤", f"載入時發生錯誤:\n{e}")
 
+    def _load_archive_frame(self, filename: str) -> Optional[CloudSnapshot]:
+        """從錄製存檔選擇一幀轉為點雲（.larc 直接由記憶體映射讀取，.lrz 只解碼該幀所在的塊）"""
+        from tkinter import simpledialog
+
+        archive = open_recording(filename)
+        if not len(archive):
+            raise ValueError("存檔中沒有完整的幀")
+        index = simpledialog.askinteger(
+            "選擇幀", f"存檔共 {len(archive)} 幀，輸入要載入的序號 (0-{len(archive) - 1}):",
+            initialvalue=len(archive) - 1, minvalue=0, maxvalue=len(archive) - 1, parent=self.root)
+        if index is None:
+            return None
+        return archive.snapshot(index)
+
     def _clear_loaded_cloud(self) -> None:
         """清除載入的點雲數據"""
         self.processor.clear_loaded_point_cloud()
+        self.loaded_cloud = None
         self._log_message("已清除載入的點雲數據")
         self.clear_loaded_btn.config(state=tk.DISABLED)
         # 更新顯示
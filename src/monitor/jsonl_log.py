@@ -0,0 +1,134 @@
+"""只追加的 JSONL 日誌
+
+每筆紀錄一行 JSON（必含 ts: time.time() 秒），由背景線程批次寫入，呼叫端只放入佇列。
+檔名為 {prefix}_YYYYMMDD_NNN.jsonl：跨日或檔案超過 max_bytes 時換到新檔，舊檔不再改寫。
+"""
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+LOG_SUFFIX = '.jsonl'
+
+
+def _log_files(directory: str, prefix: str, day: str) -> List[str]:
+    """某一天的所有日誌檔（依序號排序）"""
+    return sorted(glob.glob(os.path.join(directory, f'{prefix}_{day}_*{LOG_SUFFIX}')))
+
+
+class JsonlLogWriter:
+    """背景線程寫入的 JSONL 日誌；佇列滿時丟棄並計入 dropped"""
+
+    def __init__(self, directory: str = 'logs', prefix: str = 'error_log',
+                 max_bytes: int = 10 * 1024 * 1024, queue_size: int = 4096):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._queue: queue.Queue = queue.Queue(queue_size)
+        self._file = None
+        self._day = None
+        self.path: Optional[str] = None
+
+        # 統計計數
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+
+        self._thread = threading.Thread(target=self._writer_loop, name=f'{prefix}-writer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def write(self, entry: Dict) -> bool:
+        """放入一筆紀錄，不等待磁碟寫入"""
+        entry.setdefault('ts', time.time())
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _open(self, day: str) -> None:
+        if self._file is not None:
+            self._file.close()
+            self.rotations += 1
+        existing = _log_files(self.directory, self.prefix, day)
+        index = int(existing[-1][-len(LOG_SUFFIX) - 3:-len(LOG_SUFFIX)]) if existing else 0
+        path = os.path.join(self.directory, f'{self.prefix}_{day}_{index:03d}{LOG_SUFFIX}')
+        if os.path.exists(path) and os.path.getsize(path) >= self.max_bytes:
+            path = os.path.join(self.directory, f'{self.prefix}_{day}_{index + 1:03d}{LOG_SUFFIX}')
+        self._file = open(path, 'a', encoding='utf-8')
+        self._day = day
+        self.path = path
+
+    def _writer_loop(self) -> None:
+        while True:
+            entries = [self._queue.get()]
+            while len(entries) < 1024:
+                try:
+                    entries.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_entries([e for e in entries if e is not None])
+            except Exception as e:
+                print(f"[日誌寫入錯誤] {e}")
+            for _ in entries:
+                self._queue.task_done()
+            if None in entries:
+                break
+
+    def _write_entries(self, entries: List[Dict]) -> None:
+        for entry in entries:
+            day = datetime.fromtimestamp(entry['ts']).strftime('%Y%m%d')
+            if day != self._day or self._file.tell() >= self.max_bytes:
+                self._open(day)
+            self._file.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+            self.written += 1
+        if self._file is not None:
+            self._file.flush()
+
+    def flush(self) -> None:
+        """等待佇列中的紀錄寫入檔案"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """寫完佇列中剩餘的紀錄並關閉檔案"""
+        self._queue.put(None)
+        self._thread.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'written': self.written,
+            'dropped': self.dropped,
+            'rotations': self.rotations,
+            'queue_depth': self._queue.qsize(),
+        }
+
+
+def read_log_window(directory: str, prefix: str, start: float,
+                    end: Optional[float] = None) -> Iterator[Dict]:
+    """依時間順序讀出 start <= ts < end 的紀錄（time.time() 秒），只開啟時間範圍內日期的檔案"""
+    if end is None:
+        end = time.time()
+    day = datetime.fromtimestamp(start).date()
+    last_day = datetime.fromtimestamp(end).date()
+    while day <= last_day:
+        for path in _log_files(directory, prefix, day.strftime('%Y%m%d')):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 寫入中斷留下的不完整行
+                    if start <= entry.get('ts', 0) < end:
+                        yield entry
+        day += timedelta(days=1)
@@ -0,0 +1,81 @@
+"""UDP socket 接收緩衝區設定與核心丟包統計（Linux /proc/net/udp）"""
+import os
+import socket
+import time
+from typing import Dict, Optional
+
+PROC_UDP_FILES = ('/proc/net/udp', '/proc/net/udp6')
+
+
+def set_receive_buffer(sock: socket.socket, size: int) -> int:
+    """請求 SO_RCVBUF 大小，返回核心實際給予的大小
+
+    Linux 會將請求值加倍並受 net.core.rmem_max 限制，實際大小可能與請求不同。
+    """
+    if size > 0:
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, size)
+        except OSError as e:
+            print(f"[SO_RCVBUF設定失敗] {e}")
+    return sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+
+
+def read_udp_socket_stats(inode: int) -> Optional[Dict[str, int]]:
+    """由 /proc/net/udp 讀取指定 inode 的 socket 統計，找不到時返回 None
+
+    返回 rx_queue（佇列中未讀取的字節數）與 drops（核心丟棄的數據報數）。
+    """
+    target = str(inode)
+    for path in PROC_UDP_FILES:
+        try:
+            with open(path, 'r') as f:
+                next(f)  # 標題列
+                for line in f:
+                    fields = line.split()
+                    # sl local rem st tx:rx tr:tm retrnsmt uid timeout inode ref pointer drops
+                    if len(fields) >= 13 and fields[9] == target:
+                        rx_queue = int(fields[4].split(':')[1], 16)
+                        return {'rx_queue': rx_queue, 'drops': int(fields[12])}
+        except (OSError, StopIteration):
+            continue
+    return None
+
+
+class KernelDropSampler:
+    """定期取樣單一 socket 的核心丟包計數"""
+
+    def __init__(self, sock: socket.socket, interval: float = 1.0):
+        self.interval = interval
+        self.inode = os.fstat(sock.fileno()).st_ino
+        self.rcvbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        self.available = True  # 非 Linux 或無法讀取 /proc 時為 False
+        self.drops = 0  # socket 建立以來核心丟棄的數據報數
+        self.rx_queue = 0
+        self.peak_rx_queue = 0
+        self._last_sample = 0.0
+        self.sample(force=True)
+
+    def sample(self, now: Optional[float] = None, force: bool = False) -> None:
+        """距上次取樣超過 interval 時讀取 /proc/net/udp"""
+        if not self.available:
+            return
+        if now is None:
+            now = time.monotonic()
+        if not force and now - self._last_sample < self.interval:
+            return
+        self._last_sample = now
+        stats = read_udp_socket_stats(self.inode)
+        if stats is None:
+            self.available = False
+            return
+        self.drops = stats['drops']
+        self.rx_queue = stats['rx_queue']
+        self.peak_rx_queue = max(self.peak_rx_queue, self.rx_queue)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'rcvbuf_granted': self.rcvbuf,
+            'kernel_drops': self.drops,
+            'kernel_rx_queue': self.rx_queue,
+            'kernel_rx_queue_peak': self.peak_rx_queue,
+        }
@@ -0,0 +1,143 @@
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+# 狀態封包 (0xAA55 0xFF) 的欄位；timestamp 為 time.monotonic() 秒
+STATUS_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('status', 'u1'),
+    ('error', 'u1'),
+    ('mode', 'u1'),
+    ('temperature', 'u1'),
+    ('motor_speed', '<u2'),
+    ('laser_power', 'u1'),
+])
+
+
+class TimeRing:
+    """固定容量、以時間索引的欄式環形緩衝區
+
+    以 NumPy 結構化陣列保存（第一欄為 time.monotonic() 秒的 timestamp），寫滿後覆蓋最舊的紀錄；
+    時間戳單調遞增，時間窗查詢在兩段有序區間上以二分搜尋定位，不需要逐筆掃描。
+    """
+
+    def __init__(self, dtype: np.dtype, capacity: int):
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=self.dtype)
+        self._head = 0   # 下一筆寫入位置
+        self._count = 0
+        self._lock = threading.Lock()
+        self.total = 0   # 累計寫入筆數
+        self.wall_offset = time.time() - time.monotonic()  # 單調時間轉牆上時間
+
+    def __len__(self) -> int:
+        return self._count
+
+    def extend(self, records: Iterable[Tuple]) -> None:
+        """批次寫入依欄位順序排列的紀錄（時間戳須不早於已寫入的紀錄）"""
+        records = np.asarray(records if isinstance(records, np.ndarray) else list(records),
+                             dtype=self.dtype)
+        with self._lock:
+            self._write(records)
+
+    def append(self, *values) -> None:
+        self.extend([values])
+
+    def append_now(self, *values) -> float:
+        """以目前的單調時間作為 timestamp 寫入一筆紀錄，返回該時間戳"""
+        with self._lock:
+            timestamp = time.monotonic()
+            self._write(np.array([(timestamp,) + values], dtype=self.dtype))
+        return timestamp
+
+    def _write(self, records: np.ndarray) -> None:
+        if len(records) > self.capacity:
+            records = records[-self.capacity:]
+        n = len(records)
+        first = min(n, self.capacity - self._head)
+        self._data[self._head:self._head + first] = records[:first]
+        self._data[:n - first] = records[first:]
+        self._head = (self._head + n) % self.capacity
+        self._count = min(self._count + n, self.capacity)
+        self.total += n
+
+    def _segments(self) -> Tuple[np.ndarray, np.ndarray]:
+        """依時間順序返回 (較舊, 較新) 兩段視圖"""
+        if self._count < self.capacity:
+            return self._data[:0], self._data[:self._count]
+        return self._data[self._head:], self._data[:self._head]
+
+    def _bounds(self, start: float, end: float):
+        for segment in self._segments():
+            timestamps = segment['timestamp']
+            yield segment, np.searchsorted(timestamps, start, 'left'), \
+                np.searchsorted(timestamps, end, 'left')
+
+    def latest(self) -> Optional[np.void]:
+        with self._lock:
+            if not self._count:
+                return None
+            return self._data[self._head - 1].copy()
+
+    def tail(self, count: int) -> np.ndarray:
+        """返回最新的 count 筆紀錄副本（依時間排序）"""
+        with self._lock:
+            count = min(count, self._count)
+            return self._data[(self._head - count + np.arange(count)) % self.capacity]
+
+    def between(self, start: float = float('-inf'), end: float = float('inf')) -> np.ndarray:
+        """返回 start <= timestamp < end 的紀錄副本（依時間排序）"""
+        with self._lock:
+            return np.concatenate([segment[lo:hi] for segment, lo, hi in self._bounds(start, end)])
+
+    def count_between(self, start: float = float('-inf'), end: float = float('inf')) -> int:
+        """時間範圍內的紀錄數，不複製數據"""
+        with self._lock:
+            return int(sum(hi - lo for _, lo, hi in self._bounds(start, end)))
+
+    def window(self, seconds: float, now: Optional[float] = None) -> np.ndarray:
+        """返回最近 seconds 秒內的紀錄"""
+        if now is None:
+            now = time.monotonic()
+        return self.between(now - seconds)
+
+    def to_wall_time(self, timestamp: float) -> float:
+        """單調時間戳轉為 time.time() 秒"""
+        return timestamp + self.wall_offset
+
+    def clear(self) -> None:
+        with self._lock:
+            self._head = 0
+            self._count = 0
+
+
+class StatusRing(TimeRing):
+    """狀態封包時間序列"""
+
+    def __init__(self, capacity: int = 65536):
+        super().__init__(STATUS_DTYPE, capacity)
+
+    def append(self, timestamp: float, status: int, error: int, mode: int, temperature: int,
+               motor_speed: int = 0, laser_power: int = 0) -> None:
+        self.extend([(timestamp, status, error, mode, temperature, motor_speed, laser_power)])
+
+    def summary(self, seconds: float) -> Dict[str, float]:
+        """時間窗內的統計摘要"""
+        records = self.window(seconds)
+        if not len(records):
+            return {'samples': 0}
+        temperature = records['temperature']
+        span = float(records['timestamp'][-1] - records['timestamp'][0])
+        return {
+            'samples': int(len(records)),
+            'rate_hz': (len(records) - 1) / span if span > 0 else 0.0,
+            'temperature_min': int(temperature.min()),
+            'temperature_max': int(temperature.max()),
+            'temperature_mean': float(temperature.mean()),
+            'error_samples': int(np.count_nonzero(records['error'])),
+            'last_status': int(records['status'][-1]),
+            'last_error': int(records['error'][-1]),
+        }
@@ -1,16 +1,52 @@
 import json
+import threading
 import time
 from datetime import datetime
 from typing import Dict, List, Optional
 import os
 
+import numpy as np
+
+from src.monitor.jsonl_log import JsonlLogWriter, read_log_window
+from src.monitor.status_ring import StatusRing, TimeRing
+
+# 狀態封包錯誤碼 (lidar_command_set.md 附錄)
+STATUS_ERROR_NAMES = {
+    0x01: '馬達錯誤',
+    0x02: '雷射錯誤',
+    0x03: '溫度過高',
+    0x04: '電壓異常',
+    0x05: '通訊錯誤',
+    0x06: '記憶體錯誤',
+    0xFF: '未知錯誤',
+}
+
+# 狀態歷史的數值欄位（current_status 中對應的鍵）
+STATUS_COLUMNS = [
+    ('system_state', '<i4'),
+    ('system_mode', '<i4'),
+    ('error_code', '<i4'),
+    ('temperature', '<f8'),
+    ('voltage', '<f8'),
+    ('motor_speed', '<i4'),
+    ('laser_power', '<i4'),
+    ('scan_progress', '<f8'),
+]
+HISTORY_DTYPE = np.dtype([('timestamp', '<f8')] + STATUS_COLUMNS)
+# 錯誤日誌：錯誤碼、訊息與當時的狀態快照（last_update 為 time.time() 秒，NaN 表示尚未更新）
+ERROR_DTYPE = np.dtype([('timestamp', '<f8'), ('code', '<i4'), ('error_msg', 'O'),
+                        ('last_update', '<f8')] + STATUS_COLUMNS)
+
 class LidarMonitor:
-    def __init__(self):
-        self.status_history: List[Dict] = []
-        self.error_log: List[Dict] = []
-        self.max_history_size = 1000
-        self.max_error_log_size = 1000
+    def __init__(self, status_capacity: int = 65536, max_history_size: int = 1000,
+                 max_error_log_size: int = 1000, log_dir: str = 'logs',
+                 log_max_bytes: int = 10 * 1024 * 1024):
+        self.max_history_size = max_history_size
+        self.max_error_log_size = max_error_log_size
+        self.status_history = TimeRing(HISTORY_DTYPE, max_history_size)
+        self.error_log = TimeRing(ERROR_DTYPE, max_error_log_size)
         self.current_status = {
+            'system_state': 0,
             'system_mode': 0,  # 0:待機, 1:掃描, 2:校準
             'error_code': 0,
             'temperature': 0,
@@ -20,91 +56,144 @@ class LidarMonitor:
             'scan_progress': 0,
             'last_update': None
         }
+        self.status_ring = StatusRing(status_capacity)  # 狀態封包時間序列
+        self._status_queue = None
+        self._status_thread: Optional[threading.Thread] = None
+        self._status_running = False
         
         # 創建日誌目錄
-        os.makedirs('logs', exist_ok=True)
+        self.log_dir = log_dir
+        os.makedirs(log_dir, exist_ok=True)
+        # 錯誤日誌檔 (logs/error_log_YYYYMMDD_NNN.jsonl)，由背景線程追加寫入
+        self.error_log_writer = JsonlLogWriter(log_dir, 'error_log', log_max_bytes)
     
     def update_status(self, status_data: Dict) -> None:
         """更新系統狀態"""
         self.current_status.update(status_data)
         self.current_status['last_update'] = datetime.now()
         
-        # 添加到歷史記錄
-        self.status_history.append(self.current_status.copy())
-        
-        # 限制歷史記錄大小
-        if len(self.status_history) > self.max_history_size:
-            self.status_history.pop(0)
+        # 添加到歷史記錄（只保存數值欄位，環形緩衝區寫滿後覆蓋最舊的紀錄）
+        self.status_history.append_now(*self._status_values())
+    
+    def _status_values(self) -> tuple:
+        return tuple(self.current_status.get(name) or 0 for name, _ in STATUS_COLUMNS)
+    
+    def _status_dict(self, record: np.void, last_update: Optional[datetime]) -> Dict:
+        status = {name: record[name].item() for name, _ in STATUS_COLUMNS}
+        status['last_update'] = last_update
+        return status
+    
+    def attach(self, status_queue) -> None:
+        """開始從控制器的 status_queue 取出狀態封包寫入 status_ring"""
+        self.detach()
+        self._status_queue = status_queue
+        self._status_running = True
+        self._status_thread = threading.Thread(target=self._status_loop, name='status-monitor')
+        self._status_thread.daemon = True
+        self._status_thread.start()
+    
+    def detach(self) -> None:
+        """停止取出狀態封包"""
+        self._status_running = False
+        if self._status_thread is not None:
+            self._status_thread.join(timeout=1.0)
+            self._status_thread = None
+    
+    def _status_loop(self) -> None:
+        while self._status_running:
+            batch = self._status_queue.get_batch(1024, timeout=0.2)
+            if batch:
+                self.ingest_status(batch)
+    
+    def ingest_status(self, batch: List[tuple]) -> None:
+        """批次寫入狀態紀錄，只以最後一筆更新 current_status，錯誤碼變為非零時記錄錯誤"""
+        previous_error = self.current_status['error_code']
+        self.status_ring.extend(batch)
+        _, status, error, mode, temperature, motor_speed, laser_power = batch[-1]
+        self.current_status.update({
+            'system_state': status,
+            'system_mode': mode,
+            'error_code': error,
+            'temperature': temperature,
+            'motor_speed': motor_speed,
+            'laser_power': laser_power,
+            'last_update': datetime.now(),
+        })
+        errors = [record[2] for record in batch]
+        for before, after in zip([previous_error] + errors[:-1], errors):
+            if after and after != before:
+                self.log_error(after, STATUS_ERROR_NAMES.get(after, f'錯誤碼 0x{after:02X}'))
+    
+    def get_status_window(self, seconds: float = 60.0) -> np.ndarray:
+        """最近 seconds 秒內的狀態封包紀錄 (STATUS_DTYPE 陣列)"""
+        return self.status_ring.window(seconds)
+    
+    def get_status_summary(self, seconds: float = 60.0) -> Dict:
+        """最近 seconds 秒內的狀態統計（取樣率、溫度範圍、錯誤取樣數）"""
+        return self.status_ring.summary(seconds)
     
     def log_error(self, error_code: int, error_msg: str) -> None:
         """記錄錯誤"""
-        error_entry = {
-            'timestamp': datetime.now(),
+        last_update = self.current_status['last_update']
+        values = self._status_values()
+        timestamp = self.error_log.append_now(error_code, error_msg,
+                                              last_update.timestamp() if last_update else np.nan,
+                                              *values)
+        
+        # 追加到日誌檔（不在呼叫端線程寫入磁碟）
+        system_status = dict(zip([name for name, _ in STATUS_COLUMNS], values))
+        system_status['last_update'] = last_update.strftime("%Y-%m-%d %H:%M:%S") if last_update else None
+        wall_time = self.error_log.to_wall_time(timestamp)
+        self.error_log_writer.write({
+            'ts': wall_time,
+            'timestamp': datetime.fromtimestamp(wall_time).strftime("%Y-%m-%d %H:%M:%S"),
             'error_code': error_code,
             'error_msg': error_msg,
-            'system_status': self.current_status.copy()
-        }
-        
-        self.error_log.append(error_entry)
-        
-        # 限制錯誤日誌大小
-        if len(self.error_log) > self.max_error_log_size:
-            self.error_log.pop(0)
-        
-        # 保存到文件
-        self._save_error_log()
+            'system_status': system_status,
+        })
     
     def get_status_history(self, duration_minutes: int = 60) -> List[Dict]:
         """獲取指定時間範圍內的狀態歷史"""
-        if not self.status_history:
-            return []
-            
-        cutoff_time = datetime.now().timestamp() - (duration_minutes * 60)
-        return [s for s in self.status_history 
-                if s['last_update'].timestamp() > cutoff_time]
+        records = self.status_history.window(duration_minutes * 60)
+        wall = records['timestamp'] + self.status_history.wall_offset
+        return [self._status_dict(record, datetime.fromtimestamp(t))
+                for record, t in zip(records, wall.tolist())]
     
     def get_error_log(self, duration_minutes: int = 60) -> List[Dict]:
         """獲取指定時間範圍內的錯誤日誌"""
-        if not self.error_log:
-            return []
-            
-        cutoff_time = datetime.now().timestamp() - (duration_minutes * 60)
-        return [e for e in self.error_log 
-                if e['timestamp'].timestamp() > cutoff_time]
-    
-    def _save_error_log(self) -> None:
-        """保存錯誤日誌到文件"""
-        if not self.error_log:
-            return
-            
-        timestamp = datetime.now().strftime("%Y%m%d")
-        filename = f"logs/error_log_{timestamp}.json"
-        
-        # 轉換datetime對象為字符串
-        log_data = []
-        for entry in self.error_log:
-            entry_copy = entry.copy()
-            entry_copy['timestamp'] = entry_copy['timestamp'].strftime("%Y-%m-%d %H:%M:%S")
-            if entry_copy['system_status']['last_update']:
-                entry_copy['system_status']['last_update'] = \
-                    entry_copy['system_status']['last_update'].strftime("%Y-%m-%d %H:%M:%S")
-            log_data.append(entry_copy)
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(log_data, f, indent=4, ensure_ascii=False)
+        return self._error_entries(self.error_log.window(duration_minutes * 60))
+    
+    def _error_entries(self, records: np.ndarray) -> List[Dict]:
+        wall = records['timestamp'] + self.error_log.wall_offset
+        entries = []
+        for record, t in zip(records, wall.tolist()):
+            last_update = record['last_update']
+            entries.append({
+                'timestamp': datetime.fromtimestamp(t),
+                'error_code': int(record['code']),
+                'error_msg': record['error_msg'],
+                'system_status': self._status_dict(
+                    record, None if np.isnan(last_update) else datetime.fromtimestamp(last_update)),
+            })
+        return entries
+    
+    def read_error_log(self, duration_minutes: int = 60) -> List[Dict]:
+        """從日誌檔讀出時間範圍內的錯誤（包含已被環形緩衝區覆蓋或先前執行的紀錄）"""
+        self.error_log_writer.flush()
+        return list(read_log_window(self.log_dir, 'error_log', time.time() - duration_minutes * 60))
     
     def get_system_health(self) -> Dict:
         """獲取系統健康狀態"""
-        if not self.status_history:
+        if not self.status_history and not len(self.status_ring):
             return {'status': 'unknown', 'message': 'No status data available'}
         
-        # 檢查最近的錯誤
-        recent_errors = self.get_error_log(duration_minutes=5)
+        # 檢查最近的錯誤（二分搜尋定位 5 分鐘時間窗，只轉換最後一筆）
+        recent_errors = self.error_log.count_between(time.monotonic() - 5 * 60)
         if recent_errors:
             return {
                 'status': 'error',
-                'message': f'Recent errors: {len(recent_errors)}',
-                'last_error': recent_errors[-1]
+                'message': f'Recent errors: {recent_errors}',
+                'last_error': self._error_entries(self.error_log.tail(1))[-1]
             }
         
         # 檢查溫度
@@ -115,8 +204,8 @@ class LidarMonitor:
                 'temperature': self.current_status['temperature']
             }
         
-        # 檢查電壓
-        if self.current_status['voltage'] < 10:  # 假設10V為低電壓警告
+        # 檢查電壓（狀態封包不含電壓，0 表示未回報）
+        if 0 < self.current_status['voltage'] < 10:  # 假設10V為低電壓警告
             return {
                 'status': 'warning',
                 'message': 'Low voltage warning',
@@ -129,25 +218,32 @@ class LidarMonitor:
             'last_update': self.current_status['last_update'].strftime("%Y-%m-%d %H:%M:%S")
         }
     
+    def close(self) -> None:
+        """停止狀態取出線程，寫完並關閉錯誤日誌檔"""
+        self.detach()
+        self.error_log_writer.close()
+    
     def clear_history(self) -> None:
         """清空歷史記錄"""
         self.status_history.clear()
         self.error_log.clear()
+        self.status_ring.clear()
     
     def export_status_report(self, duration_minutes: int = 60) -> str:
         """導出狀態報告"""
-        if not self.status_history:
+        if not self.status_history and not len(self.status_ring):
             return ""
             
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"logs/status_report_{timestamp}.json"
+        filename = os.path.join(self.log_dir, f"status_report_{timestamp}.json")
         
         report_data = {
             'report_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             'duration_minutes': duration_minutes,
             'status_history': self.get_status_history(duration_minutes),
-            'error_log': self.get_error_log(duration_minutes),
-            'current_status': self.current_status,
+            'status_telemetry': self.get_status_summary(duration_minutes * 60),
+            'error_log': self.read_error_log(duration_minutes),
+            'current_status': dict(self.current_status),
             'system_health': self.get_system_health()
         }
         
@@ -156,11 +252,16 @@ class LidarMonitor:
             if entry['last_update']:
                 entry['last_update'] = entry['last_update'].strftime("%Y-%m-%d %H:%M:%S")
         
-        for entry in report_data['error_log']:
-            entry['timestamp'] = entry['timestamp'].strftime("%Y-%m-%d %H:%M:%S")
-            if entry['system_status']['last_update']:
-                entry['system_status']['last_update'] = \
-                    entry['system_status']['last_update'].strftime("%Y-%m-%d %H:%M:%S")
+        if report_data['current_status']['last_update']:
+            report_data['current_status']['last_update'] = \
+                report_data['current_status']['last_update'].strftime("%Y-%m-%d %H:%M:%S")
+        
+        last_error = report_data['system_health'].get('last_error')
+        if last_error:
+            last_error['timestamp'] = last_error['timestamp'].strftime("%Y-%m-%d %H:%M:%S")
+            if last_error['system_status']['last_update']:
+                last_error['system_status']['last_update'] = \
+                    last_error['system_status']['last_update'].strftime("%Y-%m-%d %H:%M:%S")
         
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(report_data, f, indent=4, ensure_ascii=False)
@@ -0,0 +1,417 @@
+"""本機 LiDAR 模擬器：模擬設備的 8880 指令端口與 8881 數據串流
+
+接受 lidar_test/command_list.txt 的文字指令（scanxy 1/0、startbldc、getid、tmp ...）
+以及 LidarController.send_command 的 0xAA55 二進位指令，並以設定的幀率送出 S 型掃描的 d/e/a 封包，
+可模擬丟包、亂序與突發傳送。
+
+在同一台機器上執行時，模擬器綁定另一個 loopback 位址，例如：
+
+    python -m src.simulator.lidar_simulator --ip 127.0.0.2 --fps 10 --loss 0.01
+
+並將 etherInform.json 設為 localIP=127.0.0.1、remoteIP=127.0.0.2。
+"""
+import argparse
+import os
+import random
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.controller.command_tracker import build_command_packet
+from src.data.angle_lut import get_angle_lut
+from src.data.frame_assembler import COLUMNS, DEFAULT_LINES
+from src.data.packet_decoder import (encode_packets, encode_intensity_packets, PACKET_SIZE,
+                                     PACKET_TYPE_D, PACKET_TYPE_E, POINTS_PER_PACKET,
+                                     MAX_VALID_DISTANCE_CM)
+
+# 回應碼 (lidar_command_set.md 1.2)
+RESULT_OK = 0x00
+RESULT_PARAM_ERROR = 0x01
+RESULT_BUSY = 0x02
+RESULT_HARDWARE_ERROR = 0x03
+RESULT_UNSUPPORTED = 0x04
+
+COMMAND_LIST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 '..', '..', 'lidar_test', 'command_list.txt')
+
+# 只需回覆 OK 的文字指令
+TEXT_COMMANDS_OK = {
+    'apddc', 'apdhv', 'fire', 'setdac5321', 'setstepvref', 'stepup', 'stepdown',
+    'stephomeup', 'stephomedown', 'writestepbuf', 'setpolygonparam', 'savelidarparam',
+    'setapd', 'setbldcspeed', 'changeshowtype', 'setmyipaddr', 'setmynetmask',
+    'setmygateway', 'setstopmask', 'setechonum', 'setsteptop', 'pack.demo',
+}
+
+
+def build_scene(lines: int = DEFAULT_LINES, horizontal_range=(-30.0, 30.0),
+                vertical_range=(-15.0, 15.0)) -> np.ndarray:
+    """產生模擬場景的距離影像 (cm)：前方 20 m 的牆面與 1.5 m 下方的地面"""
+    lut = get_angle_lut(horizontal_range, vertical_range, lines, COLUMNS)
+    dx = lut.directions[..., 0]
+    dz = lut.directions[..., 2]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        wall = np.where(dx > 0, 20.0 / dx, np.inf)
+        ground = np.where(dz < 0, -1.5 / dz, np.inf)
+    r = np.minimum(wall, ground) * 100.0
+    r[~np.isfinite(r) | (r >= MAX_VALID_DISTANCE_CM)] = 0
+    return r.astype(np.uint32)
+
+
+class LidarSimulator:
+    """LiDAR 設備模擬器
+
+    fps 為 0 時不限速，用於吞吐量測試。loss 為每個封包的丟棄機率，reorder 為與下一個封包交換順序的機率，
+    burst 為每次連續送出的封包數（其餘時間平均分配）。data_port 為 None 時數據送回指令來源端口
+    （供 integrated_lidar_control 使用），否則送往指令來源 IP 的 data_port。
+    二進位指令的回應依 lidar_command_set.md 1.1 不含指令碼；echo=True 時在資料前加上指令碼，
+    模擬會回傳指令碼的韌體（控制器需設定 commandEcho）。
+    """
+
+    def __init__(self, ip: str = '127.0.0.2', port: int = 8880, data_port: Optional[int] = 8881,
+                 lines: int = DEFAULT_LINES, fps: float = 10.0, loss: float = 0.0,
+                 reorder: float = 0.0, burst: int = 1, intensity: bool = False,
+                 status_hz: float = 1.0, seed: Optional[int] = None, echo: bool = False):
+        self.ip = ip
+        self.port = port
+        self.data_port = data_port
+        self.lines = lines
+        self.fps = fps
+        self.loss = loss
+        self.reorder = reorder
+        self.burst = max(1, burst)
+        self.intensity = intensity
+        self.status_hz = status_hz
+        self.echo = echo
+        self.random = random.Random(seed)
+        self.horizontal_range = [-30.0, 30.0]
+        self.vertical_range = [-15.0, 15.0]
+        self.scene = build_scene(lines, self.horizontal_range, self.vertical_range)
+
+        self.control_socket: Optional[socket.socket] = None
+        self.data_socket: Optional[socket.socket] = None
+        self.peer: Optional[Tuple[str, int]] = None  # 最近送出指令的來源位址
+        self.running = False
+        self.streaming = threading.Event()
+        self.motor_running = False
+        self.motor_speed = 0
+        self.laser_power = 100
+        self.mode = 0
+        self.frame_count = 0
+        self._threads: List[threading.Thread] = []
+
+        # 統計計數
+        self.packets_sent = 0
+        self.frames_sent = 0
+        self.packets_lost = 0
+        self.packets_reordered = 0
+        self.commands_received = 0
+
+    def start(self) -> None:
+        """綁定指令端口並啟動指令、串流與狀態線程"""
+        self.control_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.control_socket.bind((self.ip, self.port))
+        self.data_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.data_socket.bind((self.ip, 0))
+        print(f"[模擬器] 指令端口: {self.control_socket.getsockname()}")
+        self.running = True
+        for target in (self._command_loop, self._stream_loop, self._status_loop):
+            thread = threading.Thread(target=target)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self.running = False
+        self.streaming.set()  # 喚醒串流線程
+        for sock in (self.control_socket, self.data_socket):
+            if sock is not None:
+                sock.close()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads.clear()
+        self.streaming.clear()
+
+    # 指令處理
+    def _command_loop(self) -> None:
+        while self.running:
+            try:
+                data, addr = self.control_socket.recvfrom(2048)
+            except OSError:
+                break
+            self.peer = addr
+            self.commands_received += 1
+            if data[:2] == b'\xAA\x55':
+                reply = self.handle_binary_command(data)
+            else:
+                reply = self.handle_text_command(data.decode(errors='replace'))
+            if reply:
+                self._send_control(reply)
+
+    def _send_control(self, data: bytes) -> None:
+        try:
+            self.control_socket.sendto(data, self.peer)
+        except OSError as e:
+            print(f"[模擬器] 發送錯誤: {e}")
+
+    def handle_text_command(self, text: str) -> bytes:
+        """處理文字指令並返回回覆"""
+        parts = text.strip().split()
+        if not parts:
+            return b''
+        command, args = parts[0], parts[1:]
+        if command == 'scanxy':
+            if args and args[0] == '1':
+                self.streaming.set()
+                return b'scan start\r\n'
+            self.streaming.clear()
+            return b'scan stop\r\n'
+        if command == 'startbldc':
+            self.motor_running = True
+            self.motor_speed = int(args[1]) if len(args) > 1 and args[1].isdigit() else 1000
+            return f"bldc start, speed {self.motor_speed}\r\n".encode()
+        if command == 'stopbldc':
+            self.motor_running = False
+            self.motor_speed = 0
+            return b'bldc stop\r\n'
+        if command == 'stopfire':
+            self.streaming.clear()
+            return b'stopfire'
+        if command == 'getid':
+            return b'LiDAR Simulator\r\n'
+        if command == 'tmp':
+            return f"Temperature : {self._temperature():.1f} C\r\n".encode()
+        if command in ('showbldcspeed', 'shownowspeed', 'getencoderxvalue'):
+            return f"{self.motor_speed}\r\n".encode()
+        if command == 'showeth':
+            return f"IP: {self.ip}\r\n".encode()
+        if command == 'help':
+            try:
+                with open(COMMAND_LIST_PATH, 'r', encoding='utf-8', errors='replace') as f:
+                    return f.read().encode()
+            except OSError:
+                return b'help\r\n'
+        if command in TEXT_COMMANDS_OK or command.startswith(('read', 'show', 'sh.')):
+            return b'OK\r\n'
+        return f"Unknown command: {command}\r\n".encode()
+
+    def handle_binary_command(self, data: bytes) -> bytes:
+        """處理 0xAA55 二進位指令，返回 [回應碼][長度][資料][校驗和]（echo 時資料前加上指令碼）"""
+        if len(data) < 5 or len(data) < 5 + data[3]:
+            return b''
+        command, length = data[2], data[3]
+        params = data[4:4 + length]
+        if sum(data[2:5 + length]) & 0xFF != 0:
+            return self._reply(RESULT_PARAM_ERROR, command)
+        payload = b''
+        if command in (0x01, 0x02):
+            self.streaming.clear()
+            self.motor_running = False
+        elif command == 0x03:
+            payload = b'LiDAR Simulator v1.0'
+        elif command == 0x10:
+            payload = self._status_bytes()
+        elif command == 0x11:
+            if length != 1 or params[0] > 2:
+                return self._reply(RESULT_PARAM_ERROR, command)
+            self.mode = params[0]
+        elif command == 0x20:
+            self.motor_running = True
+        elif command == 0x21:
+            self.motor_running = False
+        elif command == 0x22:
+            if length != 2:
+                return self._reply(RESULT_PARAM_ERROR, command)
+            self.motor_speed = int.from_bytes(params, 'big')
+        elif command in (0x40, 0x41):
+            if length != 4:
+                return self._reply(RESULT_PARAM_ERROR, command)
+            start = int.from_bytes(params[:2], 'big', signed=True) / 10.0
+            end = int.from_bytes(params[2:], 'big', signed=True) / 10.0
+            if command == 0x40:
+                self.horizontal_range = [start, end]
+            else:
+                self.vertical_range = [start, end]
+            self.scene = build_scene(self.lines, self.horizontal_range, self.vertical_range)
+        elif command == 0x51:
+            if length != 1 or params[0] > 100:
+                return self._reply(RESULT_PARAM_ERROR, command)
+            self.laser_power = params[0]
+        elif command == 0x70:
+            self.streaming.set()
+        elif command == 0x71:
+            self.streaming.clear()
+        elif command in (0x72, 0x74):
+            if length != 1:
+                return self._reply(RESULT_PARAM_ERROR, command)
+        elif command == 0x80:
+            self._send_packets(self._frame_packets(self.frame_count))
+        elif command in (0x84, 0x85):
+            if length != 1 or params[0] >= self.lines:
+                return self._reply(RESULT_PARAM_ERROR, command)
+            line = params[0]
+            self._send_packets([p for p in self._frame_packets(self.frame_count)
+                                if p[3] == line])
+        elif command == 0x91:
+            payload = bytes([int(self._temperature())])
+        else:
+            return self._reply(RESULT_UNSUPPORTED, command)
+        return self._reply(RESULT_OK, command, payload)
+
+    def _reply(self, result: int, command: int, payload: bytes = b'') -> bytes:
+        if self.echo:
+            payload = bytes([command]) + payload
+        return build_command_packet(result, payload)
+
+    def _temperature(self) -> float:
+        return 35.0 + (5.0 if self.streaming.is_set() else 0.0) + self.random.uniform(-0.5, 0.5)
+
+    def _status_bytes(self) -> bytes:
+        status = 0x03 if self.streaming.is_set() else 0x00
+        return bytes([status, 0x00, self.mode, int(self._temperature())]) + \
+            self.motor_speed.to_bytes(2, 'big') + bytes([self.laser_power])
+
+    def _status_loop(self) -> None:
+        """定期送出狀態封包 (0xAA55 0xFF ...)"""
+        if self.status_hz <= 0:
+            return
+        while self.running:
+            time.sleep(1.0 / self.status_hz)
+            if self.running and self.peer is not None:
+                self._send_control(b'\xAA\x55\xFF' + self._status_bytes())
+
+    # 數據串流
+    def _frame_packets(self, frame_count: int) -> List[memoryview]:
+        """產生一幀 S 型掃描順序的封包：偶數線 d→e，奇數線 e→d，強度封包接在每條線之後"""
+        image = self.scene.copy()
+        # 移動中的方塊，讓相鄰幀有差異
+        left = (frame_count * 10) % (COLUMNS - 60)
+        top, bottom = self.lines // 3, 2 * self.lines // 3
+        image[top:bottom, left:left + 60] = 500
+        frame_id = frame_count & 0xFFFF
+        lines = np.arange(self.lines)
+        types = np.tile([PACKET_TYPE_D, PACKET_TYPE_E], self.lines)
+        data = memoryview(encode_packets(types, np.repeat(lines, 2),
+                                         np.full(2 * self.lines, frame_id),
+                                         image.reshape(2 * self.lines, POINTS_PER_PACKET)))
+        packets = [data[i * PACKET_SIZE:(i + 1) * PACKET_SIZE] for i in range(2 * self.lines)]
+        packets[2::4], packets[3::4] = packets[3::4], packets[2::4]
+        if not self.intensity:
+            return packets
+        intensity = np.clip(65535 - image[:, :POINTS_PER_PACKET] * 6, 0, 65535)
+        a_data = memoryview(encode_intensity_packets(lines, np.full(self.lines, frame_id), intensity))
+        size = len(a_data) // self.lines
+        ordered = []
+        for line in range(self.lines):
+            ordered.extend(packets[2 * line:2 * line + 2])
+            ordered.append(a_data[line * size:(line + 1) * size])
+        return ordered
+
+    def _apply_impairments(self, packets: List[memoryview]) -> List[memoryview]:
+        """套用丟包與亂序設定"""
+        if self.loss > 0:
+            kept = [p for p in packets if self.random.random() >= self.loss]
+            self.packets_lost += len(packets) - len(kept)
+            packets = kept
+        if self.reorder > 0:
+            for i in range(len(packets) - 1):
+                if self.random.random() < self.reorder:
+                    packets[i], packets[i + 1] = packets[i + 1], packets[i]
+                    self.packets_reordered += 1
+        return packets
+
+    def _data_target(self) -> Optional[Tuple[str, int]]:
+        if self.peer is None:
+            return None
+        return self.peer if self.data_port is None else (self.peer[0], self.data_port)
+
+    def _send_packets(self, packets: List[memoryview]) -> None:
+        target = self._data_target()
+        if target is None:
+            return
+        for packet in packets:
+            try:
+                self.data_socket.sendto(packet, target)
+                self.packets_sent += 1
+            except OSError:
+                return
+
+    def _stream_loop(self) -> None:
+        """依幀率送出封包；每 burst 個封包連續送出，之間以固定節拍等待"""
+        next_time = time.monotonic()
+        while self.running:
+            if not self.streaming.is_set():
+                self.streaming.wait(0.5)
+                next_time = time.monotonic()
+                continue
+            packets = self._apply_impairments(self._frame_packets(self.frame_count))
+            self.frame_count += 1
+            target = self._data_target()
+            if target is None:
+                continue
+            interval = 0.0
+            if self.fps > 0:
+                interval = self.burst / (self.fps * max(1, len(packets)))
+            for start in range(0, len(packets), self.burst):
+                if not (self.running and self.streaming.is_set()):
+                    break
+                for packet in packets[start:start + self.burst]:
+                    try:
+                        self.data_socket.sendto(packet, target)
+                    except OSError:
+                        break
+                    self.packets_sent += 1
+                if interval:
+                    next_time += interval
+                    delay = next_time - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    elif delay < -1.0:
+                        next_time = time.monotonic()  # 落後太多時重新對齊，不追趕
+            self.frames_sent += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'frames_sent': self.frames_sent,
+            'packets_sent': self.packets_sent,
+            'packets_lost': self.packets_lost,
+            'packets_reordered': self.packets_reordered,
+            'commands_received': self.commands_received,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LiDAR 設備模擬器')
+    parser.add_argument('--ip', default='127.0.0.2', help='模擬器綁定的 IP')
+    parser.add_argument('--port', type=int, default=8880, help='指令端口')
+    parser.add_argument('--data-port', type=int, default=8881,
+                        help='數據目的端口，0 表示送回指令來源端口')
+    parser.add_argument('--lines', type=int, default=DEFAULT_LINES, help='每幀掃描線數')
+    parser.add_argument('--fps', type=float, default=10.0, help='幀率，0 表示不限速')
+    parser.add_argument('--loss', type=float, default=0.0, help='丟包機率 0~1')
+    parser.add_argument('--reorder', type=float, default=0.0, help='亂序機率 0~1')
+    parser.add_argument('--burst', type=int, default=1, help='每次連續送出的封包數')
+    parser.add_argument('--intensity', action='store_true', help='同時送出強度 (a) 封包')
+    parser.add_argument('--status-hz', type=float, default=1.0, help='狀態封包頻率，0 表示不送')
+    parser.add_argument('--seed', type=int, default=None, help='隨機種子')
+    parser.add_argument('--echo', action='store_true', help='指令回應資料前加上指令碼（控制器需設定 commandEcho）')
+    args = parser.parse_args()
+
+    simulator = LidarSimulator(args.ip, args.port, args.data_port or None, args.lines, args.fps,
+                               args.loss, args.reorder, args.burst, args.intensity,
+                               args.status_hz, args.seed, args.echo)
+    simulator.start()
+    try:
+        while True:
+            time.sleep(5)
+            print(f"[模擬器] {simulator.get_stats()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
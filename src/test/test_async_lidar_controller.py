@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from src.controller.async_lidar_controller import AsyncLidarController
+from src.controller.command_tracker import CommandError, CommandTimeout, RESULT_PARAM_ERROR
+from src.simulator.lidar_simulator import LidarSimulator
+
+
+def _controller(port, remote_ip='127.0.0.2', **kwargs):
+    return AsyncLidarController(('127.0.0.1', port), (remote_ip, port), port + 1, scan_lines=8,
+                                **kwargs)
+
+
+def _with_simulator(port, body):
+    simulator = LidarSimulator('127.0.0.2', port, port + 1, lines=8, fps=50, status_hz=0)
+    simulator.start()
+    try:
+        asyncio.run(body())
+    finally:
+        simulator.stop()
+
+
+def test_command_round_trip_and_parameter_error():
+    async def body():
+        async with _controller(19080) as ctl:
+            assert await ctl.get_device_info() == b'LiDAR Simulator v1.0'
+            with pytest.raises(CommandError) as error:
+                await ctl.set_laser_power(200)
+            assert error.value.result_code == RESULT_PARAM_ERROR
+            await ctl.set_scan_range(-200, 200)
+            assert ctl.horizontal_range == [-20.0, 20.0]
+
+    _with_simulator(19080, body)
+
+
+def test_timeout_retries_and_keeps_range():
+    async def body():
+        # 127.0.0.3 上沒有設備，每次發送都逾時
+        async with _controller(19090, remote_ip='127.0.0.3', command_timeout=0.05,
+                               command_retries=2) as ctl:
+            with pytest.raises(CommandTimeout) as error:
+                await ctl.set_scan_range(-200, 200)
+            assert error.value.attempts == 3
+            assert ctl.horizontal_range == [-30.0, 30.0]
+
+    asyncio.run(body())
+
+
+def test_frames_iterator_ends_on_close():
+    async def body():
+        ctl = _controller(19100)
+        assert await ctl.connect()
+        await ctl.start_data_transmission()
+        frames = []
+
+        async def consume():
+            async for frame in ctl.frames():
+                frames.append(frame)
+                if len(frames) == 2:
+                    ctl.close()
+
+        await asyncio.wait_for(consume(), 5.0)
+        assert len(frames) == 2 and frames[0].distances.shape == (8, 600)
+        assert frames[1].frame_id != frames[0].frame_id
+        assert ctl.get_ingest_stats()['iterators'] == 0
+
+    _with_simulator(19100, body)
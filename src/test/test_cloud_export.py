@@ -0,0 +1,56 @@
+import numpy as np
+
+from src.data.cloud_export import CloudWriter, export_point_cloud, export_recording, point_dtype
+from src.data.frame_archive import FrameArchive, FrameArchiveWriter
+from src.data.frame_assembler import RangeFrame
+
+
+def _read(path, dtype):
+    data = open(path, 'rb').read()
+    marker = b'end_header\n' if path.endswith('.ply') else b'DATA binary\n'
+    header, body = data.split(marker, 1)
+    return header.decode(), np.frombuffer(body, dtype=dtype)
+
+
+def test_ply_is_written_in_chunks_with_count_patched(tmp_path):
+    rng = np.random.default_rng(0)
+    points = rng.normal(size=(2500, 6))
+    intensity = rng.integers(0, 65535, size=2500).astype(np.uint16)
+    colors = rng.integers(0, 255, size=(2500, 3)).astype(np.uint8)
+    path = str(tmp_path / 'cloud.ply')
+    with CloudWriter(path, intensity=True, color=True, chunk_points=1000) as writer:
+        writer.write(points[:1200], intensity[:1200], colors[:1200])
+        writer.write(points[1200:], intensity[1200:], colors[1200:])
+
+    header, body = _read(path, point_dtype(True, True))
+    assert 'element vertex 2500 ' in header and 'property uchar red' in header
+    assert len(body) == 2500
+    np.testing.assert_allclose(body['z'], points[:, 2].astype(np.float32))
+    assert np.array_equal(body['intensity'], intensity) and np.array_equal(body['blue'], colors[:, 2])
+
+
+def test_pcd_packs_rgb(tmp_path):
+    points = np.array([[1.0, 2.0, 3.0, 3.74, 0.0, 0.0]])
+    path = export_point_cloud(str(tmp_path / 'cloud.pcd'), points,
+                              colors=np.array([[0x12, 0x34, 0x56]], dtype=np.uint8))
+    header, body = _read(path, point_dtype(color=True, packed_rgb=True))
+    assert 'FIELDS x y z distance rgb' in header and 'POINTS 1 ' in header
+    assert body['rgb'][0] == 0x123456 and body['x'][0] == 1.0
+
+
+def test_recording_export_keeps_intensity_aligned_with_points(tmp_path):
+    archive_path = str(tmp_path / 'frames.larc')
+    writer = FrameArchiveWriter(archive_path, lines=2, intensity=True)
+    distances = np.zeros((2, 600), dtype=np.uint32)
+    distances[0, 10], distances[1, 400] = 250, 900
+    intensity = np.zeros((2, 600), dtype=np.uint16)
+    intensity[0, 10], intensity[1, 400] = 7, 9
+    for k in range(3):
+        writer.append(RangeFrame(k, distances, np.ones((2, 2), dtype=bool), float(k), 1.0), intensity)
+    writer.close()
+
+    path = str(tmp_path / 'merged.ply')
+    assert export_recording(path, FrameArchive(archive_path), start=1) == 4
+    _, body = _read(path, point_dtype(intensity=True))
+    assert list(body['intensity']) == [7, 9, 7, 9]
+    np.testing.assert_allclose(body['distance'], [2.5, 9.0, 2.5, 9.0])
@@ -0,0 +1,29 @@
+import json
+
+import numpy as np
+
+from src.data.cloud_snapshot import convert_json_to_snapshot, load_cloud, load_snapshot, save_snapshot
+
+
+def test_snapshot_round_trip_is_memory_mapped(tmp_path):
+    points = np.random.default_rng(0).normal(size=(1000, 6))
+    colors = np.arange(3000, dtype=np.uint8).reshape(1000, 3)
+    path = save_snapshot(str(tmp_path / 'cloud.lcloud'), points, colors, frame_id=7,
+                         horizontal_range=[-30, 30], vertical_range=[-15, 15])
+    cloud = load_snapshot(path)
+    assert isinstance(cloud.points.base, np.memmap) or isinstance(cloud.points, np.memmap)
+    np.testing.assert_allclose(cloud.points, points.astype(np.float32))
+    assert np.array_equal(cloud.colors, colors)
+    assert cloud.frame_id == 7 and cloud.horizontal_range == [-30.0, 30.0]
+
+
+def test_json_cloud_converts_to_snapshot(tmp_path):
+    json_path = tmp_path / 'point_cloud_20250115_143025.json'
+    points = [[1.0, 2.0, 3.0, 3.7, 10.0, -5.0], [0.5, 0.5, 0.5, 0.9, 0.0, 0.0]]
+    json_path.write_text(json.dumps({'timestamp': '2025-01-15T14:30:25.123456', 'point_count': 2,
+                                     'data_type': 'current_point_cloud', 'points': points}))
+    snapshot_path = convert_json_to_snapshot(str(json_path))
+    assert snapshot_path.endswith('.lcloud')
+    legacy, converted = load_cloud(str(json_path)), load_cloud(snapshot_path)
+    np.testing.assert_allclose(converted.points, legacy.points, rtol=1e-6)
+    assert converted.timestamp == legacy.timestamp and converted.frame_id is None
@@ -0,0 +1,34 @@
+from src.controller.command_sequencer import (CommandSequencer, SequenceStep, WAIT_DATA, WAIT_STATUS,
+                                              START_SEQUENCE)
+
+
+def test_steps_advance_on_device_replies():
+    replies = {b'stephomeup': b'OK\r\n', b'startbldc 0 1000': b'bldc start\r\n',
+               b'scanxy 1': b'\x55\xAA\xD0\x00'}
+    sequencer = CommandSequencer(lambda data: sequencer.on_datagram(replies[data]))
+    steps = [step._replace(settle=0.0) for step in START_SEQUENCE]
+    results = sequencer.run(steps)
+    assert [r.ok for r in results] == [True, True, True]
+    assert results[0].response == 'OK\r\n'
+    assert sum(r.elapsed for r in results) < 0.5
+
+
+def test_settle_time_holds_acknowledged_steps():
+    assert all(step.settle > 0 for step in START_SEQUENCE[:2])
+    sequencer = CommandSequencer(lambda data: sequencer.on_datagram(b'OK\r\n'))
+    result = sequencer.run_step(SequenceStep('stephomeup', settle=0.1))
+    assert result.ok and result.elapsed >= 0.1
+
+
+def test_timeout_stops_sequence():
+    sent = []
+    sequencer = CommandSequencer(sent.append)
+    steps = [SequenceStep('scanxy 1', wait=WAIT_DATA, deadline=0.02),
+             SequenceStep('stopbldc', deadline=0.02)]
+    results = sequencer.run(steps)
+    assert len(results) == 1 and not results[0].ok and sent == [b'scanxy 1']
+    assert len(sequencer.run(steps, stop_on_timeout=False)) == 2
+
+    sequencer.on_status(0x00)
+    sequencer.send = lambda data: sequencer.on_status(0x03)
+    assert sequencer.run_step(SequenceStep('scanxy 1', wait=WAIT_STATUS, status=0x03)).ok
@@ -0,0 +1,78 @@
+import pytest
+
+from src.controller.command_tracker import (CommandError, CommandTimeout, CommandTracker,
+                                            RESULT_BUSY, RESULT_OK, RESULT_PARAM_ERROR,
+                                            build_command_packet, parse_command_response)
+
+
+def reply(result, payload=b''):
+    return parse_command_response(build_command_packet(result, payload))
+
+
+def echo_reply(result, command, payload=b''):
+    return parse_command_response(build_command_packet(result, bytes([command]) + payload), echo=True)
+
+
+def test_parse_rejects_bad_checksum():
+    packet = bytearray(build_command_packet(RESULT_OK, b'\x03\x01\x02'))
+    assert parse_command_response(bytes(packet)) == (RESULT_OK, None, b'\x03\x01\x02')
+    assert parse_command_response(bytes(packet), echo=True) == (RESULT_OK, 0x03, b'\x01\x02')
+    assert parse_command_response(build_command_packet(RESULT_OK)) == (RESULT_OK, None, b'')
+    packet[-1] ^= 0xFF
+    assert parse_command_response(bytes(packet)) is None
+
+
+def test_commands_without_echo_are_sent_one_at_a_time():
+    sent = []
+    tracker = CommandTracker(sent.append, timeout=1.0)
+    info = tracker.submit(0x03)
+    power = tracker.submit(0x51, b'\x50')
+    assert tracker.in_flight() == 2 and sent == [build_command_packet(0x03)]
+    tracker.handle_response(reply(RESULT_OK, b'v1'))
+    assert info.result(0) == b'v1'
+    assert sent[1] == build_command_packet(0x51, b'\x50')
+    tracker.handle_response(reply(RESULT_PARAM_ERROR))
+    with pytest.raises(CommandError) as error:
+        power.result(0)
+    assert error.value.command_code == 0x51 and error.value.result_code == RESULT_PARAM_ERROR
+    assert tracker.handle_response(reply(RESULT_OK)) is False
+    tracker.cancel_all()
+
+
+def test_next_command_is_sent_after_timeout():
+    sent = []
+    tracker = CommandTracker(sent.append, timeout=0.05, retries=0)
+    lost = tracker.submit(0x10)
+    info = tracker.submit(0x03)
+    with pytest.raises(CommandTimeout):
+        lost.result(1)
+    assert sent[-1] == build_command_packet(0x03)
+    tracker.handle_response(reply(RESULT_OK, b'v1'))
+    assert info.result(0) == b'v1'
+    tracker.cancel_all()
+
+
+def test_concurrent_commands_resolve_by_echoed_code():
+    sent = []
+    tracker = CommandTracker(sent.append, timeout=1.0, echo=True)
+    info = tracker.submit(0x03)
+    power = tracker.submit(0x51, b'\x50')
+    assert tracker.in_flight() == 2 and len(sent) == 2
+    tracker.handle_response(echo_reply(RESULT_PARAM_ERROR, 0x51))
+    tracker.handle_response(echo_reply(RESULT_OK, 0x03, b'v1'))
+    assert info.result(0) == b'v1'
+    with pytest.raises(CommandError) as error:
+        power.result(0)
+    assert error.value.result_code == RESULT_PARAM_ERROR
+    tracker.cancel_all()
+
+
+def test_busy_and_timeout_are_retried():
+    sent = []
+    tracker = CommandTracker(sent.append, timeout=0.05, retries=1)
+    busy = tracker.submit(0x20)
+    tracker.handle_response(reply(RESULT_BUSY))
+    with pytest.raises(CommandTimeout):
+        busy.result(1)
+    assert len(sent) == 2 and tracker.retransmits == 1 and tracker.in_flight() == 0
+    tracker.cancel_all()
@@ -0,0 +1,49 @@
+import numpy as np
+
+from src.data.frame_archive import FrameArchive, FrameArchiveWriter, is_archive
+from src.data.frame_assembler import RangeFrame
+
+
+def _frame(frame_id, timestamp, lines=4, columns=600):
+    distances = np.full((lines, columns), 500 + frame_id, dtype=np.uint32)
+    distances[0, :10] = 0xFFFFFFFF
+    line_mask = np.ones((lines, 2), dtype=bool)
+    line_mask[-1, 1] = False
+    return RangeFrame(frame_id, distances, line_mask, timestamp, 0.875)
+
+
+def test_archive_random_access_and_time_slice(tmp_path):
+    path = str(tmp_path / 'capture.larc')
+    writer = FrameArchiveWriter(path, lines=4, intensity=True)
+    for k in range(10):
+        writer.append(_frame(k, 1000.0 + k * 0.1), np.full((4, 600), k, dtype=np.uint16))
+    writer.close()
+
+    assert is_archive(path)
+    archive = FrameArchive(path)
+    assert len(archive) == 10 and isinstance(archive.records, np.memmap)
+    frame = archive[7]
+    assert frame.frame_id == 7 and frame.completeness == 0.875 and frame.timestamp == 1000.7
+    assert frame.distances[1, 0] == 507 and frame.distances[0, 0] == 0  # uint16 中無效值寫為 0
+    assert not frame.line_mask[-1, 1] and frame.line_mask[0, 0]
+    assert archive.intensity(3)[0, 0] == 3
+    assert archive.time_slice(1000.25, 1000.55) == (3, 6)
+    assert archive.find_frame(4) == 4
+    assert archive.snapshot(2).points.shape[1] == 6
+
+
+def test_archive_ignores_truncated_record_and_rebuilds_index(tmp_path):
+    path = str(tmp_path / 'capture.larc')
+    writer = FrameArchiveWriter(path, lines=4, distance_dtype='<u4')
+    for k in range(3):
+        writer.append(_frame(k, 5.0 + k))
+    writer.close()
+    with open(path, 'ab') as f:
+        f.write(b'\0' * 100)   # 錄製中斷留下的半筆記錄
+    (tmp_path / 'capture.larc.idx').unlink()
+
+    archive = FrameArchive(path)
+    assert len(archive) == 3
+    assert archive[0].distances[0, 0] == 0xFFFFFFFF
+    assert list(archive.index['frame_id']) == [0, 1, 2]
+    assert archive.time_slice(6.0) == (1, 3)
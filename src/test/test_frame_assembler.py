@@ -0,0 +1,92 @@
+import numpy as np
+
+from src.data.frame_assembler import FrameAssembler
+from src.data.packet_decoder import decode_packets, encode_packets, PACKET_TYPE_D, PACKET_TYPE_E
+from src.data.angle_lut import get_angle_lut
+from src.data.point_cloud import range_image_to_point_cloud
+
+
+def _frame_packets(frame_id, lines, value=100):
+    """產生一幀完整的 d/e 封包"""
+    types = np.tile([PACKET_TYPE_D, PACKET_TYPE_E], lines)
+    y_scan = np.repeat(np.arange(lines), 2)
+    distances = np.full((2 * lines, 300), value, dtype=np.uint32)
+    distances[1::2] += 1  # e 封包距離 +1，便於檢查欄位偏移
+    return encode_packets(types, y_scan, np.full(2 * lines, frame_id), distances)
+
+
+def _collecting_assembler(**kwargs):
+    frames = []
+    assembler = FrameAssembler(on_frame=lambda f: frames.append(
+        (f.frame_id, f.distances.copy(), f.line_mask.copy(), f.completeness)), **kwargs)
+    return assembler, frames
+
+
+def test_frame_completes_on_full_line_count():
+    assembler, frames = _collecting_assembler(lines=4)
+    assert assembler.add_packets(decode_packets(_frame_packets(1, 4))) == 1
+    frame_id, distances, line_mask, completeness = frames[0]
+    assert frame_id == 1
+    assert completeness == 1.0 and line_mask.all()
+    assert (distances[:, :300] == 100).all()
+    assert (distances[:, 300:] == 101).all()
+
+
+def test_interleaved_frames_tolerate_reordering():
+    assembler, frames = _collecting_assembler(lines=2, window=2)
+    first, second = _frame_packets(1, 2), _frame_packets(2, 2, value=200)
+    size = len(first) // 4
+    # 幀 2 的前半先到，幀 1 的最後一個封包遲到
+    data = first[:3 * size] + second[:2 * size] + first[3 * size:] + second[2 * size:]
+    assembler.add_packets(decode_packets(data))
+    assert [f[0] for f in frames] == [1, 2]
+    assert all(f[3] == 1.0 for f in frames)
+
+
+def test_timeout_emits_partial_frame_and_rejects_late_packets():
+    assembler, frames = _collecting_assembler(lines=4, timeout=0.5)
+    data = _frame_packets(1, 4)
+    assembler.add_packets(decode_packets(data[:len(data) * 3 // 4]), now=10.0)
+    assert assembler.poll(now=10.2) == 0
+    assert assembler.poll(now=10.6) == 1
+    assert frames[0][3] == 0.75
+    assembler.add_packets(decode_packets(data[len(data) * 3 // 4:]), now=10.7)
+    assert assembler.late_packets == 2
+
+
+def test_window_evicts_stale_partial_frames():
+    assembler, frames = _collecting_assembler(lines=4, window=2)
+    # 只有一個封包的殘幀佔滿視窗
+    for stray_id in (98, 99):
+        assembler.add_packets(decode_packets(_frame_packets(stray_id, 4)[:1206]))
+    for frame_id in (1, 2, 3):
+        assembler.add_packets(decode_packets(_frame_packets(frame_id, 4)))
+    assert [f[0] for f in frames] == [1, 2, 3]
+    assert assembler.get_stats()['frames_dropped'] == 1
+    # 剩下的殘幀逾時後丟棄
+    assembler.poll(now=float('inf'))
+    stats = assembler.get_stats()
+    assert stats['frames_dropped'] == 2
+    assert stats['frames_in_flight'] == 0
+
+
+def test_out_of_range_lines_are_counted():
+    assembler, _ = _collecting_assembler(lines=2)
+    assembler.add_packets(decode_packets(_frame_packets(1, 3)))
+    assert assembler.packets_out_of_range == 2
+
+
+def test_range_image_to_point_cloud_skips_missing_lines():
+    distances = np.full((2, 600), 500, dtype=np.uint32)
+    mask = np.array([[True, True], [True, False]])
+    points = range_image_to_point_cloud(distances, mask, [-30, 30], [-15, 15])
+    assert points.shape == (900, 6)
+    np.testing.assert_allclose(np.linalg.norm(points[:, :3], axis=1), 5.0)
+
+
+def test_angle_lut_is_cached_per_range():
+    lut = get_angle_lut([-30, 30], [-15, 15], 4, 600)
+    assert get_angle_lut((-30.0, 30.0), (-15.0, 15.0), 4, 600) is lut
+    assert get_angle_lut([-20, 20], [-15, 15], 4, 600) is not lut
+    np.testing.assert_allclose(np.linalg.norm(lut.directions, axis=2), 1.0)
+    assert lut.h_angles[0] == -30 and lut.v_angles[-1] == 15
@@ -0,0 +1,22 @@
+import numpy as np
+
+from src.controller.pipeline import BLOCK
+from src.data.frame_archive import FrameArchive
+from src.data.frame_assembler import RangeFrame
+from src.data.frame_recorder import FrameRecorder
+
+
+def test_recorder_copies_reused_buffers_and_drains_on_close(tmp_path):
+    path = str(tmp_path / 'frames.larc')
+    recorder = FrameRecorder(path, lines=4, policy=BLOCK, queue_size=2)
+    distances = np.zeros((4, 600), dtype=np.uint32)
+    line_mask = np.ones((4, 2), dtype=bool)
+    for k in range(20):
+        distances[:] = 100 + k   # 組裝器會重用同一塊緩衝區
+        assert recorder.submit(RangeFrame(k, distances, line_mask, 10.0 + k, 1.0))
+    recorder.close()
+
+    stats = recorder.get_stats()
+    assert stats['frames'] == 20 and stats['dropped'] == 0
+    archive = FrameArchive(path)
+    assert [archive[k].distances[2, 5] for k in range(20)] == [100 + k for k in range(20)]
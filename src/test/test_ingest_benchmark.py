@@ -0,0 +1,28 @@
+import time
+from types import SimpleNamespace
+
+from src.benchmark.ingest_benchmark import _wait_for_frames, run_benchmark
+
+
+def test_inject_with_custom_line_count():
+    result = run_benchmark(frames=5, lines=100, mode='inject', settle=2.0)
+    assert result['config']['lines'] == 100
+    assert result['throughput']['frames_received'] == 5
+    assert result['assembler']['frames_complete'] == 5
+    assert result['assembler']['packets_out_of_range'] == 0
+
+
+def test_udp_throughput_counts_received_packets():
+    result = run_benchmark(frames=5, lines=16, mode='udp', settle=2.0)
+    throughput = result['throughput']
+    assert throughput['packets_sent'] == 5 * 16 * 2
+    assert throughput['packets_received'] == result['receiver']['packets']
+    assert throughput['packets_per_second'] == throughput['packets_received'] / throughput['wall_seconds']
+
+
+def test_wall_time_excludes_settle_wait_after_lost_frame():
+    start = time.perf_counter()
+    controller = SimpleNamespace(frames_received=2, last_frame_at=start)
+    end = _wait_for_frames(controller, frames=3, settle=0.3)
+    assert time.perf_counter() - start >= 0.3
+    assert end - start < 0.1
@@ -0,0 +1,26 @@
+import time
+
+from src.monitor.jsonl_log import JsonlLogWriter, read_log_window
+from src.monitor.system_monitor import LidarMonitor
+
+
+def test_writer_rotates_by_size_and_reads_window(tmp_path):
+    writer = JsonlLogWriter(str(tmp_path), 'error_log', max_bytes=200)
+    now = time.time()
+    for i in range(20):
+        writer.write({'ts': now - 20 + i, 'error_code': i})
+    writer.close()
+    assert len(list(tmp_path.glob('error_log_*.jsonl'))) > 1 and writer.rotations > 0
+    entries = list(read_log_window(str(tmp_path), 'error_log', now - 5))
+    assert [e['error_code'] for e in entries] == [15, 16, 17, 18, 19]
+
+
+def test_report_reads_errors_from_log_file(tmp_path):
+    monitor = LidarMonitor(max_error_log_size=2, log_dir=str(tmp_path))
+    monitor.update_status({'temperature': 40, 'voltage': 12.0})
+    for code in (1, 2, 3):
+        monitor.log_error(code, f'錯誤 {code}')
+    assert [e['error_code'] for e in monitor.get_error_log()] == [2, 3]
+    assert [e['error_code'] for e in monitor.read_error_log()] == [1, 2, 3]
+    assert monitor.export_status_report(1)
+    monitor.close()
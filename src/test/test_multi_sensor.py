@@ -0,0 +1,62 @@
+import time
+
+import numpy as np
+
+from src.controller.multi_sensor import MultiSensorManager, SharedFrameBuffer, load_device_configs
+from src.data.frame_assembler import RangeFrame
+from src.simulator.lidar_simulator import LidarSimulator
+
+
+def _frame(frame_id, lines=4):
+    distances = np.full((lines, 600), frame_id, dtype=np.uint32)
+    return RangeFrame(frame_id, distances, np.ones((lines, 2), dtype=bool), 1000.0 + frame_id, 1.0)
+
+
+def test_shared_buffer_seqlock_read_write():
+    writer = SharedFrameBuffer(None, lines=4, slots=2, create=True)
+    reader = SharedFrameBuffer(writer.name, lines=4, slots=2)
+    try:
+        assert reader.read_latest() is None
+        for frame_id in (1, 2, 3):
+            writer.publish(_frame(frame_id))
+        frame = reader.read_latest()
+        assert frame.frame_id == 3 and reader.published == 3
+        assert (frame.distances == 3).all() and frame.timestamp == 1003.0
+        assert reader.read_latest(after=3) is None
+
+        # 寫入中（seq 為奇數）的槽位不會被讀出
+        writer.headers['seq'][(writer.published - 1) % 2] += 1
+        assert reader.read_latest() is None
+        writer.headers['seq'][(writer.published - 1) % 2] += 1
+        assert reader.read_latest().frame_id == 3
+        assert not reader.images.flags.writeable
+    finally:
+        reader.close()
+        writer.close()
+        writer.unlink()
+
+
+def test_manager_start_stop_with_simulator():
+    device = load_device_configs('missing.json')[0]
+    device.update({'name': 'sim', 'localIP': '127.0.0.1', 'remoteIP': '127.0.0.2',
+                   'port': 18980, 'dataPort': 18981, 'scanLines': 8, 'commandTimeout': 0.5})
+    simulator = LidarSimulator('127.0.0.2', 18980, 18981, lines=8, fps=50, status_hz=0)
+    simulator.start()
+    manager = MultiSensorManager([device])
+    try:
+        manager.start()
+        assert manager.send_command('sim', 0x03).result(2) == b'LiDAR Simulator v1.0'
+        manager.start_data_transmission()
+        frame = None
+        deadline = time.monotonic() + 5.0
+        while frame is None and time.monotonic() < deadline:
+            frame = manager.read_latest('sim')
+            time.sleep(0.02)
+        assert frame is not None and frame.distances.shape == (8, 600)
+        manager.stop_data_transmission()
+        stats = manager.get_stats()['sim']
+        assert stats['alive'] and stats['published'] >= 1
+    finally:
+        manager.stop()
+        simulator.stop()
+    assert not manager.processes and not manager.buffers and not manager.controls
@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+
+import pytest
+
+from src.data.frame_assembler import FrameAssembler
+from src.data.packet_decoder import (decode_packets, encode_packets, valid_distance_mask,
+                                     PACKET_SIZE, PACKET_TYPE_D, PACKET_TYPE_E)
+
+CAPTURE_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'lidar_test')
+
+
+def _load_capture(name):
+    """讀取 Wireshark 十六進位傾印並去除 Ethernet/IP/UDP 標頭"""
+    raw = bytearray()
+    with open(os.path.join(CAPTURE_DIR, name)) as f:
+        for line in f:
+            parts = line.split()
+            raw += bytes(int(x, 16) for x in parts[1:17] if len(x) == 2)
+    return bytes(raw[42:])
+
+
+def test_decode_captured_packets():
+    data = _load_capture('distance1.txt') + _load_capture('distance2.txt')
+    decoded = decode_packets(data)
+    assert decoded.valid.all()
+    assert decoded.packet_type.tolist() == [PACKET_TYPE_D, PACKET_TYPE_E]
+    assert decoded.frame_id.tolist() == [5, 5]
+    assert decoded.y_scan.tolist() == [237, 237]  # lidar_packet_spec.md 10: d1 ed / e1 ed
+    assert decoded.echo_depth.tolist() == [1, 1]
+    assert decoded.distances.shape == (2, 300)
+    assert decoded.distances[0, :3].tolist() == [157, 158, 177]
+
+
+def test_assemble_captured_packets():
+    frames = []
+    assembler = FrameAssembler(lines=300, min_completeness=0.0,
+                               on_frame=lambda f: frames.append((f.line_mask.copy(), f.distances.copy())))
+    decoded = decode_packets(_load_capture('distance1.txt') + _load_capture('distance2.txt'))
+    assembler.add_packets(decoded)
+    assembler.flush()
+    assert assembler.packets_out_of_range == 0
+    line_mask, distances = frames[0]
+    assert line_mask[237].all() and line_mask.sum() == 2
+    assert distances[237, :3].tolist() == [157, 158, 177]
+    assert distances[237, 300:].tolist() == decoded.distances[1].tolist()
+
+
+def test_encode_roundtrip():
+    distances = np.arange(600, dtype=np.uint32).reshape(2, 300)
+    data = encode_packets([PACKET_TYPE_D, PACKET_TYPE_E], [12, 12], [7, 7], distances)
+    assert len(data) == 2 * PACKET_SIZE
+    decoded = decode_packets(data)
+    assert decoded.y_scan.tolist() == [12, 12]
+    assert decoded.frame_id.tolist() == [7, 7]
+    assert decoded.echo_depth.tolist() == [0, 0]
+    np.testing.assert_array_equal(decoded.distances, distances)
+
+
+def test_encode_rejects_line_overflow():
+    with pytest.raises(ValueError):
+        encode_packets([PACKET_TYPE_D], [256], [0], np.zeros(300, dtype=np.uint32))
+
+
+def test_valid_distance_mask():
+    mask = valid_distance_mask(np.array([0, 1, 9999, 10000, 65535]))
+    assert mask.tolist() == [False, True, True, False, False]
@@ -0,0 +1,62 @@
+import csv
+
+import numpy as np
+
+from src.data.angle_lut import get_angle_lut
+from src.data.packet_store import PACKET_ROW_DTYPE, PacketStore
+
+
+def _fill(store, count):
+    for k in range(count):
+        distances = np.zeros(300, dtype=np.uint32)
+        distances[k % 300] = 1000 + k
+        store.append(100.0 + k, k // 2, k % 7, 0b1101 + k % 2, distances)
+
+
+def test_store_spills_to_disk_past_memory_cap(tmp_path):
+    store = PacketStore(max_memory_bytes=10 * PACKET_ROW_DTYPE.itemsize, initial_rows=2,
+                        spill_dir=str(tmp_path))
+    _fill(store, 25)
+    stats = store.get_stats()
+    assert len(store) == 25 and stats['spilled_rows'] == 20 and stats['memory_rows'] == 5
+    assert store.memory_bytes <= 10 * PACKET_ROW_DTYPE.itemsize + 1024
+
+    rows = np.concatenate(list(store.iter_chunks(rows=4)))
+    assert list(rows['timestamp']) == [100.0 + k for k in range(25)]
+    loaded = np.load(store.export_binary(str(tmp_path / 'packets.npy')), mmap_mode='r')
+    assert np.array_equal(loaded, rows)
+
+    spill_path = store.spill_path
+    store.clear()
+    assert len(store) == 0 and not (tmp_path / spill_path).exists()
+
+
+def test_iteration_keeps_rows_spilled_during_export(tmp_path):
+    store = PacketStore(max_memory_bytes=4 * PACKET_ROW_DTYPE.itemsize, initial_rows=4,
+                        spill_dir=str(tmp_path))
+    _fill(store, 6)  # 4 列在暫存檔，2 列在記憶體
+    timestamps = []
+    for chunk in store.iter_chunks(rows=1):
+        timestamps.extend(chunk['timestamp'].tolist())
+        if len(timestamps) == 5:
+            # 接收線程在匯出期間繼續寫入，觸發溢出並覆寫記憶體中的列
+            for k in range(6, 9):
+                store.append(100.0 + k, 0, 0, 0, np.zeros(300, dtype=np.uint32))
+    assert store.get_stats()['spilled_rows'] == 8
+    assert timestamps == [100.0 + k for k in range(6)]
+
+
+def test_csv_export_from_columns(tmp_path):
+    store = PacketStore(max_memory_bytes=4 * PACKET_ROW_DTYPE.itemsize, spill_dir=str(tmp_path))
+    _fill(store, 6)
+    lut = get_angle_lut((-30.0, 29.8), (0.0, 0.0), 1, 300)
+    path = str(tmp_path / 'packets.csv')
+    assert store.export_csv(path, lut.directions[0], lut.h_angles, 1.0, {0b1101: 'First-half'}) == 6
+
+    with open(path, encoding='utf-8-sig') as f:
+        rows = list(csv.DictReader(f))
+    assert [int(r['point_index']) for r in rows] == list(range(6))
+    assert rows[0]['echo_type'] == 'First-half' and rows[1]['echo_type'] == 'Unknown (1110)'
+    assert float(rows[3]['distance_mm']) == 1003.0 and rows[3]['frame_count'] == '1'
+    assert float(rows[0]['x_mm']) == round(1000 * lut.directions[0, 0, 0], 3)
+    assert rows[0]['timestamp'].startswith('1970-01-01T')
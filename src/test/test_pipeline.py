@@ -0,0 +1,49 @@
+import threading
+
+from src.controller.packet_ring import PacketRing
+from src.controller.pipeline import BoundedQueue, FrameConsumer, DROP_OLDEST, LATEST_ONLY, BLOCK
+
+
+def test_ring_drops_newest_when_full():
+    ring = PacketRing(depth=2, slot_size=4)
+    for value in (1, 2, 3):
+        ring.write_slot()[:1] = bytes([value])
+        ring.commit(1)
+    assert len(ring) == 2 and ring.overruns == 1
+    data, lengths = ring.read_span()
+    assert bytes(data[0:1]) == b'\x01' and bytes(data[4:5]) == b'\x02'
+    ring.release(len(lengths))
+    assert len(ring) == 0
+
+
+def test_queue_policies():
+    queue = BoundedQueue(maxsize=2, policy=DROP_OLDEST)
+    for item in (1, 2, 3):
+        queue.put(item)
+    assert [queue.get(0), queue.get(0)] == [2, 3] and queue.dropped == 1
+
+    latest = BoundedQueue(policy=LATEST_ONLY)
+    for item in (1, 2, 3):
+        latest.put(item)
+    assert latest.get(0) == 3 and latest.get(0) is None
+
+    blocking = BoundedQueue(maxsize=1, policy=BLOCK)
+    assert blocking.put(1)
+    assert not blocking.put(2, timeout=0.01)
+    assert blocking.get(0) == 1
+
+
+def test_consumer_runs_callback_in_own_thread():
+    seen = []
+    done = threading.Event()
+
+    def callback(frame):
+        seen.append((frame, threading.current_thread().name))
+        done.set()
+
+    consumer = FrameConsumer(callback, name='test-consumer')
+    consumer.submit('frame')
+    assert done.wait(2.0)
+    consumer.close()
+    assert seen == [('frame', 'test-consumer')]
+    assert consumer.get_stats()['processed'] == 1
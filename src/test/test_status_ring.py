@@ -0,0 +1,47 @@
+import time
+
+from src.controller.pipeline import BoundedQueue, DROP_OLDEST
+from src.monitor.status_ring import StatusRing
+from src.monitor.system_monitor import LidarMonitor
+
+
+def test_window_query_across_wraparound():
+    ring = StatusRing(capacity=8)
+    for i in range(13):
+        ring.append(float(i), 3, 0, 1, 40 + i)
+    assert len(ring) == 8 and ring.total == 13
+    assert ring.between(0.0)['timestamp'].tolist() == [float(i) for i in range(5, 13)]
+    assert ring.window(3.0, now=12.0)['temperature'].tolist() == [49, 50, 51, 52]
+    assert ring.between(6.0, 8.0)['timestamp'].tolist() == [6.0, 7.0]
+
+
+def test_monitor_drains_status_queue(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monitor = LidarMonitor()
+    queue = BoundedQueue(maxsize=4096, policy=DROP_OLDEST)
+    monitor.attach(queue)
+    now = time.monotonic()
+    for i in range(2000):
+        queue.put((now + i * 1e-4, 3, 0x03 if i == 1500 else 0, 1, 45, 1200, 80))
+    deadline = time.time() + 2.0
+    while monitor.status_ring.total < 2000 and time.time() < deadline:
+        time.sleep(0.01)
+    monitor.detach()
+    assert monitor.status_ring.total == 2000
+    assert monitor.current_status['motor_speed'] == 1200
+    assert [e['error_code'] for e in monitor.get_error_log()] == [0x03]
+    assert monitor.get_status_summary(60)['error_samples'] == 1
+
+
+def test_monitor_history_window(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monitor = LidarMonitor(max_history_size=4)
+    for temperature in range(6):
+        monitor.update_status({'temperature': temperature, 'voltage': 12.0})
+    history = monitor.get_status_history(1)
+    assert [entry['temperature'] for entry in history] == [2.0, 3.0, 4.0, 5.0]
+    monitor.log_error(0x02, '雷射錯誤')
+    health = monitor.get_system_health()
+    assert health['status'] == 'error' and health['last_error']['error_code'] == 0x02
+    assert health['last_error']['system_status']['temperature'] == 5.0
+    assert monitor.export_status_report(1)